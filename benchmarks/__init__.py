@@ -0,0 +1 @@
+"""Performance benchmarks for Mohtion (run as modules, e.g. `python -m benchmarks.bench_complexity`)."""
@@ -0,0 +1,72 @@
+"""Benchmark: scan throughput as analyzers are added to the shared walk.
+
+Generates a batch of in-memory modules and times analyze_source (parse once,
+one walk for every analyzer) with different analyzer sets, so the marginal
+cost of each analyzer can be read off against complexity alone.
+
+Usage:
+    python -m benchmarks.bench_analyzers [--files 300] [--functions 20]
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from mohtion.agent.scanner import analyze_source, create_analyzers
+from mohtion.models.repo_config import RepoConfig
+
+ANALYZER_SETS = (
+    ("complexity",),
+    ("complexity", "function_length", "nesting_depth"),
+    ("complexity", "type_hints"),
+)
+
+
+def module_source(functions: int, rng: random.Random) -> bytes:
+    """Build a module of `functions` functions, some annotated, with a few branches each."""
+    lines: list[str] = ["class Handler:"]
+    for index in range(functions):
+        if rng.random() < 0.5:
+            signature = f"    def method_{index}(self, x: int, y: int = 0) -> int:"
+        else:
+            signature = f"    def method_{index}(self, x, y=0):"
+        lines.append(signature)
+        for branch in range(rng.randint(1, 6)):
+            lines.append(f"        if x > {branch} and y < {branch + 3}:")
+            lines.append(f"            x = [v for v in range(x) if v % {branch + 2}][-1]")
+        lines.append("        return x + y")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--functions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sources = [
+        (Path(f"module_{index}.py"), module_source(args.functions, rng))
+        for index in range(args.files)
+    ]
+
+    baseline: float | None = None
+    print(f"{'analyzers':<45} {'files/s':>10} {'vs first':>9}")
+    for names in ANALYZER_SETS:
+        analyzers = create_analyzers(RepoConfig(analyzers=list(names)))
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for path, source in sources:
+                analyze_source(path, source, analyzers)
+            best = min(best, time.perf_counter() - start)
+
+        baseline = baseline or best
+        print(f"{'+'.join(names):<45} {len(sources) / best:>10.0f} {best / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
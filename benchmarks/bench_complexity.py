@@ -0,0 +1,88 @@
+"""Benchmark: single-pass vs per-function-walk cyclomatic complexity.
+
+Generates deeply nested sources (closures inside closures, each with a few
+branches) and times the current ComplexityVisitor against the previous
+algorithm, which re-walked every function's full subtree.
+
+Usage:
+    python -m benchmarks.bench_complexity [--depths 5 10 20 40] [--branches 10]
+"""
+
+import argparse
+import ast
+import time
+from collections.abc import Callable
+
+from mohtion.analyzers.complexity import ComplexityVisitor
+
+_DECISIONS = (
+    ast.If, ast.While, ast.For, ast.AsyncFor, ast.ExceptHandler, ast.IfExp, ast.Assert
+)
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+class LegacyComplexityVisitor(ast.NodeVisitor):
+    """The previous algorithm: ast.walk per function, then generic_visit again."""
+
+    def __init__(self) -> None:
+        self.functions: list[int] = []
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        complexity = 1
+        for child in ast.walk(node):
+            if isinstance(child, _DECISIONS):
+                complexity += 1
+            elif isinstance(child, ast.BoolOp):
+                complexity += len(child.values) - 1
+            elif isinstance(child, _COMPREHENSIONS):
+                for generator in child.generators:
+                    complexity += len(generator.ifs)
+        self.functions.append(complexity)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+
+def nested_source(depth: int, branches: int = 3) -> str:
+    """Build a chain of `depth` nested closures, each with `branches` if/else blocks."""
+    lines: list[str] = []
+    for level in range(depth):
+        indent = "    " * level
+        lines.append(f"{indent}def level_{level}(x):")
+        for branch in range(branches):
+            lines.append(f"{indent}    if x > {branch} and x < {branch + 10}:")
+            lines.append(f"{indent}        x = x - 1")
+    lines.append("    " * depth + "return x")
+    return "\n".join(lines) + "\n"
+
+
+def _best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # CPython refuses more than 100 indentation levels, so depth tops out near 45
+    parser.add_argument("--depths", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--branches", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'depth':>6} {'legacy (ms)':>12} {'single-pass (ms)':>17} {'speedup':>8}")
+    for depth in args.depths:
+        tree = ast.parse(nested_source(depth, args.branches))
+        legacy = _best_of(args.repeat, lambda: LegacyComplexityVisitor().visit(tree))
+        current = _best_of(args.repeat, lambda: ComplexityVisitor().visit(tree))
+        print(
+            f"{depth:>6} {legacy * 1000:>12.2f} {current * 1000:>17.2f} "
+            f"{legacy / current:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Benchmark suite: scan throughput and memory on a synthetic repository.
+
+Generates a repository with benchmarks.synthetic, then runs each case in a
+fresh process so its peak RSS isn't inflated by earlier cases:
+
+- scan: Scanner.scan with every analyzer, using the process pool
+- scan_serial: the same scan in one process (workers=1)
+
+A third, profiled serial scan times each analyzer's own work inside the
+shared scan: creating its handler per file, the handler's callbacks during
+the one walk, and its finalize() pass. Whatever is left of the scan's time
+(discovery, file IO, parsing, the traversal itself) is reported as shared.
+Timing every callback adds a little to each, so this scan isn't used for
+files/s; its per-analyzer seconds add up to the analyzers' share of it.
+
+Results are printed as tables and written as JSON. Passing a previous
+run's JSON as --baseline compares files/s case by case, and seconds
+analyzer by analyzer, and exits non-zero if anything is slower by more
+than --tolerance.
+
+Usage:
+    python -m benchmarks.run [--files 500] [--output results.json]
+                             [--baseline previous.json] [--tolerance 0.15]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from benchmarks.synthetic import RepoSpec, add_spec_arguments, generate_repo, spec_from_args
+from mohtion import __version__
+from mohtion.agent.scanner import Scanner
+from mohtion.analyzers.base import Analyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import DEFAULT_ANALYZERS, RepoConfig
+
+# Every analyzer, including the opt-in ones
+ALL_ANALYZERS = [*DEFAULT_ANALYZERS, "deprecations"]
+
+
+def _peak_rss_kib(who: int) -> int:
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _TimedHandler:
+    """Stands in for a NodeHandler, adding the time spent in each of its methods to a total."""
+
+    def __init__(self, handler: NodeHandler, totals: dict[str, float]) -> None:
+        self._handler = handler
+        self._totals = totals
+
+    def __getattr__(self, attr: str) -> Any:
+        # The walk looks callbacks up with getattr, once per node type per file
+        method = getattr(self._handler, attr)
+        if not callable(method):
+            return method
+        totals = self._totals
+
+        def timed(*args: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                totals["handler_seconds"] += time.perf_counter() - start
+
+        return timed
+
+
+class _TimedAnalyzer:
+    """Stands in for an Analyzer, timing its handlers and its finalize() pass."""
+
+    def __init__(self, analyzer: Analyzer, totals: dict[str, float]) -> None:
+        self._analyzer = analyzer
+        self._totals = totals
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._analyzer, attr)
+
+    def create_handler(self, parsed: ParsedFile) -> _TimedHandler:
+        start = time.perf_counter()
+        handler = self._analyzer.create_handler(parsed)
+        self._totals["handler_seconds"] += time.perf_counter() - start
+        return _TimedHandler(handler, self._totals)
+
+    def finalize(self, summaries: dict[Path, Any]) -> list:
+        start = time.perf_counter()
+        try:
+            return self._analyzer.finalize(summaries)
+        finally:
+            self._totals["finalize_seconds"] += time.perf_counter() - start
+
+
+def _run_case(
+    repo_path: Path, analyzers: list[str], workers: int, file_count: int, profile: bool = False
+) -> dict:
+    """Run one scan in this process and measure it (and each analyzer in it, if profiling)."""
+    config = RepoConfig(analyzers=analyzers)
+    scanner = Scanner(repo_path, config, workers=workers, use_git_index=False)
+    totals: dict[str, dict[str, float]] = {}
+    if profile:
+        # Pool workers build their own analyzers, so profiling needs a serial scan
+        assert workers == 1
+        for analyzer in scanner.analyzers:
+            totals[analyzer.name] = {"handler_seconds": 0.0, "finalize_seconds": 0.0}
+        scanner.analyzers = [
+            _TimedAnalyzer(analyzer, totals[analyzer.name])  # type: ignore[misc]
+            for analyzer in scanner.analyzers
+        ]
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    targets = asyncio.run(scanner.scan())
+    seconds = time.perf_counter() - start
+
+    case: dict = {
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(time.process_time() - cpu_start, 4),
+        "files_per_second": round(file_count / seconds, 1),
+        "targets": len(targets),
+        "peak_rss_kib": _peak_rss_kib(resource.RUSAGE_SELF),
+        # Largest pool worker, if the scan used a pool
+        "worker_peak_rss_kib": _peak_rss_kib(resource.RUSAGE_CHILDREN),
+    }
+    if profile:
+        case["analyzers"] = {
+            name: {
+                "seconds": round(times["handler_seconds"] + times["finalize_seconds"], 4),
+                "handler_seconds": round(times["handler_seconds"], 4),
+                "finalize_seconds": round(times["finalize_seconds"], 4),
+                "share": round((times["handler_seconds"] + times["finalize_seconds"]) / seconds, 4),
+            }
+            for name, times in totals.items()
+        }
+        case["shared_seconds"] = round(
+            seconds - sum(times["seconds"] for times in case["analyzers"].values()), 4
+        )
+    return case
+
+
+def _case_entry(queue, *args) -> None:  # type: ignore[no-untyped-def]
+    queue.put(_run_case(*args))
+
+
+def measure(
+    repo_path: Path, analyzers: list[str], workers: int, file_count: int, profile: bool = False
+) -> dict:
+    """Run one case in a fresh spawned process and return its measurements."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_case_entry, args=(queue, repo_path, analyzers, workers, file_count, profile)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def cases(workers: int) -> list[tuple[str, list[str], int]]:
+    """(name, analyzers, workers) for every benchmark case."""
+    return [
+        ("scan", ALL_ANALYZERS, workers),
+        ("scan_serial", ALL_ANALYZERS, 1),
+    ]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every case or analyzer that got slower than the baseline by more than tolerance."""
+    if baseline.get("spec") != results["spec"]:
+        print("warning: baseline was generated with different repository parameters")
+
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        ratio = current["files_per_second"] / previous["files_per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{name}: {current['files_per_second']:.0f} files/s, "
+                f"was {previous['files_per_second']:.0f} ({ratio - 1:+.0%})"
+            )
+    previous_analyzers = baseline.get("profile", {}).get("analyzers", {})
+    for name, current in results["profile"]["analyzers"].items():
+        previous = previous_analyzers.get(name)
+        if previous is None or not previous["seconds"]:
+            continue
+        ratio = current["seconds"] / previous["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"analyzer {name}: {current['seconds']:.3f}s, "
+                f"was {previous['seconds']:.3f}s ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(parser)
+    parser.add_argument("--workers", type=int, default=0, help="Pool size for the scan case")
+    parser.add_argument("--output", type=Path, help="Write results as JSON here")
+    parser.add_argument("--baseline", type=Path, help="Previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    spec: RepoSpec = spec_from_args(args)
+
+    results: dict = {
+        "mohtion_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": asdict(spec),
+        "cases": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="mohtion-bench-") as tmp:
+        repo_path = Path(tmp)
+        file_count = len(generate_repo(repo_path, spec))
+        print(f"{'case':<28} {'files/s':>9} {'seconds':>8} {'peak MiB':>9} {'targets':>8}")
+        for name, analyzers, workers in cases(args.workers):
+            case = measure(repo_path, analyzers, workers, file_count)
+            results["cases"][name] = case
+            peak = max(case["peak_rss_kib"], case["worker_peak_rss_kib"]) / 1024
+            print(
+                f"{name:<28} {case['files_per_second']:>9.0f} {case['seconds']:>8.2f} "
+                f"{peak:>9.1f} {case['targets']:>8}"
+            )
+
+        # Each analyzer's own time, inside one scan that shares the rest
+        profile = measure(repo_path, ALL_ANALYZERS, 1, file_count, profile=True)
+        results["profile"] = profile
+        print(f"\n{'analyzer (one serial scan)':<28} {'seconds':>9} {'finalize':>8} {'share':>9}")
+        for name, times in profile["analyzers"].items():
+            print(
+                f"{name:<28} {times['seconds']:>9.3f} {times['finalize_seconds']:>8.3f} "
+                f"{times['share']:>9.0%}"
+            )
+        shared = profile["shared_seconds"]
+        share = shared / profile["seconds"]
+        print(f"{'shared (IO, parse, walk)':<28} {shared:>9.3f} {'':>8} {share:>9.0%}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Deterministic generator of synthetic Python repositories for benchmarks.
+
+The same parameters and seed always produce byte-identical files, so scan
+timings taken on different versions of Mohtion are comparable.
+
+Usage:
+    python -m benchmarks.synthetic OUTPUT_DIR [--files 500] [--seed 0] ...
+"""
+
+import argparse
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+_CONDITIONS = (
+    "{a} > {n}",
+    "{a} % {m} == 0",
+    "{a} and {b}",
+    "not {a} or {b} < {n}",
+    "{a} in {items}",
+)
+_STATEMENTS = (
+    "{a} = {b} + {n}",
+    "{items}.append({a})",
+    "{a} = [v for v in {items} if v % {m}]",
+    "{b} = {a} * {m} if {a} else {n}",
+    "total += len({items})",
+)
+_BLOCKS = ("if", "for", "while", "with", "try")
+
+
+@dataclass(frozen=True)
+class RepoSpec:
+    """Shape of a synthetic repository."""
+
+    files: int = 500
+    functions_per_file: int = 12
+    function_size: int = 20  # Statements per function, roughly
+    nesting_depth: int = 4  # Deepest block nesting inside a function
+    duplicate_rate: float = 0.1  # Share of functions copied (renamed) from elsewhere
+    annotated_rate: float = 0.5  # Share of functions with type hints
+    files_per_package: int = 50
+    seed: int = 0
+
+
+class _FunctionWriter:
+    """Emits one function body with random statements and nested blocks."""
+
+    def __init__(self, rng: random.Random, spec: RepoSpec) -> None:
+        self.rng = rng
+        self.spec = spec
+        self.lines: list[str] = []
+
+    def _fill(self, template: str) -> str:
+        rng = self.rng
+        return template.format(
+            a=rng.choice(("x", "y", "count")),
+            b=rng.choice(("x", "y", "count")),
+            items="items",
+            n=rng.randint(0, 99),
+            m=rng.randint(2, 9),
+        )
+
+    def _block(self, depth: int, budget: int) -> int:
+        """Write statements (opening nested blocks) until budget runs out."""
+        indent = "    " * (depth + 1)
+        written = 0
+        while written < budget:
+            room = budget - written
+            if depth < self.spec.nesting_depth and room > 2 and self.rng.random() < 0.35:
+                kind = self.rng.choice(_BLOCKS)
+                header = {
+                    "if": f"if {self._fill(self.rng.choice(_CONDITIONS))}:",
+                    "for": "for item in items:",
+                    "while": f"while count < {self.rng.randint(1, 50)}:",
+                    "with": "with open(path) as handle:",
+                    "try": "try:",
+                }[kind]
+                self.lines.append(indent + header)
+                inner = self._block(depth + 1, self.rng.randint(1, max(1, room // 2)))
+                if kind == "while":
+                    self.lines.append(indent + "    count += 1")
+                elif kind == "try":
+                    self.lines.append(indent + "except (OSError, ValueError):")
+                    self.lines.append(indent + "    count = 0")
+                written += inner + 1
+            else:
+                self.lines.append(indent + self._fill(self.rng.choice(_STATEMENTS)))
+                written += 1
+        return written
+
+    def write(self, name: str, annotated: bool) -> str:
+        if annotated:
+            signature = (
+                f"def {name}(x: int, y: int, items: list[int], path: str) -> int:"
+            )
+        else:
+            signature = f"def {name}(x, y, items, path):"
+        self.lines = [signature, "    count = total = 0"]
+        self._block(0, self.spec.function_size)
+        self.lines.append("    return count + total")
+        return "\n".join(self.lines)
+
+
+def generate_repo(root: Path, spec: RepoSpec) -> list[Path]:
+    """
+    Write a synthetic repository under root.
+
+    Args:
+        root: Directory to write into (created if needed)
+        spec: Shape of the repository
+
+    Returns:
+        Paths of the generated files, relative to root
+    """
+    rng = random.Random(spec.seed)
+    written: list[Path] = []
+    # Bodies of earlier functions, for duplicates to copy from
+    originals: list[str] = []
+
+    for file_index in range(spec.files):
+        relative = Path(f"pkg{file_index // spec.files_per_package}/module_{file_index}.py")
+        functions = ['"""Synthetic module."""', ""]
+
+        for function_index in range(spec.functions_per_file):
+            name = f"func_{file_index}_{function_index}"
+            if originals and rng.random() < spec.duplicate_rate:
+                # Same structure under a new name: what the duplicates analyzer must find
+                body = rng.choice(originals)
+                source = f"def {name}(" + body.split("(", 1)[1]
+            else:
+                writer = _FunctionWriter(rng, spec)
+                source = writer.write(name, annotated=rng.random() < spec.annotated_rate)
+                originals.append(source)
+            functions.extend([source, "", ""])
+
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(functions).rstrip() + "\n")
+        written.append(relative)
+
+    return written
+
+
+def spec_from_args(args: argparse.Namespace) -> RepoSpec:
+    """Build a RepoSpec from parsed add_spec_arguments options."""
+    return RepoSpec(**{name: getattr(args, name) for name in asdict(RepoSpec())})
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add one option per RepoSpec field."""
+    for name, default in asdict(RepoSpec()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", type=Path)
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    files = generate_repo(args.output, spec_from_args(args))
+    print(f"Wrote {len(files)} files")
+
+
+if __name__ == "__main__":
+    main()
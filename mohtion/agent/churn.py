@@ -0,0 +1,258 @@
+"""Change frequency of files and line ranges, from one streamed pass over git history."""
+
+import codecs
+import json
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from git import GitCommandError, InvalidGitRepositoryError, NoSuchPathError, Repo
+
+from mohtion.cache import DiskCache
+from mohtion.models.repo_config import ChurnConfig
+from mohtion.models.target import TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+_HUNK = re.compile(rb"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# Marks the start of each commit in the log stream
+_COMMIT_MARK = b"\0"
+
+# Bump when the stored index layout changes
+FORMAT = "1"
+
+
+def _header_path(raw: bytes) -> str | None:
+    """Path from a "--- a/x" / "+++ b/x" line, or None for /dev/null."""
+    name = raw[4:].rstrip(b"\n")
+    if name == b"/dev/null":
+        return None
+    if name.startswith(b'"'):
+        # Quoted because of special characters, with C-style escapes
+        name = codecs.escape_decode(name[1:-1])[0]
+    return name[2:].decode("utf-8", errors="surrogateescape")
+
+
+def _to_parent(line: int, hunks: list[int], is_end: bool) -> int:
+    """
+    Map a line number in a commit's version of a file to its parent's version.
+
+    Lines inside code the commit added map onto the edges of what it
+    replaced, so a span shrinks to nothing if the commit created it.
+    """
+    shift = 0
+    for i in range(0, len(hunks), 4):
+        old_start, old_len, new_start, new_len = hunks[i : i + 4]
+        if new_len and new_start <= line < new_start + new_len:
+            if is_end:
+                return old_start + old_len - 1 if old_len else old_start
+            return old_start if old_len else old_start + 1
+        if line < new_start + (new_len or 1):
+            break
+        shift += old_len - new_len
+    return line + shift
+
+
+@dataclass
+class ChurnIndex:
+    """
+    Which commits touched which lines of the files at HEAD.
+
+    For every file, the hunks of each commit that changed it are kept
+    (newest first) in the coordinates of that commit's version of the file,
+    as flat [old_start, old_len, new_start, new_len, ...] lists. A line range
+    of the current file is traced back through them one commit at a time, so
+    code that moved since is still credited with its own history.
+    """
+
+    head: str
+    files: dict[str, list[list[int]]] = field(default_factory=dict)
+
+    def file_churn(self, path: Path) -> int:
+        """Number of commits in the window that changed a file."""
+        return len(self.files.get(path.as_posix(), ()))
+
+    def span_churn(self, path: Path, start_line: int, end_line: int) -> int:
+        """Number of commits in the window that changed a 1-indexed, inclusive line range."""
+        touched = 0
+        for hunks in self.files.get(path.as_posix(), ()):
+            for i in range(0, len(hunks), 4):
+                new_start, new_len = hunks[i + 2], hunks[i + 3]
+                if new_len:
+                    hit = new_start <= end_line and new_start + new_len > start_line
+                else:
+                    # A pure deletion sits between new_start and the line after it
+                    hit = start_line <= new_start < end_line
+                if hit:
+                    touched += 1
+                    break
+            start_line = _to_parent(start_line, hunks, is_end=False)
+            end_line = _to_parent(end_line, hunks, is_end=True)
+            if start_line > end_line:
+                break  # The range was written by this commit
+        return touched
+
+    def weight(self, target: TechDebtTarget) -> float:
+        """Ranking multiplier for a target: 1 for untouched code, growing slowly with churn."""
+        churn = self.span_churn(target.file_path, target.start_line, target.end_line)
+        return 1.0 + math.log1p(churn)
+
+    def to_json(self) -> bytes:
+        return json.dumps({"head": self.head, "files": self.files}).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "ChurnIndex":
+        payload = json.loads(data)
+        return cls(head=payload["head"], files=payload["files"])
+
+
+def _parse_log(stream, head: str) -> ChurnIndex:  # type: ignore[no-untyped-def]
+    """Build an index from `git log -p -U0` output, newest commit first."""
+    index = ChurnIndex(head=head)
+    # Paths whose history at HEAD ends here: created, or deleted (and re-created later)
+    closed: set[str] = set()
+    in_header = False
+    old_path: str | None = None
+    path: str | None = None
+    hunks: list[int] | None = None
+
+    for line in stream:
+        if in_header:
+            if line.startswith(b"--- "):
+                old_path = _header_path(line)
+            elif line.startswith(b"+++ "):
+                path = _header_path(line)
+                if path is None:
+                    # Deleted: older history belongs to a file that's gone
+                    closed.add(old_path or "")
+                elif path not in closed:
+                    hunks = []
+                    index.files.setdefault(path, []).append(hunks)
+            elif line.startswith(b"@@"):
+                in_header = False
+        if line.startswith(b"diff --git "):
+            if path is not None and old_path is None:
+                closed.add(path)  # The previous file was created by this commit
+            in_header = True
+            old_path = path = None
+            hunks = None
+            continue
+        if line.startswith(_COMMIT_MARK):
+            if path is not None and old_path is None:
+                closed.add(path)
+            in_header = False
+            old_path = path = None
+            hunks = None
+            continue
+        if hunks is not None and line.startswith(b"@@"):
+            match = _HUNK.match(line)
+            if match:
+                old_start, old_len, new_start, new_len = match.groups()
+                hunks.extend((
+                    int(old_start),
+                    1 if old_len is None else int(old_len),
+                    int(new_start),
+                    1 if new_len is None else int(new_len),
+                ))
+
+    # Drop commits that changed no lines (e.g. created an empty file)
+    for path, commits in list(index.files.items()):
+        commits[:] = [hunks for hunks in commits if hunks]
+        if not commits:
+            del index.files[path]
+    return index
+
+
+def build_churn_index(
+    repo_path: Path, config: ChurnConfig, suffixes: tuple[str, ...] = (".py",)
+) -> ChurnIndex | None:
+    """
+    Read the history window in one streamed `git log` and index it.
+
+    Only hunk headers are parsed (with zero context lines), so memory stays
+    proportional to the number of hunks rather than the size of the diffs.
+    Renames are not followed: a renamed file's history starts at the rename.
+
+    Args:
+        repo_path: Root of a git checkout
+        config: History window
+        suffixes: File extensions worth indexing
+
+    Returns:
+        The index, or None if repo_path isn't a usable git checkout
+    """
+    try:
+        repo = Repo(repo_path)
+        head = repo.head.commit
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError) as e:
+        logger.info(f"No history for churn ranking: {e}")
+        return None
+
+    args = [
+        "--no-merges",
+        "--no-renames",
+        "--no-color",
+        "--no-ext-diff",
+        "--format=%x00%H",
+        "--patch",
+        "--unified=0",
+        "--src-prefix=a/",
+        "--dst-prefix=b/",
+        f"--max-count={config.max_commits}",
+    ]
+    if config.since_days is not None:
+        # Relative to HEAD, so the window (and cached index) only depends on HEAD
+        args.append(f"--since={head.committed_date - config.since_days * 86400}")
+    args += [head.hexsha, "--", *(f"*{suffix}" for suffix in suffixes)]
+
+    try:
+        process = repo.git(c="core.quotepath=off").log(*args, as_process=True)
+        index = _parse_log(process.proc.stdout, head.hexsha)
+        process.wait()
+    except GitCommandError as e:
+        logger.warning(f"Failed to read history for churn ranking: {e}")
+        return None
+
+    logger.info(f"Churn index: {len(index.files)} files changed in the history window")
+    return index
+
+
+def load_churn_index(
+    repo_path: Path,
+    config: ChurnConfig,
+    suffixes: tuple[str, ...] = (".py",),
+    cache: DiskCache | None = None,
+) -> ChurnIndex | None:
+    """
+    Get the churn index for a checkout's HEAD, building it only on a cache miss.
+
+    Args:
+        repo_path: Root of a git checkout
+        config: History window (part of the cache key)
+        suffixes: File extensions worth indexing (part of the cache key)
+        cache: Where built indexes are kept, keyed by HEAD SHA
+
+    Returns:
+        The index, or None if repo_path isn't a usable git checkout
+    """
+    if cache is None:
+        return build_churn_index(repo_path, config, suffixes)
+
+    try:
+        head = Repo(repo_path).head.commit.hexsha
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError) as e:
+        logger.info(f"No history for churn ranking: {e}")
+        return None
+
+    key = f"{head}/{config.max_commits}/{config.since_days}/{','.join(suffixes)}/{FORMAT}"
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Churn index for {head[:12]} loaded from cache")
+        return ChurnIndex.from_json(cached)
+
+    index = build_churn_index(repo_path, config, suffixes)
+    if index is not None:
+        cache.set(key, index.to_json())
+    return index
@@ -0,0 +1,300 @@
+"""Distill test runner output down to what a self-heal needs to see."""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mohtion.llm.usage import estimate_tokens
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*m")
+
+# pytest
+_SECTION = re.compile(r"^={3,} (.+?) ={3,}$")
+_TEST_HEADER = re.compile(r"^_{3,} (.+?) _{3,}$")
+_FRAME_SEPARATOR = re.compile(r"^(?:_ ){3,}_?\s*$")
+_CAPTURED = re.compile(r"^-{3,} Captured .+ -{3,}$")
+_SHORT_LOCATION = re.compile(r"^(\S+):\d+: in \S+$")  # Opens a --tb=short style frame
+_LONG_LOCATION = re.compile(r"^(\S+):\d+: (?:[\w.]+)?\s*$")  # Closes a --tb=long frame
+_RESULT_COUNTS = re.compile(r"\b\d+ (?:failed|passed|errors?|skipped)\b")
+
+# unittest and plain Python tracebacks
+_UNITTEST_RULE = "=" * 70
+_UNITTEST_DASHES = "-" * 70
+_UNITTEST_HEADER = re.compile(r"^(?:FAIL|ERROR): (\S+) \((.+)\)")
+_PY_FRAME = re.compile(r'^\s*File "(.+?)", line \d+, in \S+')
+
+_CARETS = re.compile(r"^\s*[~^]+\s*$")
+# Dependency installation chatter that ends up in front of the test output
+_PIP_NOISE = re.compile(
+    r"^(?:Requirement already satisfied|Collecting |Downloading |\s+Downloading |"
+    r"\s+Using cached |Installing collected packages|Successfully installed|"
+    r"\s*━|\s*\|?[█▌ ]+\|)"
+)
+
+# Lines kept per part of a failure, so one huge diff doesn't take the whole budget
+MAX_ERROR_LINES = 20
+MAX_FRAME_LINES = 20
+MAX_OTHER_LINES = 20
+MAX_LISTED_FAILURES = 20
+CONTEXT_LINES = 2  # Source lines kept above the failing line of a frame in the repo
+
+
+@dataclass
+class Failure:
+    """One failing (or erroring) test and its report."""
+
+    test_id: str
+    lines: list[str] = field(default_factory=list)
+
+
+def distill_test_output(
+    output: str,
+    file_path: Path | str,
+    function_name: str | None = None,
+    max_tokens: int = 2000,
+) -> str:
+    """
+    Reduce test output to the failing tests, their errors and the relevant frames.
+
+    pytest and unittest reports are parsed into failures; each keeps its
+    error and assertion diff lines and the traceback frames in the
+    repository (in full for the modified file), while frames in installed
+    packages, captured output and passing-test noise are dropped. Failures
+    that touch the modified file or function come first, and whatever
+    doesn't fit max_tokens is left out. Output that isn't recognized is
+    reduced to its tail.
+
+    Args:
+        output: Raw test command output
+        file_path: The file that was refactored (repository-relative)
+        function_name: The refactored function, if known
+        max_tokens: Budget for the distilled text
+
+    Returns:
+        The distilled output
+    """
+    lines = [_ANSI.sub("", line).rstrip() for line in output.splitlines()]
+    failures, summary = _parse_pytest(lines)
+    if not failures:
+        failures, summary = _parse_unittest(lines)
+    if not failures:
+        return _tail(lines, max_tokens)
+
+    target = str(file_path)
+    markers = [target] + ([function_name] if function_name else [])
+
+    def relevant(failure: Failure) -> bool:
+        return any(marker in line for line in failure.lines for marker in markers)
+
+    failures.sort(key=lambda failure: not relevant(failure))
+
+    listed = summary or [f"FAILED {failure.test_id}" for failure in failures]
+    head = listed[:MAX_LISTED_FAILURES]
+    if len(listed) > MAX_LISTED_FAILURES:
+        head.append(f"[... {len(listed) - MAX_LISTED_FAILURES} more]")
+    parts = ["\n".join(head)]
+    budget = max_tokens - estimate_tokens(parts[0])
+
+    for count, failure in enumerate(failures):
+        body = _prune(failure.lines, target)
+        block = "\n".join([f"___ {failure.test_id} ___", *body])
+        if estimate_tokens(block) > budget:
+            if count > 0:
+                parts.append(f"[... {len(failures) - count} more failure(s) omitted]")
+                break
+            # The most relevant failure always goes in, clipped to fit
+            block = "\n".join(_clip(block.split("\n"), budget))
+        parts.append(block)
+        budget -= estimate_tokens(block)
+    return "\n\n".join(parts)
+
+
+def _parse_pytest(lines: list[str]) -> tuple[list[Failure], list[str]]:
+    """Failures from the FAILURES/ERRORS sections, and the summary lines."""
+    failures: list[Failure] = []
+    summary: list[str] = []
+    section = ""
+    for line in lines:
+        match = _SECTION.match(line)
+        if match:
+            section = match.group(1).strip()
+            if _RESULT_COUNTS.search(section):
+                summary.append(section)
+            continue
+        if section in ("FAILURES", "ERRORS"):
+            match = _TEST_HEADER.match(line)
+            if match:
+                failures.append(Failure(match.group(1)))
+            elif failures:
+                failures[-1].lines.append(line)
+        elif section == "short test summary info" and line.startswith(("FAILED", "ERROR")):
+            summary.append(line)
+    return failures, summary
+
+
+def _parse_unittest(lines: list[str]) -> tuple[list[Failure], list[str]]:
+    """Failures between unittest's ===== rules, and the Ran/FAILED lines."""
+    failures: list[Failure] = []
+    summary: list[str] = []
+    current: Failure | None = None
+    for line in lines:
+        if line == _UNITTEST_RULE:
+            current = None
+            continue
+        match = _UNITTEST_HEADER.match(line)
+        if match and current is None:
+            current = Failure(f"{match.group(2)} ({match.group(1)})")
+            failures.append(current)
+            continue
+        if line.startswith("Ran ") or line.startswith("FAILED ("):
+            summary.append(line)
+            current = None
+        elif current is not None and line != _UNITTEST_DASHES:
+            current.lines.append(line)
+    return failures, summary if failures else []
+
+
+def _is_installed(path: str) -> bool:
+    """Whether a frame's file is outside the repository (stdlib or site-packages)."""
+    return "site-packages" in path or "/lib/python" in path or path.startswith("<frozen")
+
+
+def _prune(lines: list[str], target: str) -> list[str]:
+    """Keep a failure's errors and repository frames, in order; drop everything else."""
+    kept: list[str] = []
+    skipped = 0
+    for path, segment in _segments(lines):
+        errors = [line for line in segment if line.startswith("E ")][:MAX_ERROR_LINES]
+        if path is not None and _is_installed(path):
+            skipped += 1
+            kept.extend(errors)  # The exception is often raised in library code
+            continue
+        if skipped:
+            kept.append(f"[... {skipped} frame(s) in installed packages]")
+            skipped = 0
+        if path is None:
+            # Exception messages and diffs outside a frame (plain Python tracebacks)
+            kept.extend(_clip_lines([line for line in segment if line.strip()], MAX_OTHER_LINES))
+            continue
+
+        segment = [line for line in segment if line.strip() and not _CARETS.match(line)]
+        if not segment:
+            continue
+        if path.endswith(target) or _PY_FRAME.match(segment[0]):
+            # The modified file, or a plain Python frame (location and one line): all of it
+            source = [i for i, line in enumerate(segment) if not line.startswith("E ")]
+            keep = set(source[:MAX_FRAME_LINES])
+        else:
+            keep = set()
+            for i, line in enumerate(segment):
+                if line.startswith(">"):
+                    keep.update(range(max(0, i - CONTEXT_LINES), i + 1))
+                elif _is_location(line):
+                    keep.add(i)
+        errors_at = [i for i, line in enumerate(segment) if line.startswith("E ")]
+        keep.update(errors_at[:MAX_ERROR_LINES])
+        kept.extend(line for i, line in enumerate(segment) if i in keep)
+    if skipped:
+        kept.append(f"[... {skipped} frame(s) in installed packages]")
+    return kept
+
+
+def _segments(lines: list[str]) -> list[tuple[str | None, list[str]]]:
+    """
+    A failure report split into traceback frames (file path, lines) and the lines between them.
+
+    Handles pytest's own tracebacks (frames between "_ _ _" separators, or
+    opened by "path:N: in func" lines) and plain Python tracebacks. Captured
+    output sections are dropped.
+    """
+    segments: list[tuple[str | None, list[str]]] = []
+    current: list[str] = []
+    path: str | None = None
+    python = False  # Inside a plain Python traceback rather than a pytest one
+    captured = False
+
+    def close(next_path: str | None = None) -> None:
+        nonlocal current, path
+        if current:
+            segments.append((path, current))
+        current, path = [], next_path
+
+    for line in lines:
+        if _CAPTURED.match(line):
+            close()
+            captured = True  # Captured stdout/logs: noise for a self-heal
+            continue
+        if captured:
+            continue
+        if line.startswith("Traceback (most recent call last)"):
+            close()
+            python = True
+            current.append(line)
+            continue
+        match = _PY_FRAME.match(line) if python else _SHORT_LOCATION.match(line)
+        if match:
+            close(match.group(1))
+            current.append(line)
+            continue
+        if python:
+            # A frame's source lines are indented; the exception message after them isn't
+            if path is not None and not line.startswith("    "):
+                close()
+            current.append(line)
+            continue
+        if _FRAME_SEPARATOR.match(line):
+            close()
+            continue
+        current.append(line)
+        match = _LONG_LOCATION.match(line)
+        if match:
+            path = match.group(1)
+            close()
+    close()
+    return segments
+
+
+def _is_location(line: str) -> bool:
+    return bool(_SHORT_LOCATION.match(line) or _LONG_LOCATION.match(line) or _PY_FRAME.match(line))
+
+
+def _clip_lines(lines: list[str], max_lines: int) -> list[str]:
+    """The first and last lines of a long run of lines."""
+    if len(lines) <= max_lines:
+        return lines
+    half = max_lines // 2
+    return lines[:half] + [f"[... {len(lines) - 2 * half} lines omitted]"] + lines[-half:]
+
+
+def _clip(lines: list[str], max_tokens: int) -> list[str]:
+    """Keep the start and end of lines within a budget (a third for the start)."""
+    head: list[str] = []
+    budget = max(max_tokens, 1) // 3
+    for line in lines:
+        budget -= estimate_tokens(line)
+        if budget < 0:
+            break
+        head.append(line)
+    tail: list[str] = []
+    budget = max(max_tokens, 1) - max(max_tokens, 1) // 3
+    for line in reversed(lines[len(head) :]):
+        budget -= estimate_tokens(line)
+        if budget < 0:
+            break
+        tail.append(line)
+    omitted = len(lines) - len(head) - len(tail)
+    return head + ([f"[... {omitted} lines omitted]"] if omitted else []) + tail[::-1]
+
+
+def _tail(lines: list[str], max_tokens: int) -> str:
+    """Unrecognized output: the end (where errors are reported), without installer chatter."""
+    lines = [line for line in lines if line and not _PIP_NOISE.match(line)]
+    kept: list[str] = []
+    budget = max_tokens
+    for line in reversed(lines):
+        budget -= estimate_tokens(line)
+        if budget < 0:
+            kept.append(f"[... {len(lines) - len(kept)} earlier lines omitted]")
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
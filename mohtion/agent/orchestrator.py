@@ -1,14 +1,25 @@
 """Orchestrator - Main agent loop coordinator."""
 
+import asyncio
+import dataclasses
 import logging
 import uuid
 from pathlib import Path
 
-from mohtion.agent.refactor import Refactor
+from mohtion.agent.refactor import Refactor, RefactorResult
 from mohtion.agent.scanner import Scanner
-from mohtion.agent.verifier import Verifier
+from mohtion.agent.source_store import SourceStore
+from mohtion.agent.speculative import race_candidates
+from mohtion.agent.verifier import TestResult, Verifier
+from mohtion.analyzers.cache import AnalysisCache
+from mohtion.cache import DiskCache
 from mohtion.config import get_settings
 from mohtion.integrations.github_api import GitHubAPI
+from mohtion.llm.client import LLMClient
+from mohtion.llm.rate_limit import RateLimitTimeout
+from mohtion.llm.response_cache import ResponseCache
+from mohtion.llm.tiers import Tier, TierRouter, TierStats
+from mohtion.loop_lag import LoopLagMonitor
 from mohtion.models.bounty import BountyResult, BountyStatus
 from mohtion.models.repo_config import RepoConfig
 
@@ -23,11 +34,41 @@ class Orchestrator:
     tech debt hunting and fixing process.
     """
 
-    def __init__(self, github_api: GitHubAPI, owner: str, repo: str) -> None:
+    def __init__(
+        self,
+        github_api: GitHubAPI,
+        owner: str,
+        repo: str,
+        scan_slots: asyncio.Semaphore | None = None,
+        lag_monitor: LoopLagMonitor | None = None,
+    ) -> None:
+        """
+        Args:
+            github_api: Authenticated GitHub client for the installation
+            owner: Repository owner
+            repo: Repository name
+            scan_slots: Limit on concurrent scans shared by the worker's jobs
+            lag_monitor: The worker's event loop lag monitor
+        """
         self.github_api = github_api
         self.owner = owner
         self.repo = repo
         self.settings = get_settings()
+        self.scan_slots = scan_slots
+        self.lag_monitor = lag_monitor
+        self.router = TierRouter.from_settings(self.settings)
+        # Set up by prepare(), released by close()
+        self.base_branch = "main"
+        self.repo_path: Path | None = None
+        self.config: RepoConfig | None = None
+        self.store: SourceStore | None = None
+        self.bounty: BountyResult | None = None
+        self.llm: LLMClient | None = None
+        self.response_cache: ResponseCache | None = None
+        self.refactor: Refactor | None = None
+        self.tier_stats: TierStats | None = None
+        # Set by suspend(), for finish() to clone the same commit again
+        self.scanned_commit: str | None = None
 
     async def run(self, base_branch: str = "main") -> BountyResult | None:
         """
@@ -38,142 +79,442 @@ class Orchestrator:
 
         Returns:
             BountyResult if a PR was opened, None if no targets found
-        """
-        repo_path: Path | None = None
 
+        Raises:
+            RateLimitTimeout: No LLM capacity in time; the bounty is deferred
+        """
         try:
-            # Clone the repository
-            logger.info(f"Cloning {self.owner}/{self.repo}...")
-            repo_path = await self.github_api.clone_repo(self.owner, self.repo)
-            logger.info(f"Cloned to {repo_path}")
-
-            # Load repo config
-            config = RepoConfig.from_file(repo_path / ".mohtion.yaml")
-
-            # Phase 1: RECONNAISSANCE
-            logger.info("Phase 1: Reconnaissance")
-            scanner = Scanner(repo_path, config)
-            target = await scanner.get_top_target()
-
-            if not target:
-                logger.info("No tech debt targets found")
+            bounty = await self.prepare(base_branch)
+            if bounty is None:
                 return None
 
-            logger.info(f"Target acquired: {target}")
-
-            # Create bounty tracking
-            branch_name = f"mohtion/bounty-{uuid.uuid4().hex[:8]}"
-            bounty = BountyResult(
-                target=target,
-                status=BountyStatus.IN_PROGRESS,
-                branch_name=branch_name,
+            # Phase 2: REFACTORING
+            logger.info("Phase 2: Refactoring")
+            assert self.refactor is not None
+            tier = self.router.route(bounty.target)
+            if self.settings.speculative_candidates > 1:
+                return await self.speculate(tier)
+            # The code is checked and applied as soon as it streams in
+            result = await self.refactor.refactor_target(
+                bounty.target, apply=True, model=tier.model
             )
+            return await self.finish(result)
 
-            # Create feature branch
-            self.github_api.create_branch(repo_path, base_branch)
-            actual_branch = self.github_api.create_branch(repo_path, base_branch)
-            bounty.branch_name = actual_branch
+        except RateLimitTimeout as e:
+            if self.bounty is not None:
+                self.bounty.mark_deferred(str(e))
+            raise
 
-            # Phase 2: REFACTORING
-            logger.info("Phase 2: Refactoring")
-            refactor = Refactor(repo_path)
-            result = await refactor.refactor_target(target)
+        except Exception as e:
+            logger.exception("Orchestrator failed")
+            raise
 
-            if not result.success:
-                bounty.mark_failed(f"Refactoring failed: {result.error}")
-                return bounty
+        finally:
+            await self.close()
 
-            bounty.original_code = result.original_code
-            bounty.refactored_code = result.refactored_code
-            bounty.refactoring_summary = result.summary
+    async def prepare(self, base_branch: str = "main") -> BountyResult | None:
+        """
+        Clone, scan and branch: everything before the target's refactoring.
 
-            # Apply the refactoring
-            if not await refactor.apply_refactoring(target, result.refactored_code):
-                bounty.mark_failed("Failed to apply refactoring")
-                return bounty
+        run() does this itself; a sweep calls it for many repositories,
+        refactors their targets together, then hands each result to finish().
+        close() must be called afterwards either way; suspend() may be
+        called in between to release the clone until finish().
 
-            # Phase 3: VERIFICATION
-            logger.info("Phase 3: Verification")
-            verifier = Verifier(repo_path, config)
-            bounty.status = BountyStatus.TESTING
+        Args:
+            base_branch: The base branch to work from
 
-            for attempt in range(self.settings.max_retries + 1):
-                test_result = await verifier.run_tests()
-                bounty.test_output = test_result.output
-
-                if test_result.passed:
-                    bounty.test_passed = True
-                    break
-
-                # Self-healing attempt
-                if attempt < self.settings.max_retries:
-                    logger.info(f"Tests failed, attempting self-heal (attempt {attempt + 1})")
-                    bounty.status = BountyStatus.RETRYING
-                    bounty.retry_count = attempt + 1
-
-                    heal_result = await refactor.attempt_self_heal(
-                        target,
-                        bounty.refactored_code,
-                        test_result.output,
-                    )
-
-                    if heal_result.success:
-                        bounty.refactored_code = heal_result.refactored_code
-                        bounty.refactoring_summary += f"\n\n{heal_result.summary}"
-
-                        # Apply the healed code
-                        await refactor.apply_refactoring(target, heal_result.refactored_code)
-                    else:
-                        bounty.mark_failed(f"Self-heal failed: {heal_result.error}")
-                        return bounty
-
-            if not bounty.test_passed:
-                bounty.mark_failed("Tests failed after max retries")
-                return bounty
+        Returns:
+            The bounty for the top target, None if no targets found
+        """
+        self.base_branch = base_branch
+
+        # Clone the repository
+        logger.info(f"Cloning {self.owner}/{self.repo}...")
+        self.repo_path = repo_path = await self.github_api.clone_repo(self.owner, self.repo)
+        logger.info(f"Cloned to {repo_path}")
 
-            # Phase 4: BOUNTY CLAIM
-            logger.info("Phase 4: Opening PR")
+        # Load repo config
+        self.config = config = RepoConfig.from_file(repo_path / ".mohtion.yaml")
 
-            # Commit the changes
-            commit_message = f"refactor: {target.description}\n\nMohtion Bounty: {bounty.branch_name}"
-            self.github_api.commit_changes(
+        # Every phase reads and edits files through one store
+        self.store = SourceStore(repo_path)
+
+        # Phase 1: RECONNAISSANCE
+        logger.info("Phase 1: Reconnaissance")
+        analysis_cache = self._open_analysis_cache()
+        churn_cache = self._open_churn_cache(config)
+        try:
+            scanner = Scanner(
                 repo_path,
-                target.file_path,
-                (repo_path / target.file_path).read_text(),
-                commit_message,
+                config,
+                workers=self.settings.scan_workers,
+                chunk_size=self.settings.scan_chunk_size,
+                parallel_min_files=self.settings.scan_parallel_min_files,
+                cache=analysis_cache,
+                use_git_index=self.settings.scan_use_git_index,
+                max_file_size=self.settings.scan_max_file_bytes,
+                source=self.store,
+                churn_cache=churn_cache,
+                slots=self.scan_slots,
+                lag_monitor=self.lag_monitor,
             )
+            target = await scanner.get_top_target()
+        finally:
+            if analysis_cache is not None:
+                analysis_cache.close()
+            if churn_cache is not None:
+                churn_cache.evict()
+                churn_cache.close()
+
+        if not target:
+            logger.info("No tech debt targets found")
+            return None
+
+        logger.info(f"Target acquired: {target}")
+
+        # Create bounty tracking
+        branch_name = f"mohtion/bounty-{uuid.uuid4().hex[:8]}"
+        self.bounty = bounty = BountyResult(
+            target=target,
+            status=BountyStatus.IN_PROGRESS,
+            branch_name=branch_name,
+        )
+
+        # Create feature branch
+        self.github_api.create_branch(repo_path, base_branch)
+        actual_branch = self.github_api.create_branch(repo_path, base_branch)
+        bounty.branch_name = actual_branch
+
+        self._open_refactor()
+        return bounty
+
+    async def suspend(self) -> None:
+        """
+        Release the clone and what's open for a prepared bounty, keeping the bounty.
 
-            # Push the branch
-            await self.github_api.push_branch(
-                repo_path, self.owner, self.repo, bounty.branch_name
-            )
+        For a sweep, whose bounties wait for their batch for up to a day:
+        holding hundreds of clones and SQLite connections that long isn't
+        worth it. finish() clones the repository again, at the commit that
+        was scanned, so the target's location still holds.
+        """
+        assert self.bounty is not None and self.repo_path is not None
+        assert self.store is not None
+        # Read it while the file is still there
+        _ = self.bounty.target.code_snippet
+        self.scanned_commit = self.github_api.head_commit(self.repo_path)
+        if self.response_cache is not None:
+            self.response_cache.close()
+        if self.tier_stats is not None:
+            self.tier_stats.close()
+        self.store.close()
+        self.github_api.cleanup_repo(self.repo_path)
+        self.response_cache = self.llm = self.refactor = None
+        self.tier_stats = None
+        self.store = None
+        self.repo_path = None
+
+    async def _resume(self) -> None:
+        """Clone a suspended bounty's repository again and branch from the scanned commit."""
+        assert self.bounty is not None and self.scanned_commit is not None
+        logger.info(f"Cloning {self.owner}/{self.repo} again at {self.scanned_commit[:12]}...")
+        self.repo_path = repo_path = await self.github_api.clone_repo(self.owner, self.repo)
+        self.store = SourceStore(repo_path)
+        self.bounty.target.source = self.store
+        # Not pushed yet, so the branch can take a new name
+        self.bounty.branch_name = self.github_api.create_branch(repo_path, self.scanned_commit)
+        self._open_refactor()
+
+    def _open_refactor(self) -> None:
+        """Open the LLM client, its caches and the Refactor for the bounty."""
+        assert self.repo_path is not None and self.store is not None
+        self.response_cache = self._open_response_cache()
+        self.tier_stats = self._open_tier_stats()
+        self.llm = LLMClient(
+            cache=self.response_cache,
+            bypass_cache=self.settings.llm_cache_bypass,
+            model=self.settings.llm_model,
+        )
+        self.refactor = Refactor(
+            self.repo_path,
+            self.store,
+            self.llm,
+            log_max_tokens=self.settings.self_heal_log_max_tokens,
+        )
+
+    async def speculate(self, tier: Tier) -> BountyResult:
+        """
+        Refactor a prepared bounty's target as several candidates racing to pass tests.
+
+        The candidates are generated and verified in parallel worktrees (see
+        race_candidates); the first to pass is applied and finished without
+        testing it again. If none passes, the first one that was tested is
+        finished instead, starting from its failed test run (self-heal and
+        escalation as usual).
+
+        Args:
+            tier: The tier to generate the candidates with
 
-            # Create the PR
-            pr_title = f"[Mohtion] {target.debt_type.value}: {target.function_name or target.file_path.name}"
-            pr_body = self._generate_pr_body(bounty)
-
-            pr_result = await self.github_api.create_pull_request(
-                owner=self.owner,
-                repo=self.repo,
-                branch_name=bounty.branch_name,
-                base_branch=base_branch,
-                title=pr_title,
-                body=pr_body,
+        Returns:
+            The bounty, successful or failed
+        """
+        assert self.bounty is not None and self.refactor is not None
+        assert self.repo_path is not None and self.config is not None
+        target = self.bounty.target
+
+        # Once for every worktree: they share the environment and the test command
+        verifier = Verifier(self.repo_path, self.config)
+        await verifier.install_dependencies()
+        test_command = await verifier.detect_test_command()
+
+        count = self.settings.speculative_candidates
+        logger.info(f"Racing {count} refactoring candidates with {tier.model}")
+        finished = await race_candidates(
+            self.refactor, target, self.config, count, tier.model, test_command
+        )
+
+        tested = [candidate for candidate in finished if candidate.test_result is not None]
+        chosen = next((c for c in tested if c.passed), tested[0] if tested else None)
+        for candidate in finished:
+            if candidate is not chosen:
+                await self._record(tier, candidate.result, candidate.passed)
+
+        if chosen is None:
+            errors = [c.result.error for c in finished if c.result.error]
+            result = RefactorResult(
+                success=False,
+                original_code=target.code_snippet,
+                refactored_code="",
+                summary="",
+                error=errors[0] if errors else "No candidate produced usable code",
+                model=tier.model,
             )
+            return await self.finish(result)
+        # It was applied to its worktree, not yet to the bounty's branch
+        return await self.finish(
+            dataclasses.replace(chosen.result, applied=False), chosen.test_result
+        )
+
+    async def finish(
+        self, result: RefactorResult, test_result: TestResult | None = None
+    ) -> BountyResult:
+        """
+        Apply (if not yet applied), verify and open the PR for a prepared bounty.
+
+        Code from the fast tier that fails (to arrive, parse or pass tests)
+        is escalated to the large tier once, without using up a retry; every
+        attempt's outcome goes to the tier stats.
 
-            bounty.mark_success(pr_result.html_url, pr_result.number)
-            logger.info(f"PR opened: {pr_result.html_url}")
+        Args:
+            result: The refactoring of the bounty's target
+            test_result: The code's test run, if it's already been tested
+                (e.g. a speculative candidate in its own worktree)
 
+        Returns:
+            The bounty, successful or failed
+        """
+        if self.repo_path is None and self.scanned_commit is not None:
+            await self._resume()
+        assert self.bounty is not None and self.refactor is not None
+        assert self.repo_path is not None and self.config is not None
+        bounty, refactor, repo_path = self.bounty, self.refactor, self.repo_path
+        target = bounty.target
+        tier = self.router.tier_of(result.model)
+
+        async def applied(result: RefactorResult) -> bool:
+            return result.success and (
+                result.applied or await refactor.apply_checked(target, result.refactored_code)
+            )
+
+        ok = await applied(result)
+        larger = self.router.escalate(tier)
+        if not ok and larger is not None:
+            await self._record(tier, result, passed=False)
+            logger.info(f"Refactoring failed on the {tier.name} tier, escalating to {larger.model}")
+            tier = larger
+            result = await refactor.refactor_target(target, apply=True, model=tier.model)
+            ok = await applied(result)
+            test_result = None
+        if not ok:
+            await self._record(tier, result, passed=False)
+            if not result.success:
+                bounty.mark_failed(f"Refactoring failed: {result.error}")
+            else:
+                bounty.mark_failed("Failed to apply refactoring")
             return bounty
 
-        except Exception as e:
-            logger.exception("Orchestrator failed")
-            raise
+        bounty.original_code = result.original_code
+        bounty.refactored_code = result.refactored_code
+        bounty.refactoring_summary = result.summary
 
-        finally:
-            # Cleanup cloned repo
-            if repo_path:
-                self.github_api.cleanup_repo(repo_path)
+        # Phase 3: VERIFICATION
+        logger.info("Phase 3: Verification")
+        verifier = Verifier(repo_path, self.config)
+        bounty.status = BountyStatus.TESTING
+
+        retries = 0
+        kind = "refactor"  # Of the call that generated the code under test
+        while True:
+            if test_result is None:
+                test_result = await verifier.run_tests()
+            bounty.test_output = test_result.output
+            await self._record(tier, result, test_result.passed, kind)
+
+            if test_result.passed:
+                bounty.test_passed = True
+                break
+
+            larger = self.router.escalate(tier)
+            if larger is not None:
+                logger.info(f"Tests failed on the {tier.name} tier, escalating to {larger.model}")
+                tier = larger
+            elif retries < self.settings.max_retries:
+                retries += 1
+            else:
+                break
+
+            # Self-healing attempt
+            bounty.status = BountyStatus.RETRYING
+            bounty.retry_count += 1
+            logger.info(f"Tests failed, attempting self-heal (attempt {bounty.retry_count})")
+
+            result = await refactor.attempt_self_heal(
+                target,
+                bounty.refactored_code,
+                test_result.output,
+                apply=True,
+                model=tier.model,
+            )
+            kind = "self_heal"
+            test_result = None
+
+            if result.success:
+                bounty.refactored_code = result.refactored_code
+                bounty.refactoring_summary += f"\n\n{result.summary}"
+            else:
+                await self._record(tier, result, passed=False, kind=kind)
+                bounty.mark_failed(f"Self-heal failed: {result.error}")
+                return bounty
+
+        if not bounty.test_passed:
+            bounty.mark_failed("Tests failed after max retries")
+            return bounty
+
+        # Phase 4: BOUNTY CLAIM
+        logger.info("Phase 4: Opening PR")
+
+        # Commit the changes
+        commit_message = f"refactor: {target.description}\n\nMohtion Bounty: {bounty.branch_name}"
+        # The store already wrote the file; commit it as it is
+        self.github_api.commit_changes(repo_path, target.file_path, None, commit_message)
+
+        # Push the branch
+        await self.github_api.push_branch(
+            repo_path, self.owner, self.repo, bounty.branch_name
+        )
+
+        # Create the PR
+        pr_title = f"[Mohtion] {target.debt_type.value}: {target.function_name or target.file_path.name}"
+        pr_body = self._generate_pr_body(bounty)
+
+        pr_result = await self.github_api.create_pull_request(
+            owner=self.owner,
+            repo=self.repo,
+            branch_name=bounty.branch_name,
+            base_branch=self.base_branch,
+            title=pr_title,
+            body=pr_body,
+        )
+
+        bounty.mark_success(pr_result.html_url, pr_result.number)
+        logger.info(f"PR opened: {pr_result.html_url}")
+
+        return bounty
+
+    async def _record(
+        self, tier: Tier, result: RefactorResult, passed: bool, kind: str = "refactor"
+    ) -> None:
+        """Add an attempt's outcome to the tier stats, if they're kept."""
+        if self.tier_stats is None or self.bounty is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.tier_stats.record, tier, self.bounty.target, passed, result.usage, kind
+        )
+
+    async def close(self) -> None:
+        """Release what prepare() set up: caches, the source store and the clone."""
+        bounty, llm, response_cache = self.bounty, self.llm, self.response_cache
+        if response_cache is not None:
+            # Code that never passed tests shouldn't be served again
+            if llm is not None and bounty is not None and bounty.status == BountyStatus.FAILED:
+                await llm.forget_responses()
+        if llm is not None and llm.usage:
+            usage = llm.usage_summary()
+            logger.info(
+                f"LLM usage: {usage['calls']} calls, {usage['prompt_cache_hits']} prompt cache "
+                f"hits, {usage['prompt_tokens']} prompt / {usage['output_tokens']} output "
+                f"tokens, ~{usage['saved_input_tokens']:.0f} input tokens saved by caching"
+            )
+        if response_cache is not None:
+            response_cache.evict()
+            response_cache.close()
+        if self.tier_stats is not None:
+            for name, stats in self.tier_stats.summary().items():
+                logger.info(
+                    f"LLM {name} tier: {stats['passed']}/{stats['attempts']} attempts passed "
+                    f"({stats['success_rate']:.0%}), {stats['mean_seconds']:.1f}s mean, "
+                    f"${stats['cost_usd']:.2f} total"
+                )
+            self.tier_stats.evict()
+            self.tier_stats.close()
+        if self.store is not None:
+            self.store.close()
+        # Cleanup cloned repo
+        if self.repo_path:
+            self.github_api.cleanup_repo(self.repo_path)
+        self.response_cache = self.llm = self.refactor = None
+        self.tier_stats = None
+        self.store = None
+        self.repo_path = None
+
+    def _open_analysis_cache(self) -> AnalysisCache | None:
+        """Open the persistent analysis cache, if enabled."""
+        if not self.settings.analysis_cache_enabled:
+            return None
+        return AnalysisCache(
+            self.settings.cache_path,
+            max_bytes=self.settings.analysis_cache_max_mb * 1024 * 1024,
+            max_age=self.settings.analysis_cache_max_age_days * 24 * 3600,
+        )
+
+    def _open_response_cache(self) -> ResponseCache | None:
+        """Open the persistent LLM response cache, if enabled."""
+        if not self.settings.llm_cache_enabled:
+            return None
+        return ResponseCache(
+            self.settings.cache_path,
+            max_bytes=self.settings.llm_cache_max_mb * 1024 * 1024,
+            max_age=self.settings.llm_cache_max_age_days * 24 * 3600,
+        )
+
+    def _open_tier_stats(self) -> TierStats | None:
+        """Open the per-tier attempt log, if model tiering is enabled."""
+        if not self.settings.llm_tiering_enabled:
+            return None
+        return TierStats(
+            self.settings.cache_path / "llm_tiers.sqlite3",
+            max_age=self.settings.llm_tier_stats_max_age_days * 24 * 3600,
+        )
+
+    def _open_churn_cache(self, config: RepoConfig) -> DiskCache | None:
+        """Open the churn index cache, if churn ranking and caching are enabled."""
+        if not (config.churn.enabled and self.settings.analysis_cache_enabled):
+            return None
+        return DiskCache(
+            self.settings.cache_path / "churn.sqlite3",
+            max_bytes=self.settings.churn_cache_max_mb * 1024 * 1024,
+            max_age=self.settings.analysis_cache_max_age_days * 24 * 3600,
+        )
 
     def _generate_pr_body(self, bounty: BountyResult) -> str:
         """Generate the PR description."""
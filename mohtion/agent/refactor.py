@@ -1,10 +1,15 @@
 """Refactor - Action phase of the agent loop."""
 
 import logging
+import textwrap
 from dataclasses import dataclass
 from pathlib import Path
 
-from mohtion.llm.client import LLMClient
+from mohtion.agent.log_distiller import distill_test_output
+from mohtion.agent.source_store import SourceStore
+from mohtion.llm.client import CodeHook, LLMClient
+from mohtion.llm.rate_limit import RateLimitTimeout
+from mohtion.llm.usage import LLMUsage, estimate_tokens
 from mohtion.models.target import TechDebtTarget
 
 logger = logging.getLogger(__name__)
@@ -19,26 +24,76 @@ class RefactorResult:
     refactored_code: str
     summary: str
     error: str | None = None
+    applied: bool = False  # Already written to the working tree
+    model: str = ""  # Model that generated the code
+    usage: LLMUsage | None = None  # The call's usage; None if cached or it failed
 
 
 class Refactor:
     """Handles code refactoring using LLM."""
 
-    def __init__(self, repo_path: Path) -> None:
+    def __init__(
+        self,
+        repo_path: Path,
+        store: SourceStore | None = None,
+        llm: LLMClient | None = None,
+        log_max_tokens: int = 2000,
+    ) -> None:
+        """
+        Args:
+            repo_path: Root of the repository clone
+            store: Source store to read and edit files through
+            llm: LLM client (default: one on the shared connection pool)
+            log_max_tokens: Budget for the test output sent with a self-heal
+        """
         self.repo_path = repo_path
-        self.llm = LLMClient()
+        self.store = store if store is not None else SourceStore(repo_path)
+        self.llm = llm if llm is not None else LLMClient()
+        self.log_max_tokens = log_max_tokens
+
+    def _apply_hook(self, target: TechDebtTarget, outcome: dict[str, bool]) -> CodeHook:
+        """
+        Hook that checks and applies code as soon as it streams in.
+
+        Code that doesn't parse is rejected, which cancels the rest of the
+        response; otherwise it's spliced in while the summary still generates.
+        """
 
-    async def refactor_target(self, target: TechDebtTarget) -> RefactorResult:
+        async def apply(code: str) -> bool:
+            if not _compiles(code, target):
+                return False
+            outcome["applied"] = await self.apply_refactoring(target, code)
+            return True
+
+        return apply
+
+    async def refactor_target(
+        self,
+        target: TechDebtTarget,
+        apply: bool = False,
+        model: str | None = None,
+        variant: int = 0,
+    ) -> RefactorResult:
         """
         Refactor a tech debt target.
 
         Args:
             target: The tech debt target to refactor
+            apply: Syntax-check and apply the code as soon as it arrives,
+                before the rest of the response (see RefactorResult.applied)
+            model: Model to refactor with (default: the client's model)
+            variant: Speculative candidate number (see LLMClient.refactor_code)
 
         Returns:
             RefactorResult with the refactored code
+
+        Raises:
+            RateLimitTimeout: No LLM capacity in time; defer the bounty
         """
-        logger.info(f"Refactoring {target.location}")
+        model = model or self.llm.model
+        logger.info(f"Refactoring {target.location} with {model}")
+        outcome = {"applied": False}
+        calls: list[LLMUsage] = []  # This call's usage, apart from others sharing the client
 
         try:
             refactored_code, summary = await self.llm.refactor_code(
@@ -46,6 +101,10 @@ class Refactor:
                 debt_description=target.description,
                 file_path=str(target.file_path),
                 function_name=target.function_name,
+                on_code=self._apply_hook(target, outcome) if apply else None,
+                model=model,
+                variant=variant,
+                calls=calls,
             )
 
             return RefactorResult(
@@ -53,8 +112,16 @@ class Refactor:
                 original_code=target.code_snippet,
                 refactored_code=refactored_code,
                 summary=summary,
+                applied=outcome["applied"],
+                model=model,
+                usage=calls[-1] if calls else None,
             )
 
+        except RateLimitTimeout:
+            # Nothing wrong with the target; the bounty is deferred instead of failed
+            logger.warning(f"Refactoring of {target.location} deferred: no LLM capacity")
+            raise
+
         except Exception as e:
             logger.exception(f"Refactoring failed for {target.location}")
             return RefactorResult(
@@ -63,6 +130,7 @@ class Refactor:
                 refactored_code="",
                 summary="",
                 error=str(e),
+                model=model,
             )
 
     async def apply_refactoring(
@@ -71,6 +139,10 @@ class Refactor:
         """
         Apply refactored code to the file.
 
+        The code replaces whatever the target currently spans, so applying a
+        self-healed version replaces the previous attempt rather than the
+        lines the original code used to occupy.
+
         Args:
             target: The original tech debt target
             refactored_code: The refactored code to apply
@@ -78,23 +150,10 @@ class Refactor:
         Returns:
             True if successful, False otherwise
         """
-        file_path = self.repo_path / target.file_path
-
         try:
-            # Read the full file
-            content = file_path.read_text(encoding="utf-8")
-            lines = content.split("\n")
-
-            # Replace the target lines with refactored code
-            start = target.start_line - 1
-            end = target.end_line
-            refactored_lines = refactored_code.split("\n")
-
-            new_lines = lines[:start] + refactored_lines + lines[end:]
-            new_content = "\n".join(new_lines)
-
-            # Write back
-            file_path.write_text(new_content, encoding="utf-8")
+            self.store.replace_target(target, refactored_code)
+            # Tests run against the working tree
+            self.store.flush()
             logger.info(f"Applied refactoring to {target.file_path}")
             return True
 
@@ -102,11 +161,24 @@ class Refactor:
             logger.exception(f"Failed to apply refactoring: {e}")
             return False
 
+    async def apply_checked(self, target: TechDebtTarget, refactored_code: str) -> bool:
+        """
+        Syntax-check refactored code, then apply it.
+
+        For code that didn't come through refactor_target(apply=True), such
+        as the results of a batch.
+        """
+        return _compiles(refactored_code, target) and await self.apply_refactoring(
+            target, refactored_code
+        )
+
     async def attempt_self_heal(
         self,
         target: TechDebtTarget,
         refactored_code: str,
         test_output: str,
+        apply: bool = False,
+        model: str | None = None,
     ) -> RefactorResult:
         """
         Attempt to fix a failed refactoring based on test output.
@@ -115,17 +187,39 @@ class Refactor:
             target: The original tech debt target
             refactored_code: The refactored code that failed tests
             test_output: The test failure output
+            apply: As for refactor_target
+            model: As for refactor_target
 
         Returns:
             RefactorResult with the fixed code
+
+        Raises:
+            RateLimitTimeout: As for refactor_target
         """
-        logger.info(f"Attempting self-heal for {target.location}")
+        model = model or self.llm.model
+        logger.info(f"Attempting self-heal for {target.location} with {model}")
+        outcome = {"applied": False}
+        calls: list[LLMUsage] = []
+        # Only the failures, errors and frames that matter go in the prompt
+        distilled = distill_test_output(
+            test_output, target.file_path, target.function_name, self.log_max_tokens
+        )
+        logger.info(
+            f"Test output distilled from ~{estimate_tokens(test_output)} "
+            f"to ~{estimate_tokens(distilled)} tokens"
+        )
 
         try:
             fixed_code, explanation = await self.llm.analyze_test_error(
                 original_code=target.code_snippet,
                 refactored_code=refactored_code,
-                test_output=test_output,
+                test_output=distilled,
+                debt_description=target.description,
+                file_path=str(target.file_path),
+                function_name=target.function_name,
+                on_code=self._apply_hook(target, outcome) if apply else None,
+                model=model,
+                calls=calls,
             )
 
             return RefactorResult(
@@ -133,8 +227,15 @@ class Refactor:
                 original_code=target.code_snippet,
                 refactored_code=fixed_code,
                 summary=f"Self-heal: {explanation}",
+                applied=outcome["applied"],
+                model=model,
+                usage=calls[-1] if calls else None,
             )
 
+        except RateLimitTimeout:
+            logger.warning(f"Self-heal of {target.location} deferred: no LLM capacity")
+            raise
+
         except Exception as e:
             logger.exception("Self-heal failed")
             return RefactorResult(
@@ -143,4 +244,18 @@ class Refactor:
                 refactored_code=refactored_code,
                 summary="",
                 error=str(e),
+                model=model,
             )
+
+
+def _compiles(code: str, target: TechDebtTarget) -> bool:
+    """Whether refactored code for a target at least parses (non-Python code isn't checked)."""
+    if target.file_path.suffix != ".py":
+        return True
+    try:
+        # Methods come indented as they appear in their class
+        compile(textwrap.dedent(code), str(target.file_path), "exec")
+    except (SyntaxError, ValueError) as e:
+        logger.warning(f"Refactored code for {target.location} doesn't parse: {e}")
+        return False
+    return True
@@ -1,82 +1,468 @@
 """Scanner - Reconnaissance phase of the agent loop."""
 
+import asyncio
+import contextlib
+import heapq
 import logging
+import multiprocessing
+import os
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any
 
-from mohtion.analyzers.complexity import ComplexityAnalyzer
+from mohtion.agent.churn import ChurnIndex, load_churn_index
+from mohtion.agent.source_index import SourceIndex
+from mohtion.agent.walker import FileEntry, git_files, walk_files
+from mohtion.analyzers.base import Analyzer, FileAnalysis
+from mohtion.analyzers.cache import AnalysisCache, git_blob_sha
+from mohtion.analyzers.complexity import METRICS, ComplexityAnalyzer
+from mohtion.analyzers.deprecation import DeprecationAnalyzer
+from mohtion.analyzers.dispatch import NodeHandler, walk
+from mohtion.analyzers.duplicates import DuplicateAnalyzer
+from mohtion.analyzers.ignore import IgnoreMatcher
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.analyzers.type_hints import TypeHintAnalyzer
+from mohtion.cache import DiskCache
+from mohtion.loop_lag import LoopLagMonitor
 from mohtion.models.repo_config import RepoConfig
-from mohtion.models.target import TechDebtTarget
+from mohtion.models.target import SnippetSource, TechDebtTarget
 
 logger = logging.getLogger(__name__)
 
 
+def create_analyzers(config: RepoConfig) -> list[Analyzer]:
+    """Initialize enabled analyzers based on config."""
+    analyzers: list[Analyzer] = []
+
+    # Complexity, function length and nesting depth share one analyzer
+    if any(metric in config.analyzers for metric in METRICS):
+        analyzers.append(ComplexityAnalyzer(config))
+
+    if "type_hints" in config.analyzers:
+        analyzers.append(TypeHintAnalyzer(config))
+
+    if "deprecations" in config.analyzers:
+        analyzers.append(DeprecationAnalyzer(config))
+
+    if "duplicates" in config.analyzers:
+        analyzers.append(DuplicateAnalyzer(config))
+
+    # Add more analyzers here as they're implemented
+
+    return analyzers
+
+
+def analyze_source(relative_path: Path, source: bytes, analyzers: list[Analyzer]) -> FileAnalysis:
+    """
+    Parse a file once and run every applicable analyzer over a single tree walk.
+
+    Args:
+        relative_path: Path to the file (relative to repo root)
+        source: Raw file content
+        analyzers: Enabled analyzers
+
+    Returns:
+        Targets (and cross-file summaries) per analyzer name. Analyzers that
+        raised are missing from the result; analyzers that don't apply to the
+        file map to an empty list.
+    """
+    analysis = FileAnalysis(targets={analyzer.name: [] for analyzer in analyzers})
+    active = [analyzer for analyzer in analyzers if analyzer.accepts(relative_path)]
+    if not active:
+        return analysis
+
+    try:
+        parsed = ParsedFile.parse(relative_path, source)
+    except (SyntaxError, ValueError) as e:
+        logger.warning(f"Failed to parse {relative_path}: {e}")
+        return analysis
+
+    handlers: dict[str, NodeHandler] = {}
+    for analyzer in active:
+        try:
+            handlers[analyzer.name] = analyzer.create_handler(parsed)
+        except Exception as e:
+            logger.warning(f"Analyzer {analyzer.name} failed on {relative_path}: {e}")
+            del analysis.targets[analyzer.name]
+
+    try:
+        walk(parsed.tree, list(handlers.values()))
+    except Exception:
+        # One handler broke the shared walk; rerun each analyzer alone to isolate it
+        for analyzer in active:
+            if analyzer.name not in handlers:
+                continue
+            try:
+                handlers[analyzer.name] = handler = analyzer.create_handler(parsed)
+                walk(parsed.tree, [handler])
+            except Exception as e:
+                logger.warning(f"Analyzer {analyzer.name} failed on {relative_path}: {e}")
+                del handlers[analyzer.name]
+                del analysis.targets[analyzer.name]
+
+    for name, handler in handlers.items():
+        try:
+            analysis.targets[name] = handler.results()
+            summary = handler.summary()
+        except Exception as e:
+            logger.warning(f"Analyzer {name} failed on {relative_path}: {e}")
+            del analysis.targets[name]
+            continue
+        if summary is not None:
+            analysis.summaries[name] = summary
+
+    return analysis
+
+
+def analyze_files(
+    repo_path: Path, relative_paths: list[Path], analyzers: list[Analyzer]
+) -> list[tuple[Path, FileAnalysis]]:
+    """
+    Read and analyze a batch of files.
+
+    Args:
+        repo_path: Root of the repository
+        relative_paths: Files to analyze (relative to repo root)
+        analyzers: Analyzers to run on every file
+
+    Returns:
+        (relative path, analysis) for every file that was read
+    """
+    results: list[tuple[Path, FileAnalysis]] = []
+
+    for relative_path in relative_paths:
+        try:
+            source = (repo_path / relative_path).read_bytes()
+        except OSError as e:
+            logger.warning(f"Failed to read {relative_path}: {e}")
+            continue
+
+        results.append((relative_path, analyze_source(relative_path, source, analyzers)))
+
+    return results
+
+
+# Per-process state for pool workers, set up once by _init_worker
+_worker_repo_path: Path | None = None
+_worker_analyzers: list[Analyzer] = []
+
+
+def _init_worker(repo_path: Path, config: RepoConfig) -> None:
+    """Process-pool initializer: build the analyzers once per worker process."""
+    global _worker_repo_path, _worker_analyzers
+    _worker_repo_path = repo_path
+    _worker_analyzers = create_analyzers(config)
+
+
+def _scan_chunk(relative_paths: list[Path]) -> list[tuple[Path, FileAnalysis]]:
+    """Process-pool entry point: analyze one chunk of files."""
+    assert _worker_repo_path is not None, "worker not initialized"
+    return analyze_files(_worker_repo_path, relative_paths, _worker_analyzers)
+
+
 class Scanner:
     """Scans a repository for tech debt targets."""
 
-    def __init__(self, repo_path: Path, config: RepoConfig) -> None:
+    # Files handed to a pool worker per task
+    DEFAULT_CHUNK_SIZE = 64
+    # Below this many files, process start-up costs more than it saves
+    DEFAULT_PARALLEL_MIN_FILES = 200
+
+    def __init__(
+        self,
+        repo_path: Path,
+        config: RepoConfig,
+        workers: int = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        parallel_min_files: int = DEFAULT_PARALLEL_MIN_FILES,
+        cache: AnalysisCache | None = None,
+        use_git_index: bool = True,
+        max_file_size: int | None = None,
+        source: SnippetSource | None = None,
+        churn_cache: DiskCache | None = None,
+        slots: asyncio.Semaphore | None = None,
+        lag_monitor: LoopLagMonitor | None = None,
+    ) -> None:
+        """
+        Args:
+            repo_path: Root of the cloned repository
+            config: Repository configuration
+            workers: Process pool size (0 = one per CPU, 1 = always scan serially)
+            chunk_size: Number of files sent to a pool worker at a time
+            parallel_min_files: Smallest file count worth starting a pool for
+            cache: Persistent analysis cache; only changed files are re-analyzed
+            use_git_index: List tracked files from git instead of walking the
+                filesystem (falls back to walking outside a git checkout)
+            max_file_size: Skip files larger than this many bytes without reading them
+            source: Where targets read their code from (default: the files on disk)
+            churn_cache: Where churn indexes are kept between scans of the same
+                HEAD, when config.churn is enabled
+            slots: Shared limit on scans analyzing at once (e.g. across a
+                worker's concurrent jobs); held for the whole scan
+            lag_monitor: Event loop lag monitor; analysis backs off between
+                chunks while the loop is lagging past its bound
+        """
         self.repo_path = repo_path
         self.config = config
-        self.analyzers = self._init_analyzers()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.parallel_min_files = parallel_min_files
+        self.cache = cache
+        self.use_git_index = use_git_index
+        self.max_file_size = max_file_size
+        self.analyzers = create_analyzers(config)
+        self.ignore_matcher = IgnoreMatcher.from_patterns(config.ignore_paths)
+        # Targets read their code from here only when it's asked for
+        self.source_index = source if source is not None else SourceIndex(repo_path)
+        self.churn_cache = churn_cache
+        self.slots = slots
+        self.lag_monitor = lag_monitor
 
-    def _init_analyzers(self) -> list:
-        """Initialize enabled analyzers based on config."""
-        analyzers = []
+    def _suffixes(self) -> tuple[str, ...]:
+        """File extensions any enabled analyzer reads."""
+        return tuple(
+            sorted({suffix for analyzer in self.analyzers for suffix in analyzer.file_suffixes})
+        )
 
-        if "complexity" in self.config.analyzers:
-            analyzers.append(ComplexityAnalyzer(self.config))
+    def _discover_files(self) -> list[FileEntry]:
+        """Find all analyzable files (relative to repo root) that aren't ignored."""
+        suffixes = self._suffixes()
+        if not suffixes:
+            return []
 
-        # Add more analyzers here as they're implemented:
-        # if "type_hints" in self.config.analyzers:
-        #     analyzers.append(TypeHintAnalyzer(self.config))
+        entries = None
+        if self.use_git_index:
+            entries = git_files(self.repo_path, self.ignore_matcher, suffixes)
+        if entries is None:
+            entries = list(walk_files(self.repo_path, self.ignore_matcher, suffixes))
 
-        return analyzers
+        if self.max_file_size is not None:
+            limit = self.max_file_size
+            kept = [entry for entry in entries if entry.size is None or entry.size <= limit]
+            if len(kept) < len(entries):
+                logger.info(f"Skipping {len(entries) - len(kept)} files over {limit} bytes")
+            entries = kept
 
-    async def scan(self) -> list[TechDebtTarget]:
+        return entries
+
+    def _use_pool(self, file_count: int) -> bool:
+        """Decide whether a scan of this size is worth a process pool."""
+        return self.workers > 1 and file_count >= self.parallel_min_files
+
+    def _load_churn(self) -> ChurnIndex | None:
+        """The churn index for ranking, if churn weighting is enabled."""
+        if not self.config.churn.enabled:
+            return None
+        return load_churn_index(
+            self.repo_path, self.config.churn, self._suffixes(), self.churn_cache
+        )
+
+    def _hash_files(self, entries: list[FileEntry]) -> dict[Path, str]:
+        """Get the blob SHA of each readable file, hashing only those git didn't provide."""
+        blob_shas: dict[Path, str] = {}
+        for entry in entries:
+            relative_path = entry.path
+            if entry.blob_sha is not None:
+                blob_shas[relative_path] = entry.blob_sha
+                continue
+            try:
+                data = (self.repo_path / relative_path).read_bytes()
+            except OSError as e:
+                logger.warning(f"Failed to read {relative_path}: {e}")
+                continue
+            blob_shas[relative_path] = git_blob_sha(data)
+        return blob_shas
+
+    async def _analyze_batches(
+        self, files: list[Path]
+    ) -> AsyncIterator[list[tuple[Path, FileAnalysis]]]:
+        """Analyze files chunk by chunk, yielding each chunk's results as it completes."""
+        chunks = [
+            files[i : i + self.chunk_size] for i in range(0, len(files), self.chunk_size)
+        ]
+
+        loop = asyncio.get_running_loop()
+
+        if not self._use_pool(len(files)):
+            # A thread rather than the loop, so other tasks get the GIL while a chunk runs
+            for chunk in chunks:
+                yield await loop.run_in_executor(
+                    None, analyze_files, self.repo_path, chunk, self.analyzers
+                )
+                await self._yield_to_loop()
+            return
+
+        workers = min(self.workers, len(chunks))
+        logger.info(f"Scanning {len(files)} files in {len(chunks)} chunks on {workers} workers")
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.repo_path, self.config),
+        )
+        try:
+            futures = [loop.run_in_executor(pool, _scan_chunk, chunk) for chunk in chunks]
+            for future in asyncio.as_completed(futures):
+                yield await future
+                await self._yield_to_loop()
+        finally:
+            # Don't block the event loop if the consumer stopped early
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _yield_to_loop(self) -> None:
+        """Give other tasks a turn between chunks, longer if the loop is lagging."""
+        await asyncio.sleep(0)
+        if self.lag_monitor is not None:
+            await self.lag_monitor.headroom()
+
+    async def _iter_ranked(self) -> AsyncIterator[tuple[tuple[int, int], TechDebtTarget]]:
         """
-        Scan the repository for tech debt.
+        Stream targets along with their discovery order.
 
-        Returns:
-            List of tech debt targets, sorted by severity (highest first)
+        The order key is (file index, target index within the file). It's
+        independent of which chunk finishes first, so ties in severity break
+        the same way in serial and parallel scans.
+
+        Blocking steps (listing, hashing, cache I/O, cross-file passes) run
+        in the default executor so the event loop stays responsive.
         """
+        async with self.slots or contextlib.nullcontext():
+            async for item in self._iter_ranked_unlimited():
+                yield item
+
+    async def _iter_ranked_unlimited(
+        self,
+    ) -> AsyncIterator[tuple[tuple[int, int], TechDebtTarget]]:
         logger.info(f"Scanning repository at {self.repo_path}")
-        targets: list[TechDebtTarget] = []
+        loop = asyncio.get_running_loop()
 
-        # Find all Python files
-        python_files = list(self.repo_path.rglob("*.py"))
-        logger.info(f"Found {len(python_files)} Python files")
+        entries = await loop.run_in_executor(None, self._discover_files)
+        logger.info(f"Found {len(entries)} files to analyze")
+        file_order = {entry.path: index for index, entry in enumerate(entries)}
 
-        for file_path in python_files:
-            relative_path = file_path.relative_to(self.repo_path)
+        pending = [entry.path for entry in entries]
+        blob_shas: dict[Path, str] = {}
+        # Cross-file facts per analyzer name (relative path -> summary)
+        summaries: dict[str, dict[Path, Any]] = {analyzer.name: {} for analyzer in self.analyzers}
 
-            # Skip ignored paths
-            if any(
-                str(relative_path).startswith(ignore.rstrip("*").rstrip("/"))
-                for ignore in self.config.ignore_paths
-                if not ignore.startswith("**")
-            ):
-                continue
+        if self.cache is not None:
+            blob_shas = await loop.run_in_executor(None, self._hash_files, entries)
+            cached = await loop.run_in_executor(
+                None, self.cache.lookup, blob_shas, self.analyzers
+            )
+            for path, analysis in cached.items():
+                for (file_index, index), target in self._number(file_order[path], analysis):
+                    yield (file_index, index), target
+                for name, summary in analysis.summaries.items():
+                    summaries[name][path] = summary
+            pending = [path for path in blob_shas if path not in cached]
+            del cached
 
+        async for batch in self._analyze_batches(pending):
+            if self.cache is not None:
+                await loop.run_in_executor(
+                    None, self.cache.store_results, batch, blob_shas, self.analyzers
+                )
+
+            for path, analysis in batch:
+                for (file_index, index), target in self._number(file_order[path], analysis):
+                    yield (file_index, index), target
+                for name, summary in analysis.summaries.items():
+                    summaries[name][path] = summary
+
+        if self.cache is not None:
+            await loop.run_in_executor(None, self.cache.evict)
+
+        # Cross-file passes, ordered after every per-file target
+        for offset, analyzer in enumerate(self.analyzers):
             try:
-                content = file_path.read_text(encoding="utf-8")
-            except (UnicodeDecodeError, OSError) as e:
-                logger.warning(f"Failed to read {relative_path}: {e}")
+                cross_targets = await loop.run_in_executor(
+                    None, analyzer.finalize, summaries.pop(analyzer.name)
+                )
+            except Exception as e:
+                logger.warning(f"Analyzer {analyzer.name} cross-file pass failed: {e}")
                 continue
+            for index, target in enumerate(cross_targets):
+                target.source = self.source_index
+                yield (len(entries) + offset, index), target
+
+    def _number(
+        self, file_index: int, analysis: FileAnalysis
+    ) -> Iterator[tuple[tuple[int, int], TechDebtTarget]]:
+        """Pair each of a file's targets with its order key, binding their snippet source."""
+        index = 0
+        for analyzer_targets in analysis.targets.values():
+            for target in analyzer_targets:
+                target.source = self.source_index
+                yield (file_index, index), target
+                index += 1
+
+    async def iter_targets(self) -> AsyncIterator[TechDebtTarget]:
+        """
+        Stream tech debt targets as files are analyzed, in no particular order.
+
+        Only the targets of the chunk currently being consumed are held in
+        memory, so callers that aggregate incrementally stay O(their state).
+        """
+        async for _, target in self._iter_ranked():
+            yield target
+
+    async def scan(self) -> list[TechDebtTarget]:
+        """
+        Scan the repository for tech debt.
+
+        Returns:
+            List of tech debt targets, sorted by priority (highest first): their
+            severity, weighted by churn if config.churn is enabled
+        """
+        churn = await asyncio.get_running_loop().run_in_executor(None, self._load_churn)
+        ranked = [item async for item in self._iter_ranked()]
+
+        # Sort by priority (highest first), then discovery order
+        if churn is None:
+            ranked.sort(key=lambda item: (-item[1].severity, item[0]))
+        else:
+            ranked.sort(key=lambda item: (-item[1].severity * churn.weight(item[1]), item[0]))
+
+        logger.info(f"Found {len(ranked)} tech debt targets")
+        return [target for _, target in ranked]
+
+    async def top_targets(self, k: int) -> list[TechDebtTarget]:
+        """
+        Get the k highest-priority targets without materializing the rest.
+
+        Keeps a bounded min-heap of the best k seen so far, so memory stays
+        O(k) regardless of how many findings the repository has.
+
+        Args:
+            k: Number of targets to return
+
+        Returns:
+            Up to k targets, sorted by priority (highest first), as in scan()
+        """
+        if k <= 0:
+            return []
 
-            # Run all analyzers on this file
-            for analyzer in self.analyzers:
-                try:
-                    file_targets = await analyzer.analyze_file(relative_path, content)
-                    targets.extend(file_targets)
-                except Exception as e:
-                    logger.warning(f"Analyzer {analyzer.name} failed on {relative_path}: {e}")
+        churn = await asyncio.get_running_loop().run_in_executor(None, self._load_churn)
+        # Heap entries rank by priority, then earlier discovery; the worst is at heap[0]
+        heap: list[tuple[float, int, int, TechDebtTarget]] = []
+        seen = 0
 
-        # Sort by severity (highest first)
-        targets.sort(key=lambda t: t.severity, reverse=True)
+        async for (file_index, index), target in self._iter_ranked():
+            seen += 1
+            priority = target.severity if churn is None else target.severity * churn.weight(target)
+            entry = (priority, -file_index, -index, target)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[:3] > heap[0][:3]:
+                heapq.heapreplace(heap, entry)
 
-        logger.info(f"Found {len(targets)} tech debt targets")
-        return targets
+        logger.info(f"Found {seen} tech debt targets, keeping top {len(heap)}")
+        return [entry[3] for entry in sorted(heap, key=lambda entry: entry[:3], reverse=True)]
 
     async def get_top_target(self) -> TechDebtTarget | None:
         """Get the highest-priority tech debt target."""
-        targets = await self.scan()
+        targets = await self.top_targets(1)
         return targets[0] if targets else None
@@ -0,0 +1,46 @@
+"""On-demand snippet reads for scan targets."""
+
+import logging
+from array import array
+from pathlib import Path
+
+from mohtion.analyzers.parsed import decode_segment, find_line_offsets, lines_to_span
+
+logger = logging.getLogger(__name__)
+
+
+class SourceIndex:
+    """
+    Reads target snippets from the files of a repository when first needed.
+
+    Targets from the analyzers carry a byte span, so a snippet is a single
+    seek and read. Targets that only know their lines (e.g. from cross-file
+    passes) are resolved through a line-offset index built once per file and
+    shared by every target in it; only the offsets are kept, not the text.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._offsets: dict[Path, tuple[array, int]] = {}
+
+    def line_span(self, path: Path, start_line: int, end_line: int) -> tuple[int, int]:
+        """Byte range of a 1-indexed, inclusive line range of a file."""
+        indexed = self._offsets.get(path)
+        if indexed is None:
+            data = (self.root / path).read_bytes()
+            indexed = self._offsets[path] = (find_line_offsets(data), len(data))
+        offsets, size = indexed
+        start, end = lines_to_span(offsets, size, start_line, end_line)
+        if end > start:
+            # Exclude the "\r" of a CRLF terminator, as ParsedFile.line_span does
+            with open(self.root / path, "rb") as f:
+                f.seek(end - 1)
+                if f.read(1) == b"\r":
+                    end -= 1
+        return start, end
+
+    def read(self, path: Path, start: int, end: int) -> str:
+        """Source text of a byte range of a file."""
+        with open(self.root / path, "rb") as f:
+            f.seek(start)
+            return decode_segment(f.read(end - start))
@@ -0,0 +1,168 @@
+"""Memory-mapped, line-indexed view of repository files for one bounty."""
+
+import logging
+import mmap
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+from mohtion.analyzers.parsed import decode_segment, find_line_offsets, lines_to_span
+from mohtion.models.target import TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+
+class _Buffer:
+    """One file: a read-only mapping until its first edit, then a private bytearray."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.mapping: mmap.mmap | None = None
+        with open(path, "rb") as f:
+            # Empty files can't be mapped
+            if f.seek(0, 2):
+                self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.edited: bytearray | None = None
+        self.dirty = False
+        self._offsets: array | None = None
+
+    @property
+    def data(self) -> bytes | bytearray | mmap.mmap:
+        if self.edited is not None:
+            return self.edited
+        return self.mapping if self.mapping is not None else b""
+
+    @property
+    def offsets(self) -> array:
+        if self._offsets is None:
+            self._offsets = find_line_offsets(self.data)  # type: ignore[arg-type]
+        return self._offsets
+
+    @property
+    def newline(self) -> bytes:
+        """The file's line terminator, judged by its first line."""
+        first = self.data.find(b"\n")
+        return b"\r\n" if first > 0 and self.data[first - 1 : first] == b"\r" else b"\n"
+
+    def splice(self, start: int, end: int, new: bytes) -> None:
+        """Replace a byte range, shifting the line index instead of rebuilding it."""
+        if self.edited is None:
+            self.edited = bytearray(self.data)
+            self.close()
+        offsets = self.offsets
+        self.edited[start:end] = new
+
+        # Lines starting inside the replaced range are replaced by those in `new`
+        first = bisect_right(offsets, start)
+        last = bisect_right(offsets, end)
+        added = array("Q")
+        pos = new.find(b"\n")
+        while pos != -1:
+            added.append(start + pos + 1)
+            pos = new.find(b"\n", pos + 1)
+        delta = len(new) - (end - start)
+        self._offsets = offsets[:first] + added + array("Q", (o + delta for o in offsets[last:]))
+        self.dirty = True
+
+    def close(self) -> None:
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+
+class SourceStore:
+    """
+    Per-bounty access to repository files, each mapped and indexed once.
+
+    Serves target snippets (it's a SnippetSource) and applies refactorings as
+    byte splices, keeping each file's line-offset index up to date instead of
+    re-reading and re-splitting the file. Edited files are held in memory
+    until flush(), which writes each dirty file once.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._buffers: dict[Path, _Buffer] = {}
+
+    def _buffer(self, path: Path) -> _Buffer:
+        buffer = self._buffers.get(path)
+        if buffer is None:
+            buffer = self._buffers[path] = _Buffer(self.root / path)
+        return buffer
+
+    def line_span(self, path: Path, start_line: int, end_line: int) -> tuple[int, int]:
+        """Byte range of a 1-indexed, inclusive line range of a file."""
+        buffer = self._buffer(path)
+        data = buffer.data
+        start, end = lines_to_span(buffer.offsets, len(data), start_line, end_line)
+        if end > start and data[end - 1 : end] == b"\r":
+            end -= 1
+        return start, end
+
+    def read(self, path: Path, start: int, end: int) -> str:
+        """Source text of a byte range of a file."""
+        return decode_segment(bytes(self._buffer(path).data[start:end]))
+
+    def splice(self, path: Path, start: int, end: int, text: str) -> tuple[int, int]:
+        """
+        Replace a byte range of a file with new text.
+
+        Line endings in text are converted to the file's own.
+
+        Returns:
+            The byte range the new text now occupies
+        """
+        buffer = self._buffer(path)
+        new = text.replace("\r\n", "\n").encode("utf-8")
+        if buffer.newline == b"\r\n":
+            new = new.replace(b"\n", b"\r\n")
+        buffer.splice(start, end, new)
+        return start, start + len(new)
+
+    def replace_target(self, target: TechDebtTarget, code: str) -> None:
+        """
+        Replace a target's current code, and move the target onto the new code.
+
+        The original snippet stays cached on the target, so prompts keep
+        showing the code as it was before any edit, while repeated
+        replacements (e.g. self-heal attempts) land on the latest version.
+        """
+        _ = target.code_snippet  # Keep the original before it's overwritten
+        if target.start_byte is None or target.end_byte is None:
+            target.start_byte, target.end_byte = self.line_span(
+                target.file_path, target.start_line, target.end_line
+            )
+        target.start_byte, target.end_byte = self.splice(
+            target.file_path, target.start_byte, target.end_byte, code
+        )
+        target.end_line = target.start_line + code.count("\n")
+
+    def flush(self) -> list[Path]:
+        """
+        Write every file edited since the last flush, once each.
+
+        Returns:
+            Paths (relative to the root) that were written
+        """
+        written = []
+        for path, buffer in self._buffers.items():
+            if not buffer.dirty:
+                continue
+            buffer.path.write_bytes(buffer.data)  # type: ignore[arg-type]
+            buffer.dirty = False
+            written.append(path)
+        if written:
+            logger.info(f"Wrote {len(written)} edited file(s)")
+        return written
+
+    def close(self) -> None:
+        """Release file mappings (unflushed edits are discarded)."""
+        for buffer in self._buffers.values():
+            buffer.close()
+        self._buffers.clear()
+
+    def __enter__(self) -> "SourceStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
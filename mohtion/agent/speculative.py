@@ -0,0 +1,124 @@
+"""Speculative refactoring: several candidates at once, each verified in its own worktree."""
+
+import asyncio
+import copy
+import logging
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from git import Repo
+
+from mohtion.agent.refactor import Refactor, RefactorResult
+from mohtion.agent.source_store import SourceStore
+from mohtion.agent.verifier import TestResult, Verifier
+from mohtion.llm.rate_limit import RateLimitTimeout
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Candidate:
+    """One speculative refactoring and how its tests went."""
+
+    index: int
+    result: RefactorResult  # applied means applied to the candidate's worktree
+    test_result: TestResult | None = None  # None if there was no code to test
+
+    @property
+    def passed(self) -> bool:
+        return self.test_result is not None and self.test_result.passed
+
+
+async def race_candidates(
+    refactor: Refactor,
+    target: TechDebtTarget,
+    config: RepoConfig,
+    count: int,
+    model: str | None = None,
+    test_command: str | None = None,
+    timeout: int = 300,
+) -> list[Candidate]:
+    """
+    Generate refactoring candidates concurrently and verify them in parallel.
+
+    Each candidate is requested with a different approach hint, applied to
+    its own detached git worktree of HEAD as soon as its code streams in,
+    and tested there. The first to pass wins: the others are cancelled,
+    whether still generating or testing (their test processes are killed).
+    The main working tree isn't touched, and the worktrees are removed.
+
+    Args:
+        refactor: The bounty's refactor phase (its client, repository and settings)
+        target: The target to refactor
+        config: Repository config, for the verifiers
+        count: Number of candidates
+        model: Model to generate them with (default: the client's model)
+        test_command: Test command, detected beforehand in the main working
+            tree (dependencies should be installed by then too)
+        timeout: Maximum time for each candidate's tests (seconds)
+
+    Returns:
+        Candidates that finished, in the order they did; a winner is the last
+
+    Raises:
+        RateLimitTimeout: No candidate finished, and one found no LLM capacity
+    """
+    loop = asyncio.get_running_loop()
+    repo = Repo(refactor.repo_path)
+    root = Path(tempfile.mkdtemp(prefix="mohtion_candidates_"))
+    git_lock = asyncio.Lock()  # git serializes worktree changes with a lock file
+    _ = target.code_snippet  # Read from the main tree once, before the copies are edited
+
+    async def attempt(index: int) -> Candidate:
+        path = root / f"candidate-{index}"
+        async with git_lock:
+            await loop.run_in_executor(
+                None, repo.git.worktree, "add", "--detach", str(path), "HEAD"
+            )
+        with SourceStore(path) as store:
+            worktree_refactor = Refactor(path, store, refactor.llm, refactor.log_max_tokens)
+            # Applying moves the target onto the new code, so each candidate gets its own
+            result = await worktree_refactor.refactor_target(
+                copy.copy(target), apply=True, model=model, variant=index
+            )
+        if not result.applied:
+            return Candidate(index, result)
+        verifier = Verifier(path, config, test_command=test_command)
+        test_result = await verifier.run_tests(timeout, install=False)
+        logger.info(f"Candidate {index}: tests {'passed' if test_result.passed else 'failed'}")
+        return Candidate(index, result, test_result)
+
+    finished: list[Candidate] = []
+    deferred: RateLimitTimeout | None = None
+    tasks = [asyncio.create_task(attempt(index)) for index in range(count)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                candidate = await next_done
+            except RateLimitTimeout as e:
+                deferred = e
+                continue
+            except Exception:
+                logger.exception("Speculative candidate failed")
+                continue
+            finished.append(candidate)
+            if candidate.passed:
+                logger.info(f"Candidate {candidate.index} passed first, cancelling the rest")
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await loop.run_in_executor(None, _remove_worktrees, repo, root)
+    if not finished and deferred is not None:
+        raise deferred
+    return finished
+
+
+def _remove_worktrees(repo: Repo, root: Path) -> None:
+    shutil.rmtree(root, ignore_errors=True)
+    repo.git.worktree("prune")
@@ -0,0 +1,124 @@
+"""Sweep - the agent loop over many repositories, with one batched refactor phase."""
+
+import asyncio
+import logging
+
+from mohtion.agent.orchestrator import Orchestrator
+from mohtion.agent.refactor import RefactorResult
+from mohtion.llm.client import BatchRefactor, BatchResult, LLMClient
+from mohtion.llm.rate_limit import RateLimitTimeout
+from mohtion.llm.tiers import TierRouter
+from mohtion.models.bounty import BountyResult, BountyStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _refactor_result(bounty: BountyResult, result: BatchResult) -> RefactorResult:
+    return RefactorResult(
+        success=result.success,
+        original_code=bounty.target.code_snippet,
+        refactored_code=result.refactored_code,
+        summary=result.summary,
+        error=result.error,
+        model=result.model,
+        usage=result.usage,
+    )
+
+
+async def run_sweep(
+    orchestrators: dict[str, Orchestrator],
+    llm: LLMClient,
+    base_branches: dict[str, str] | None = None,
+    concurrency: int = 4,
+    poll_interval: float = 30.0,
+    timeout: float = 24 * 3600,
+    router: TierRouter | None = None,
+) -> dict[str, BountyResult | None]:
+    """
+    Run the agent loop for many repositories, refactoring all targets in one LLM batch.
+
+    Every repository is cloned, scanned and branched first; the targets'
+    refactors are then submitted together as a Message Batches job and each
+    result is routed back to its repository for verification (self-heals
+    stay interactive) and the PR. While the batch runs, each repository's
+    clone is released (see Orchestrator.suspend) and cloned again to finish,
+    so disk use is bounded by concurrency, not the number of repositories.
+
+    Args:
+        orchestrators: Orchestrator per repository, by a label such as "owner/repo"
+        llm: Client the batch is submitted with
+        base_branches: Base branch per label (default: "main")
+        concurrency: Repositories being prepared or verified at once
+        poll_interval: Seconds between checks of the batch's status
+        timeout: Seconds to wait for the batch before canceling the rest
+        router: Picks each target's model (default: the client's model for all)
+
+    Returns:
+        The bounty per label; None if nothing was found or the repository failed
+    """
+    base_branches = base_branches or {}
+    slots = asyncio.Semaphore(max(1, concurrency))
+    bounties: dict[str, BountyResult | None] = dict.fromkeys(orchestrators)
+
+    async def prepare(label: str, orchestrator: Orchestrator) -> None:
+        async with slots:
+            try:
+                bounty = await orchestrator.prepare(base_branches.get(label, "main"))
+                if bounty is not None:
+                    await orchestrator.suspend()
+                bounties[label] = bounty
+            except Exception:
+                logger.exception(f"Sweep: preparing {label} failed")
+
+    async def finish(label: str, result: BatchResult) -> None:
+        bounty = bounties[label]
+        assert bounty is not None
+        async with slots:
+            try:
+                bounty = await orchestrators[label].finish(_refactor_result(bounty, result))
+            except RateLimitTimeout as e:
+                # Self-heals found no capacity; the next sweep picks the target up again
+                logger.warning(f"Sweep: {label} deferred")
+                bounty.mark_deferred(str(e))
+            except Exception as e:
+                logger.exception(f"Sweep: finishing {label} failed")
+                bounty.mark_failed(str(e))
+        # Code that never passed tests shouldn't be served again
+        if bounty.status == BountyStatus.FAILED and result.cache_key and llm.cache is not None:
+            llm.cache.discard([result.cache_key])
+
+    try:
+        await asyncio.gather(*(prepare(label, o) for label, o in orchestrators.items()))
+
+        # custom_id must be short and plain, so number the bounties
+        labels: dict[str, str] = {}
+        requests: list[BatchRefactor] = []
+        for label, bounty in bounties.items():
+            if bounty is None:
+                continue
+            custom_id = f"bounty-{len(requests)}"
+            labels[custom_id] = label
+            target = bounty.target
+            requests.append(BatchRefactor(
+                custom_id=custom_id,
+                code=target.code_snippet,
+                debt_description=target.description,
+                file_path=str(target.file_path),
+                function_name=target.function_name,
+                model=router.route(target).model if router is not None else None,
+            ))
+
+        logger.info(f"Sweep: {len(requests)} targets across {len(orchestrators)} repositories")
+        if requests:
+            results = await llm.refactor_batch(requests, poll_interval, timeout)
+            await asyncio.gather(*(
+                finish(labels[custom_id], result) for custom_id, result in results.items()
+            ))
+        return bounties
+
+    finally:
+        for label, orchestrator in orchestrators.items():
+            try:
+                await orchestrator.close()
+            except Exception:
+                logger.exception(f"Sweep: cleaning up {label} failed")
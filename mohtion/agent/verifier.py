@@ -2,7 +2,8 @@
 
 import asyncio
 import logging
-import subprocess
+import os
+import signal
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -34,10 +35,19 @@ class Verifier:
         "cargo test",
     ]
 
-    def __init__(self, repo_path: Path, config: RepoConfig) -> None:
+    def __init__(
+        self, repo_path: Path, config: RepoConfig, test_command: str | None = None
+    ) -> None:
+        """
+        Args:
+            repo_path: Working tree to test
+            config: Repository config (its test_command, if set, is used)
+            test_command: Command detected elsewhere, e.g. for another worktree
+                of the same repository
+        """
         self.repo_path = repo_path
         self.config = config
-        self._test_command: str | None = config.test_command
+        self._test_command: str | None = config.test_command or test_command
 
     async def detect_test_command(self) -> str | None:
         """Auto-detect the test command for this repository."""
@@ -99,18 +109,23 @@ class Verifier:
             logger.warning(f"Failed to install dependencies: {result.output}")
             return False
 
-    async def run_tests(self, timeout: int = 300) -> TestResult:
+    async def run_tests(self, timeout: int = 300, install: bool = True) -> TestResult:
         """
         Run the test suite.
 
+        Cancelling the call kills the test run.
+
         Args:
             timeout: Maximum time to wait for tests (seconds)
+            install: Install dependencies first (skip if it's been done for
+                the environment, e.g. by another worktree's verifier)
 
         Returns:
             TestResult with pass/fail status and output
         """
         # Install dependencies first
-        await self.install_dependencies()
+        if install:
+            await self.install_dependencies()
 
         test_command = await self.detect_test_command()
 
@@ -126,28 +141,36 @@ class Verifier:
         return await self._run_command(test_command, timeout=timeout)
 
     async def _run_command(self, command: str, timeout: int = 300) -> TestResult:
-        """Run a shell command and capture output."""
+        """
+        Run a shell command and capture output.
 
-        def _run() -> tuple[int, str]:
+        The command gets its own process group, so on a timeout or
+        cancellation everything it started is killed, not just the shell.
+        """
+        try:
+            process = await asyncio.create_subprocess_shell(
+                command,
+                cwd=self.repo_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except Exception as e:
+            return_code, output = -1, str(e)
+        else:
             try:
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    cwd=self.repo_path,
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                )
-                output = result.stdout + result.stderr
-                return result.returncode, output
-            except subprocess.TimeoutExpired:
-                return -1, f"Test command timed out after {timeout}s"
-            except Exception as e:
-                return -1, str(e)
-
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        return_code, output = await loop.run_in_executor(None, _run)
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                return_code = process.returncode if process.returncode is not None else -1
+                output = (stdout + stderr).decode("utf-8", errors="replace")
+            except asyncio.TimeoutError:
+                _kill(process)
+                await process.wait()
+                return_code, output = -1, f"Test command timed out after {timeout}s"
+            except asyncio.CancelledError:
+                _kill(process)
+                # Reap it, so a cancelled run leaves no zombie or open pipes behind
+                await asyncio.shield(process.wait())
+                raise
 
         passed = return_code == 0
         if passed:
@@ -174,3 +197,11 @@ class Verifier:
         except SyntaxError as e:
             logger.warning(f"Syntax error in {file_path}: {e}")
             return False
+
+
+def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kill a command's whole process group."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,169 @@
+"""Repository file enumeration: a pruning filesystem walker and a git tree lister."""
+
+import logging
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from git import GitCommandError, InvalidGitRepositoryError, NoSuchPathError, Repo
+
+from mohtion.analyzers.ignore import IgnoreMatcher, IgnoreRule, gitignore_rules
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    """A candidate file for scanning."""
+
+    path: Path  # Relative to repo root
+    size: int | None = None  # Bytes, if known without reading the file
+    blob_sha: str | None = None  # Git blob SHA, if the content is known to match it
+
+
+# Never worth descending into, whatever the ignore rules say
+ALWAYS_SKIP = frozenset({".git", ".hg", ".svn", "__pycache__"})
+
+
+def _read_gitignore(directory: str, base: str) -> list[IgnoreRule]:
+    """Load the .gitignore in a directory, if any."""
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8") as f:
+            return gitignore_rules(f.read(), base)
+    except FileNotFoundError:
+        return []
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"Failed to read {base or '.'}/.gitignore: {e}")
+        return []
+
+
+def walk_files(
+    root: Path,
+    matcher: IgnoreMatcher,
+    suffixes: tuple[str, ...] = (".py",),
+    use_gitignore: bool = True,
+) -> Iterator[FileEntry]:
+    """
+    Yield files under root (as paths relative to it), skipping ignored ones.
+
+    Ignored directories are pruned before they're listed, so large vendored or
+    generated trees cost a single match. Directory symlinks aren't followed.
+
+    Args:
+        root: Repository root
+        matcher: Compiled ignore rules (e.g. from RepoConfig.ignore_paths)
+        suffixes: File extensions to yield
+        use_gitignore: Also honour .gitignore files found along the way
+
+    Yields:
+        Entries with relative path and size, in sorted order within each directory
+    """
+    # Each entry: (absolute dir, dir relative to root with "/" separators, matcher)
+    stack: list[tuple[str, str, IgnoreMatcher]] = [(str(root), "", matcher)]
+
+    while stack:
+        directory, relative_dir, dir_matcher = stack.pop()
+
+        if use_gitignore:
+            dir_matcher = dir_matcher.extend(_read_gitignore(directory, relative_dir))
+
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Failed to list {relative_dir or '.'}: {e}")
+            continue
+
+        subdirs: list[tuple[str, str, IgnoreMatcher]] = []
+        for entry in entries:
+            relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if is_dir:
+                if entry.name in ALWAYS_SKIP or dir_matcher.is_ignored(relative, is_dir=True):
+                    continue
+                subdirs.append((entry.path, relative, dir_matcher))
+            elif entry.name.endswith(suffixes) and not dir_matcher.is_ignored(relative):
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    size = None
+                yield FileEntry(Path(relative), size=size)
+
+        # Reversed so directories are visited in sorted order
+        stack.extend(reversed(subdirs))
+
+
+def git_files(
+    repo_path: Path, matcher: IgnoreMatcher, suffixes: tuple[str, ...] = (".py",)
+) -> list[FileEntry] | None:
+    """
+    List tracked files straight from the git tree of HEAD, in one git call.
+
+    Untracked build artifacts never show up, and each entry carries its size
+    and blob SHA without the file being read. Files modified in the working
+    tree keep their size but get no SHA, since their content no longer
+    matches the committed blob.
+
+    Args:
+        repo_path: Root of a git checkout (e.g. from GitHubAPI.clone_repo)
+        matcher: Compiled ignore rules (e.g. from RepoConfig.ignore_paths)
+        suffixes: File extensions to include
+
+    Returns:
+        Entries sorted by path, or None if repo_path isn't a usable git checkout
+    """
+    try:
+        repo = Repo(repo_path)
+        # -z: NUL-terminated, unquoted paths; -l: include blob sizes
+        listing = repo.git.ls_tree("-r", "-l", "-z", "--full-tree", "HEAD")
+        modified = set(repo.git.ls_files("-m", "-z").split("\0"))
+    except (InvalidGitRepositoryError, NoSuchPathError, GitCommandError, ValueError) as e:
+        logger.info(f"Falling back to filesystem walk: {e}")
+        return None
+
+    entries: list[FileEntry] = []
+    # Verdicts for directories already checked, so each is matched once
+    ignored_dirs: dict[str, bool] = {}
+
+    def dir_ignored(directory: str) -> bool:
+        if not directory:
+            return False
+        verdict = ignored_dirs.get(directory)
+        if verdict is None:
+            parent, _, name = directory.rpartition("/")
+            verdict = (
+                dir_ignored(parent)
+                or name in ALWAYS_SKIP
+                or matcher.is_ignored(directory, is_dir=True)
+            )
+            ignored_dirs[directory] = verdict
+        return verdict
+
+    for record in listing.split("\0"):
+        if not record:
+            continue
+        # "<mode> <type> <sha> <size>\t<path>"
+        meta, _, path = record.partition("\t")
+        mode, object_type, sha, size = meta.split()
+        # Skip submodules, symlinks and other non-regular files
+        if object_type != "blob" or mode not in ("100644", "100755"):
+            continue
+        if not path.endswith(suffixes):
+            continue
+        if dir_ignored(path.rpartition("/")[0]) or matcher.is_ignored(path):
+            continue
+
+        if path in modified:
+            try:
+                entries.append(FileEntry(Path(path), size=(repo_path / path).stat().st_size))
+            except OSError:
+                continue  # Deleted in the working tree
+        else:
+            entries.append(FileEntry(Path(path), size=int(size), blob_sha=sha))
+
+    return entries
@@ -2,5 +2,18 @@
 
 from mohtion.analyzers.base import Analyzer
 from mohtion.analyzers.complexity import ComplexityAnalyzer
+from mohtion.analyzers.deprecation import DeprecationAnalyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.duplicates import DuplicateAnalyzer
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.analyzers.type_hints import TypeHintAnalyzer
 
-__all__ = ["Analyzer", "ComplexityAnalyzer"]
+__all__ = [
+    "Analyzer",
+    "ComplexityAnalyzer",
+    "DeprecationAnalyzer",
+    "DuplicateAnalyzer",
+    "NodeHandler",
+    "ParsedFile",
+    "TypeHintAnalyzer",
+]
@@ -1,14 +1,53 @@
 """Base analyzer interface."""
 
+import asyncio
+import hashlib
+import json
+import logging
 from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
 from pathlib import Path
+from typing import Any
 
+from mohtion.analyzers.dispatch import NodeHandler, walk
+from mohtion.analyzers.ignore import IgnoreMatcher
+from mohtion.analyzers.parsed import ParsedFile
 from mohtion.models.repo_config import RepoConfig
 from mohtion.models.target import TechDebtTarget
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FileAnalysis:
+    """Everything the enabled analyzers produced for one file."""
+
+    # Targets per analyzer name (analyzers that failed on the file are absent)
+    targets: dict[str, list[TechDebtTarget]] = field(default_factory=dict)
+    # Per-file facts for cross-file passes (see Analyzer.finalize), per analyzer name
+    summaries: dict[str, Any] = field(default_factory=dict)
+
 
 class Analyzer(ABC):
-    """Abstract base class for code analyzers."""
+    """
+    Abstract base class for code analyzers.
+
+    Analyzers don't parse or walk files themselves: the Scanner parses each
+    file once into a ParsedFile and walks its tree a single time, driving the
+    NodeHandler that every enabled analyzer creates for that file.
+
+    Analyzers that need the whole repository (e.g. duplicate detection) have
+    their handlers return a JSON-compatible summary() per file, and produce
+    their targets in finalize() once every file has been seen.
+    """
+
+    # Bump whenever a change alters the targets produced for the same input,
+    # so cached results from older versions are not reused
+    version = "1"
+
+    # File types this analyzer understands
+    file_suffixes: tuple[str, ...] = (".py",)
 
     def __init__(self, config: RepoConfig) -> None:
         self.config = config
@@ -19,7 +58,60 @@ class Analyzer(ABC):
         """Return the analyzer name."""
         ...
 
+    def cache_params(self) -> dict[str, Any]:
+        """Return the settings that influence this analyzer's output."""
+        return {
+            "thresholds": asdict(self.config.thresholds),
+            "ignore_paths": self.config.ignore_paths,
+        }
+
+    @property
+    def cache_key(self) -> str:
+        """Identify this analyzer's name, version and settings for result caching."""
+        params = json.dumps(self.cache_params(), sort_keys=True)
+        digest = hashlib.sha256(params.encode()).hexdigest()[:16]
+        return f"{self.name}@{self.version}:{digest}"
+
     @abstractmethod
+    def create_handler(self, parsed: ParsedFile) -> NodeHandler:
+        """
+        Create the callbacks that collect this analyzer's findings for one file.
+
+        Args:
+            parsed: The parsed file about to be walked
+
+        Returns:
+            A handler whose results() are the file's tech debt targets
+        """
+        ...
+
+    def finalize(self, summaries: dict[Path, Any]) -> list[TechDebtTarget]:
+        """
+        Cross-file pass, run after every file has been analyzed.
+
+        Args:
+            summaries: The summary() of each file's handler (relative path -> summary)
+
+        Returns:
+            Targets that can only be found by comparing files. They needn't carry
+            a byte span; the snippet is located from their lines when read.
+        """
+        return []
+
+    def accepts(self, file_path: Path) -> bool:
+        """Check if this analyzer applies to a file."""
+        return file_path.suffix in self.file_suffixes and self.should_analyze(file_path)
+
+    def analyze_parsed(self, parsed: ParsedFile) -> list[TechDebtTarget]:
+        """Run this analyzer alone over an already parsed file."""
+        handler = self.create_handler(parsed)
+        walk(parsed.tree, [handler])
+        targets = handler.results()
+        # No repository to read from later, so fill snippets in while the source is at hand
+        for target in targets:
+            target.code_snippet = parsed.segment(target.start_line, target.end_line)
+        return targets
+
     async def analyze_file(self, file_path: Path, content: str) -> list[TechDebtTarget]:
         """
         Analyze a single file for tech debt.
@@ -31,15 +123,26 @@ class Analyzer(ABC):
         Returns:
             List of tech debt targets found in the file
         """
-        ...
+        if not self.accepts(file_path):
+            return []
+        # Parsing and walking are pure CPU work; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._analyze_text, file_path, content)
+
+    def _analyze_text(self, file_path: Path, content: str) -> list[TechDebtTarget]:
+        try:
+            parsed = ParsedFile.parse(file_path, content.encode("utf-8"))
+        except (SyntaxError, ValueError) as e:
+            logger.warning(f"Failed to parse {file_path}: {e}")
+            return []
+
+        return self.analyze_parsed(parsed)
+
+    @cached_property
+    def _ignore_matcher(self) -> IgnoreMatcher:
+        return IgnoreMatcher.from_patterns(self.config.ignore_paths)
 
     def should_analyze(self, file_path: Path) -> bool:
         """Check if this file should be analyzed."""
-        # Check if file matches any ignore patterns
-        import fnmatch
-
-        path_str = str(file_path)
-        for pattern in self.config.ignore_paths:
-            if fnmatch.fnmatch(path_str, pattern):
-                return False
-        return True
+        # Check if the file (or any directory above it) matches an ignore pattern
+        return not self._ignore_matcher.matches(file_path.as_posix())
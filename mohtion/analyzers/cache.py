@@ -0,0 +1,118 @@
+"""Incremental analysis cache keyed by git blob SHA."""
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+from pathlib import Path
+
+from mohtion.analyzers.base import Analyzer, FileAnalysis
+from mohtion.cache import DiskCache
+from mohtion.models.target import TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+
+def git_blob_sha(data: bytes) -> str:
+    """Compute the SHA git assigns to a blob with this content."""
+    header = f"blob {len(data)}\0".encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent per-file analyzer output.
+
+    Entries are keyed by content (blob SHA) plus the analyzer's cache key, so
+    results survive across clones and are shared by files with identical
+    content. The file path is not part of the stored payload.
+    """
+
+    FILENAME = "analysis.sqlite3"
+    # Bump when the stored payload layout changes
+    FORMAT = "3"
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: float = 30 * 24 * 3600,
+    ) -> None:
+        self.store = DiskCache(cache_dir / self.FILENAME, max_bytes=max_bytes, max_age=max_age)
+
+    @staticmethod
+    def _key(blob_sha: str, analyzer: Analyzer) -> str:
+        return f"{blob_sha}/{analyzer.cache_key}/{AnalysisCache.FORMAT}"
+
+    def lookup(
+        self, blob_shas: dict[Path, str], analyzers: list[Analyzer]
+    ) -> dict[Path, FileAnalysis]:
+        """
+        Fetch cached analyses for files whose results are complete.
+
+        Args:
+            blob_shas: Blob SHA of each file (relative path -> SHA)
+            analyzers: Analyzers that must all have a cached entry
+
+        Returns:
+            Analysis per file, only for files where every analyzer hit
+        """
+        keys = {
+            path: [self._key(sha, analyzer) for analyzer in analyzers]
+            for path, sha in blob_shas.items()
+        }
+        found = self.store.get_many(key for file_keys in keys.values() for key in file_keys)
+
+        hits: dict[Path, FileAnalysis] = {}
+        for path, file_keys in keys.items():
+            if not all(key in found for key in file_keys):
+                continue
+            analysis = FileAnalysis()
+            for analyzer, key in zip(analyzers, file_keys):
+                payload = json.loads(found[key])
+                analysis.targets[analyzer.name] = [
+                    TechDebtTarget.from_dict(data, path) for data in payload["targets"]
+                ]
+                if payload.get("summary") is not None:
+                    analysis.summaries[analyzer.name] = payload["summary"]
+            hits[path] = analysis
+
+        logger.info(f"Analysis cache: {len(hits)}/{len(blob_shas)} files hit")
+        return hits
+
+    def store_results(
+        self,
+        results: Iterable[tuple[Path, FileAnalysis]],
+        blob_shas: dict[Path, str],
+        analyzers: list[Analyzer],
+    ) -> None:
+        """
+        Save freshly computed results.
+
+        Args:
+            results: (relative path, analysis) per analyzed file
+            blob_shas: Blob SHA of each file
+            analyzers: Analyzers that produced the results
+        """
+        by_name = {analyzer.name: analyzer for analyzer in analyzers}
+        items = []
+        for path, analysis in results:
+            sha = blob_shas.get(path)
+            if sha is None:
+                continue
+            for name, targets in analysis.targets.items():
+                payload = json.dumps({
+                    "targets": [target.to_dict() for target in targets],
+                    "summary": analysis.summaries.get(name),
+                })
+                items.append((self._key(sha, by_name[name]), payload.encode()))
+
+        self.store.set_many(items)
+
+    def evict(self) -> int:
+        """Drop stale entries (see DiskCache.evict)."""
+        return self.store.evict()
+
+    def close(self) -> None:
+        """Close the underlying store."""
+        self.store.close()
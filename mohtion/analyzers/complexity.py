@@ -1,131 +1,240 @@
-"""Cyclomatic complexity analyzer using Python AST."""
+"""Function metrics analyzer (cyclomatic complexity, length, nesting) using Python AST."""
 
 import ast
 import logging
-from pathlib import Path
+from collections.abc import Sequence
+from typing import Any
 
 from mohtion.analyzers.base import Analyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.parsed import ParsedFile
 from mohtion.models.repo_config import RepoConfig
 from mohtion.models.target import DebtType, TechDebtTarget
 
 logger = logging.getLogger(__name__)
 
+# Per-function metrics computed by ComplexityVisitor, each enabled by the
+# analyzer name of the same name in RepoConfig.analyzers
+METRICS = ("complexity", "function_length", "nesting_depth")
 
-class ComplexityVisitor(ast.NodeVisitor):
-    """AST visitor that calculates cyclomatic complexity."""
+_DEBT_TYPES = {
+    "complexity": DebtType.COMPLEXITY,
+    "function_length": DebtType.FUNCTION_LENGTH,
+    "nesting_depth": DebtType.NESTING,
+}
+
+# How far above its threshold each metric must be to reach severity 1.0
+_SEVERITY_SCALES = {"complexity": 10, "function_length": 100, "nesting_depth": 4}
+
+
+class ComplexityVisitor(NodeHandler):
+    """
+    AST visitor that calculates cyclomatic complexity, length and nesting depth.
+
+    Complexity = 1 + number of decision points
+    Decision points: if, elif, for, while, except, and, or, ternary,
+    comprehension conditions, assert
+
+    Nesting depth is the deepest stack of blocks (if, loops, with, try, match)
+    inside a function; an elif continues its if rather than nesting in it.
+
+    Each function pushes an accumulator when entered and pops it when left,
+    so every node is visited once and metrics count only toward the
+    innermost function that contains them.
+    """
 
     def __init__(self) -> None:
         self.functions: list[dict] = []
-        self._current_class: str | None = None
+        self._class_stack: list[str] = []
+        self._function_stack: list[dict] = []
+        # ids of If nodes that are the elif branch of their parent
+        self._elifs: set[int] = set()
 
-    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+    def enter_ClassDef(self, node: ast.ClassDef) -> None:
         """Track current class context."""
-        old_class = self._current_class
-        self._current_class = node.name
-        self.generic_visit(node)
-        self._current_class = old_class
-
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
-        """Analyze a function definition."""
-        complexity = self._calculate_complexity(node)
-        self.functions.append({
+        self._class_stack.append(node.name)
+
+    def leave_ClassDef(self, node: ast.ClassDef) -> None:
+        self._class_stack.pop()
+
+    def enter_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        """Open an accumulator for a function definition."""
+        func = {
             "name": node.name,
-            "class_name": self._current_class,
+            "class_name": self._class_stack[-1] if self._class_stack else None,
             "start_line": node.lineno,
             "end_line": node.end_lineno or node.lineno,
-            "complexity": complexity,
-        })
-        self.generic_visit(node)
-
-    visit_AsyncFunctionDef = visit_FunctionDef
-
-    def _calculate_complexity(self, node: ast.AST) -> int:
-        """
-        Calculate cyclomatic complexity of a node.
-
-        Complexity = 1 + number of decision points
-        Decision points: if, elif, for, while, except, and, or, ternary
-        """
-        complexity = 1  # Base complexity
-
-        for child in ast.walk(node):
-            # Branching statements
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.AsyncFor)):
-                complexity += 1
-            # Exception handlers
-            elif isinstance(child, ast.ExceptHandler):
-                complexity += 1
-            # Boolean operators (each adds a decision point)
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-            # Ternary expressions
-            elif isinstance(child, ast.IfExp):
-                complexity += 1
-            # Comprehensions with conditions
-            elif isinstance(child, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
-                for generator in child.generators:
-                    complexity += len(generator.ifs)
-            # Assert statements
-            elif isinstance(child, ast.Assert):
-                complexity += 1
-
-        return complexity
+            "complexity": 1,  # Base complexity
+            "length": (node.end_lineno or node.lineno) - node.lineno + 1,
+            "depth": 0,  # Blocks currently open
+            "max_depth": 0,
+        }
+        self.functions.append(func)
+        self._function_stack.append(func)
+
+    def leave_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        self._function_stack.pop()
+
+    enter_AsyncFunctionDef = enter_FunctionDef
+    leave_AsyncFunctionDef = leave_FunctionDef
+
+    def _add(self, points: int) -> None:
+        """Credit decision points to the innermost enclosing function."""
+        if self._function_stack:
+            self._function_stack[-1]["complexity"] += points
+
+    def _enter_block(self, node: ast.AST) -> None:
+        """Open a nested block in the innermost enclosing function."""
+        if (
+            isinstance(node, ast.If)
+            and len(node.orelse) == 1
+            and isinstance(node.orelse[0], ast.If)
+            and node.orelse[0].col_offset == node.col_offset
+        ):
+            self._elifs.add(id(node.orelse[0]))
+        if id(node) in self._elifs or not self._function_stack:
+            return
+        func = self._function_stack[-1]
+        func["depth"] += 1
+        func["max_depth"] = max(func["max_depth"], func["depth"])
+
+    def _leave_block(self, node: ast.AST) -> None:
+        if id(node) in self._elifs:
+            self._elifs.discard(id(node))
+        elif self._function_stack:
+            self._function_stack[-1]["depth"] -= 1
+
+    # Branching blocks: a decision point that also nests its body
+    def enter_If(self, node: ast.AST) -> None:
+        self._add(1)
+        self._enter_block(node)
+
+    enter_While = enter_For = enter_AsyncFor = enter_If
+    leave_If = leave_While = leave_For = leave_AsyncFor = _leave_block
+
+    # Blocks that nest without branching
+    enter_With = enter_AsyncWith = enter_Try = enter_TryStar = enter_Match = _enter_block
+    leave_With = leave_AsyncWith = leave_Try = leave_TryStar = leave_Match = _leave_block
+
+    # Exception handlers, ternaries and asserts
+    def enter_IfExp(self, node: ast.AST) -> None:
+        self._add(1)
+
+    enter_ExceptHandler = enter_Assert = enter_IfExp
+
+    def enter_BoolOp(self, node: ast.BoolOp) -> None:
+        """Boolean operators (each extra operand adds a decision point)."""
+        self._add(len(node.values) - 1)
+
+    def enter_ListComp(
+        self, node: ast.ListComp | ast.SetComp | ast.DictComp | ast.GeneratorExp
+    ) -> None:
+        """Comprehensions with conditions."""
+        self._add(sum(len(generator.ifs) for generator in node.generators))
+
+    enter_SetComp = enter_DictComp = enter_GeneratorExp = enter_ListComp
 
 
 class ComplexityAnalyzer(Analyzer):
-    """Analyzer for cyclomatic complexity in Python files."""
+    """
+    Analyzer for per-function metrics in Python files.
+
+    Cyclomatic complexity, function length and nesting depth are all computed
+    by one ComplexityVisitor, and a function over several thresholds yields a
+    single target listing every metric it exceeds.
+    """
+
+    # 2: nested functions no longer count toward their parent's complexity
+    # 3: function length and nesting depth, combined targets
+    version = "3"
 
     @property
     def name(self) -> str:
         return "complexity"
 
-    def __init__(self, config: RepoConfig) -> None:
+    def __init__(self, config: RepoConfig, metrics: Sequence[str] | None = None) -> None:
         super().__init__(config)
-        self.threshold = config.thresholds.cyclomatic_complexity
+        if metrics is None:
+            metrics = [metric for metric in METRICS if metric in config.analyzers]
+        self.metrics = tuple(metric for metric in METRICS if metric in metrics) or ("complexity",)
+        self.thresholds = {
+            "complexity": config.thresholds.cyclomatic_complexity,
+            "function_length": config.thresholds.function_length,
+            "nesting_depth": config.thresholds.nesting_depth,
+        }
+
+    def cache_params(self) -> dict[str, Any]:
+        return {**super().cache_params(), "metrics": list(self.metrics)}
+
+    def create_handler(self, parsed: ParsedFile) -> NodeHandler:
+        return _ComplexityHandler(self, parsed)
 
-    async def analyze_file(self, file_path: Path, content: str) -> list[TechDebtTarget]:
-        """Analyze a Python file for high-complexity functions."""
-        # Only analyze Python files
-        if file_path.suffix != ".py":
-            return []
 
-        if not self.should_analyze(file_path):
-            return []
+def _metric_severity(metric: str, value: int, threshold: int) -> float:
+    """Normalize how far a metric is above its threshold to 0.0-1.0."""
+    return min(1.0, (value - threshold) / _SEVERITY_SCALES[metric])
 
-        try:
-            tree = ast.parse(content)
-        except SyntaxError as e:
-            logger.warning(f"Failed to parse {file_path}: {e}")
-            return []
 
-        visitor = ComplexityVisitor()
-        visitor.visit(tree)
+def _describe(metric: str, value: int, threshold: int) -> str:
+    if metric == "complexity":
+        return f"High cyclomatic complexity: {value} (threshold: {threshold})"
+    if metric == "function_length":
+        return f"Long function: {value} lines (threshold: {threshold})"
+    return f"Deep nesting: {value} levels (threshold: {threshold})"
 
+
+class _ComplexityHandler(ComplexityVisitor):
+    """Turns the metrics of one file into targets, one per function."""
+
+    def __init__(self, analyzer: ComplexityAnalyzer, parsed: ParsedFile) -> None:
+        super().__init__()
+        self.metrics = analyzer.metrics
+        self.thresholds = analyzer.thresholds
+        self.parsed = parsed
+
+    def results(self) -> list[TechDebtTarget]:
+        """Build a target for each function above any enabled threshold."""
         targets = []
-        lines = content.split("\n")
-
-        for func in visitor.functions:
-            if func["complexity"] > self.threshold:
-                # Extract the function code
-                start = func["start_line"] - 1
-                end = func["end_line"]
-                code_snippet = "\n".join(lines[start:end])
-
-                # Calculate severity (normalize complexity above threshold)
-                severity = min(1.0, (func["complexity"] - self.threshold) / 10)
-
-                target = TechDebtTarget(
-                    file_path=file_path,
-                    start_line=func["start_line"],
-                    end_line=func["end_line"],
-                    debt_type=DebtType.COMPLEXITY,
-                    severity=severity,
-                    description=f"High cyclomatic complexity: {func['complexity']} (threshold: {self.threshold})",
-                    code_snippet=code_snippet,
-                    function_name=func["name"],
-                    class_name=func["class_name"],
-                    metric_value=float(func["complexity"]),
-                )
-                targets.append(target)
+
+        for func in self.functions:
+            values = {
+                "complexity": func["complexity"],
+                "function_length": func["length"],
+                "nesting_depth": func["max_depth"],
+            }
+            exceeded = [
+                metric for metric in self.metrics if values[metric] > self.thresholds[metric]
+            ]
+            if not exceeded:
+                continue
+
+            severities = {
+                metric: _metric_severity(metric, values[metric], self.thresholds[metric])
+                for metric in exceeded
+            }
+            # Report under the worst metric; each additional one raises severity
+            primary = max(exceeded, key=lambda metric: severities[metric])
+            severity = min(1.0, severities[primary] + 0.1 * (len(exceeded) - 1))
+
+            start_byte, end_byte = self.parsed.line_span(func["start_line"], func["end_line"])
+
+            target = TechDebtTarget(
+                file_path=self.parsed.path,
+                start_line=func["start_line"],
+                end_line=func["end_line"],
+                debt_type=_DEBT_TYPES[primary],
+                severity=severity,
+                description="; ".join(
+                    _describe(metric, values[metric], self.thresholds[metric])
+                    for metric in [primary, *(m for m in exceeded if m != primary)]
+                ),
+                start_byte=start_byte,
+                end_byte=end_byte,
+                function_name=func["name"],
+                class_name=func["class_name"],
+                metric_value=float(values[primary]),
+                metrics={metric: float(values[metric]) for metric in self.metrics},
+            )
+            targets.append(target)
 
         return targets
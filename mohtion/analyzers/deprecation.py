@@ -0,0 +1,271 @@
+"""Deprecated API analyzer backed by a precompiled symbol index."""
+
+import ast
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from mohtion.analyzers.base import Analyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType, TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_PATH = Path(__file__).with_name("deprecations.yaml")
+
+
+@dataclass(frozen=True)
+class DeprecatedAPI:
+    """A catalogue entry."""
+
+    name: str  # Fully qualified, e.g. "asyncio.get_event_loop"
+    since: str
+    use: str
+    removed: str | None = None
+
+    def describe(self) -> str:
+        status = f"removed in {self.removed}" if self.removed else f"deprecated since {self.since}"
+        return f"{self.name} ({status}; use {self.use})"
+
+
+@lru_cache(maxsize=None)
+def load_catalogue(path: Path = CATALOGUE_PATH) -> dict[str, DeprecatedAPI]:
+    """
+    Compile the catalogue into a dict keyed by qualified name.
+
+    Cached per process, so repeated scans (and every file of a scan) share
+    one index instead of re-reading the YAML.
+    """
+    data = yaml.safe_load(path.read_text()) or {}
+    index: dict[str, DeprecatedAPI] = {}
+    for section in data.values():
+        for name, entry in section.items():
+            index[name] = DeprecatedAPI(
+                name=name,
+                since=str(entry["since"]),
+                use=entry["use"],
+                removed=str(entry["removed"]) if entry.get("removed") else None,
+            )
+    logger.debug(f"Loaded {len(index)} deprecated APIs from {path.name}")
+    return index
+
+
+@lru_cache(maxsize=None)
+def catalogue_digest(path: Path = CATALOGUE_PATH) -> str:
+    """Fingerprint of the catalogue, so edits invalidate cached results."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def find_deprecated(index: dict[str, DeprecatedAPI], qualified: str) -> DeprecatedAPI | None:
+    """
+    Look up a qualified name, or the most specific deprecated module containing it.
+
+    Tries "a.b.c", then "a.b", then "a", so the cost depends on the depth of
+    the name at the call site, not on the size of the catalogue.
+    """
+    while qualified:
+        api = index.get(qualified)
+        if api is not None:
+            return api
+        qualified = qualified.rpartition(".")[0]
+    return None
+
+
+class DeprecationVisitor(NodeHandler):
+    """
+    AST visitor that collects references to imported names.
+
+    Imports build a per-module alias table (local name -> qualified name).
+    Every use of a name is recorded as the outermost attribute chain it
+    starts (``os.path.join`` rather than ``os.path`` and ``os`` as well), and
+    resolved against the aliases once the whole module has been seen, so
+    imports placed below their first use still count.
+    """
+
+    def __init__(self) -> None:
+        self.aliases: dict[str, str] = {}
+        # (qualified name, start line, end line, enclosing function record)
+        self.imports: list[tuple[str, int, int, dict | None]] = []
+        # (name parts, start line, end line, enclosing function record)
+        self.references: list[tuple[tuple[str, ...], int, int, dict | None]] = []
+        self.functions: list[dict] = []
+        self._class_stack: list[str] = []
+        self._function_stack: list[dict] = []
+        # Inner nodes of chains already recorded from their outermost Attribute
+        self._inner: set[int] = set()
+
+    def enter_ClassDef(self, node: ast.ClassDef) -> None:
+        """Track current class context."""
+        self._class_stack.append(node.name)
+
+    def leave_ClassDef(self, node: ast.ClassDef) -> None:
+        self._class_stack.pop()
+
+    def enter_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        func = {
+            "name": node.name,
+            "class_name": self._class_stack[-1] if self._class_stack else None,
+            "start_line": node.lineno,
+            "end_line": node.end_lineno or node.lineno,
+        }
+        self.functions.append(func)
+        self._function_stack.append(func)
+
+    def leave_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        self._function_stack.pop()
+
+    enter_AsyncFunctionDef = enter_FunctionDef
+    leave_AsyncFunctionDef = leave_FunctionDef
+
+    def _scope(self) -> dict | None:
+        return self._function_stack[-1] if self._function_stack else None
+
+    def _record_import(self, qualified: str, node: ast.stmt) -> None:
+        self.imports.append((qualified, node.lineno, node.end_lineno or node.lineno, self._scope()))
+
+    def enter_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                # "import a.b" binds "a"
+                top = alias.name.partition(".")[0]
+                self.aliases[top] = top
+            self._record_import(alias.name, node)
+
+    def enter_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.level or not node.module:
+            return  # Relative imports are project code
+        for alias in node.names:
+            if alias.name == "*":
+                self._record_import(node.module, node)
+                continue
+            qualified = f"{node.module}.{alias.name}"
+            self.aliases[alias.asname or alias.name] = qualified
+            self._record_import(qualified, node)
+
+    def enter_Attribute(self, node: ast.Attribute) -> None:
+        if id(node) in self._inner:
+            self._inner.discard(id(node))
+            return
+
+        parts = [node.attr]
+        inner: list[int] = []
+        current = node.value
+        while isinstance(current, ast.Attribute):
+            inner.append(id(current))
+            parts.append(current.attr)
+            current = current.value
+        if not isinstance(current, ast.Name):
+            return  # e.g. call().attr: not resolvable through imports
+
+        inner.append(id(current))
+        parts.append(current.id)
+        self._inner.update(inner)
+        parts.reverse()
+        self.references.append(
+            (tuple(parts), node.lineno, node.end_lineno or node.lineno, self._scope())
+        )
+
+    def enter_Name(self, node: ast.Name) -> None:
+        if id(node) in self._inner:
+            self._inner.discard(id(node))
+            return
+        if isinstance(node.ctx, ast.Load):
+            self.references.append(
+                ((node.id,), node.lineno, node.end_lineno or node.lineno, self._scope())
+            )
+
+    def findings(
+        self, index: dict[str, DeprecatedAPI]
+    ) -> list[tuple[DeprecatedAPI, int, int, dict | None]]:
+        """Resolve imports and references against the catalogue."""
+        found = []
+        for qualified, start, end, scope in self.imports:
+            api = find_deprecated(index, qualified)
+            if api is not None:
+                found.append((api, start, end, scope))
+
+        for parts, start, end, scope in self.references:
+            target = self.aliases.get(parts[0])
+            if target is None:
+                continue
+            qualified = ".".join((target, *parts[1:]))
+            api = find_deprecated(index, qualified)
+            if api is not None:
+                found.append((api, start, end, scope))
+        return found
+
+
+class DeprecationAnalyzer(Analyzer):
+    """Analyzer for uses of deprecated standard library and third-party APIs."""
+
+    @property
+    def name(self) -> str:
+        return "deprecations"
+
+    def __init__(self, config: RepoConfig) -> None:
+        super().__init__(config)
+        self.index = load_catalogue()
+
+    def cache_params(self) -> dict[str, Any]:
+        return {**super().cache_params(), "catalogue": catalogue_digest()}
+
+    def create_handler(self, parsed: ParsedFile) -> NodeHandler:
+        return _DeprecationHandler(self, parsed)
+
+
+class _DeprecationHandler(DeprecationVisitor):
+    """Turns the deprecated API uses of one file into targets, one per function."""
+
+    def __init__(self, analyzer: DeprecationAnalyzer, parsed: ParsedFile) -> None:
+        super().__init__()
+        self.index = analyzer.index
+        self.parsed = parsed
+
+    def results(self) -> list[TechDebtTarget]:
+        """Build one target per function (or module-level statement) using deprecated APIs."""
+        # Group key -> (start line, end line, function record, uses per API)
+        groups: dict[Any, tuple[int, int, dict | None, Counter[DeprecatedAPI]]] = {}
+        for api, start, end, scope in self.findings(self.index):
+            key = id(scope) if scope is not None else (start, end)
+            if key not in groups:
+                if scope is not None:
+                    start, end = scope["start_line"], scope["end_line"]
+                groups[key] = (start, end, scope, Counter())
+            groups[key][3][api] += 1
+
+        targets = []
+        for start, end, scope, uses in sorted(groups.values(), key=lambda group: group[:2]):
+            # Removed APIs are broken on current versions, not just noisy
+            severity = max(0.6 if api.removed else 0.3 for api in uses)
+            severity = min(1.0, severity + 0.1 * (len(uses) - 1))
+
+            listed = "; ".join(
+                api.describe() + (f" x{count}" if count > 1 else "")
+                for api, count in sorted(uses.items(), key=lambda item: item[0].name)
+            )
+            start_byte, end_byte = self.parsed.line_span(start, end)
+            targets.append(TechDebtTarget(
+                file_path=self.parsed.path,
+                start_line=start,
+                end_line=end,
+                debt_type=DebtType.DEPRECATION,
+                severity=severity,
+                description=f"Deprecated API usage: {listed}",
+                start_byte=start_byte,
+                end_byte=end_byte,
+                function_name=scope["name"] if scope else None,
+                class_name=scope["class_name"] if scope else None,
+                metric_value=float(sum(uses.values())),
+            ))
+
+        return targets
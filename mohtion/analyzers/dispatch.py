@@ -0,0 +1,88 @@
+"""Single-pass AST traversal that dispatches node callbacks to many analyzers."""
+
+import ast
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from mohtion.models.target import TechDebtTarget
+
+Callback = Callable[[ast.AST], None]
+
+
+class NodeHandler:
+    """
+    Per-file callbacks driven by the shared traversal.
+
+    Subclasses define ``enter_<NodeType>(node)`` and/or ``leave_<NodeType>(node)``
+    methods (e.g. ``enter_FunctionDef``). ``walk`` calls every handler's
+    ``enter_`` method before a node's children are visited and its ``leave_``
+    method afterwards, so one walk of the tree serves all analyzers.
+    A handler that needs every node can define ``enter_node(node)``, which is
+    called before the type-specific ``enter_`` method.
+    """
+
+    def results(self) -> list[TechDebtTarget]:
+        """Return the targets collected during the walk."""
+        return []
+
+    def summary(self) -> Any:
+        """Return JSON-compatible per-file facts for a cross-file pass, if any."""
+        return None
+
+    def visit(self, tree: ast.AST) -> None:
+        """Walk a tree with this handler alone."""
+        walk(tree, [self])
+
+
+def walk(tree: ast.AST, handlers: Sequence[NodeHandler]) -> None:
+    """
+    Traverse a tree once, in source order, calling every handler's callbacks.
+
+    Callback lookup is resolved once per node type, so nodes that no handler
+    cares about cost only the traversal itself.
+    """
+    enter_table: dict[type, list[Callback]] = {}
+    leave_table: dict[type, list[Callback]] = {}
+
+    generic = {id(handler): getattr(handler, "enter_node", None) for handler in handlers}
+
+    def resolve(node_type: type) -> list[Callback]:
+        name = node_type.__name__
+        enters: list[Callback] = []
+        for handler in handlers:
+            if (callback := generic[id(handler)]) is not None:
+                enters.append(callback)
+            if (callback := getattr(handler, f"enter_{name}", None)) is not None:
+                enters.append(callback)
+        enter_table[node_type] = enters
+        leave_table[node_type] = [
+            callback
+            for handler in handlers
+            if (callback := getattr(handler, f"leave_{name}", None)) is not None
+        ]
+        return enter_table[node_type]
+
+    iter_children = ast.iter_child_nodes
+    # Each entry is (node, leaving); leave events are pushed beneath the children
+    stack: list[tuple[ast.AST, bool]] = [(tree, False)]
+
+    while stack:
+        node, leaving = stack.pop()
+        node_type = type(node)
+
+        if leaving:
+            for callback in leave_table[node_type]:
+                callback(node)
+            continue
+
+        enters = enter_table.get(node_type)
+        if enters is None:
+            enters = resolve(node_type)
+        for callback in enters:
+            callback(node)
+
+        if leave_table[node_type]:
+            stack.append((node, True))
+        children = list(iter_children(node))
+        children.reverse()
+        stack.extend((child, False) for child in children)
@@ -0,0 +1,324 @@
+"""Duplicate code analyzer using normalized AST fingerprints."""
+
+import ast
+import hashlib
+import logging
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from mohtion.analyzers.base import Analyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType, TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+# Nodes that form a candidate clone unit: functions and compound statement blocks
+UNIT_TYPES = (
+    ast.FunctionDef, ast.AsyncFunctionDef,
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try,
+)
+
+# Load/Store/Del markers carry no structure worth fingerprinting
+_SKIPPED_TYPES = (ast.Load, ast.Store, ast.Del)
+
+# Karp-Rabin rolling hash over token ids
+_HASH_BASE = 1_000_003
+_HASH_MOD = (1 << 61) - 1
+
+_token_ids: dict[type, int] = {}
+
+
+def _token_id(node_type: type) -> int:
+    """
+    Stable token for a node type.
+
+    Only the node type is kept, so identifiers and literal values are
+    abstracted away. crc32 rather than hash() keeps ids identical across
+    processes and runs, which cached fingerprints rely on.
+    """
+    token = _token_ids.get(node_type)
+    if token is None:
+        token = _token_ids[node_type] = zlib.crc32(node_type.__name__.encode())
+    return token
+
+
+def kgram_hashes(tokens: array, k: int) -> list[int]:
+    """Rolling hashes of every k consecutive tokens."""
+    if len(tokens) < k:
+        return []
+    high = pow(_HASH_BASE, k - 1, _HASH_MOD)
+    h = 0
+    for token in tokens[:k]:
+        h = (h * _HASH_BASE + token) % _HASH_MOD
+    hashes = [h]
+    for i in range(k, len(tokens)):
+        h = ((h - tokens[i - k] * high) * _HASH_BASE + tokens[i]) % _HASH_MOD
+        hashes.append(h)
+    return hashes
+
+
+def winnow(hashes: list[int], window: int) -> list[int]:
+    """
+    Select fingerprints by winnowing: the rightmost minimum of each window.
+
+    Any match of at least window + k - 1 tokens is guaranteed to share a
+    fingerprint, while only about 2 / (window + 1) of the hashes are kept.
+    """
+    if len(hashes) <= window:
+        return [min(hashes)] if hashes else []
+
+    selected: list[int] = []
+    last_position = -1
+    for start in range(len(hashes) - window + 1):
+        position = start
+        for i in range(start + 1, start + window):
+            if hashes[i] <= hashes[position]:
+                position = i
+        if position != last_position:
+            selected.append(hashes[position])
+            last_position = position
+    return selected
+
+
+class DuplicateVisitor(NodeHandler):
+    """Collects the normalized token stream and fingerprints of each clone unit."""
+
+    def __init__(self, min_lines: int, kgram: int, window: int) -> None:
+        self.min_lines = min_lines
+        self.kgram = kgram
+        self.window = window
+        self.units: list[list[Any]] = []
+        # Node types in walk (pre)order; a unit's subtree is a contiguous slice
+        self._tokens = array("Q")
+        self._open_units: list[int] = []
+        self._class_stack: list[str] = []
+        self._function_stack: list[str] = []
+
+    def enter_node(self, node: ast.AST) -> None:
+        node_type = type(node)
+        if node_type in _SKIPPED_TYPES:
+            return
+        self._tokens.append(_token_id(node_type))
+        if isinstance(node, UNIT_TYPES):
+            self._open_units.append(len(self._tokens) - 1)
+
+    def enter_ClassDef(self, node: ast.ClassDef) -> None:
+        self._class_stack.append(node.name)
+
+    def leave_ClassDef(self, node: ast.ClassDef) -> None:
+        self._class_stack.pop()
+
+    def enter_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        self._function_stack.append(node.name)
+
+    enter_AsyncFunctionDef = enter_FunctionDef
+
+    def leave_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        self._function_stack.pop()
+        self._close_unit(node)
+
+    leave_AsyncFunctionDef = leave_FunctionDef
+
+    def _close_unit(self, node: ast.AST) -> None:
+        start = self._open_units.pop()
+        start_line = node.lineno  # type: ignore[attr-defined]
+        end_line = node.end_lineno or start_line  # type: ignore[attr-defined]
+        if end_line - start_line + 1 < self.min_lines:
+            return
+
+        tokens = self._tokens[start:]
+        fingerprints = sorted(set(winnow(kgram_hashes(tokens, self.kgram), self.window)))
+        if not fingerprints:
+            return
+
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef):
+            name = node.name
+        else:
+            # Blocks are named after the function that contains them
+            name = self._function_stack[-1] if self._function_stack else None
+
+        self.units.append([
+            start_line,
+            end_line,
+            name,
+            self._class_stack[-1] if self._class_stack else None,
+            hashlib.blake2b(tokens.tobytes(), digest_size=8).hexdigest(),
+            fingerprints,
+        ])
+
+    def leave_If(self, node: ast.AST) -> None:
+        self._close_unit(node)
+
+    leave_For = leave_AsyncFor = leave_While = leave_If
+    leave_With = leave_AsyncWith = leave_Try = leave_If
+
+    def summary(self) -> Any:
+        return self.units
+
+
+@dataclass
+class _Unit:
+    """A clone unit from some file, as used by the cross-file pass."""
+
+    path: Path
+    start_line: int
+    end_line: int
+    name: str | None
+    class_name: str | None
+    exact_hash: str
+    fingerprints: list[int]
+
+    @property
+    def lines(self) -> int:
+        return self.end_line - self.start_line + 1
+
+    def contains(self, other: "_Unit") -> bool:
+        return (
+            self.path == other.path
+            and self.start_line <= other.start_line
+            and other.end_line <= self.end_line
+        )
+
+    def overlaps(self, other: "_Unit") -> bool:
+        return (
+            self.path == other.path
+            and self.start_line <= other.end_line
+            and other.start_line <= self.end_line
+        )
+
+
+class DuplicateAnalyzer(Analyzer):
+    """
+    Analyzer for duplicated functions and blocks across the repository.
+
+    Each function and compound block is normalized to its sequence of AST node
+    types (identifiers and literals abstracted), hashed in k-grams and
+    winnowed into a small fingerprint set. The cross-file pass looks clones up
+    through an inverted fingerprint index instead of comparing every pair.
+    """
+
+    KGRAM = 12  # Tokens per fingerprinted k-gram
+    WINDOW = 8  # Winnowing window
+    # Fingerprints shared by more units than this are boilerplate; they're
+    # skipped so the index lookup stays near-linear (exact clones are still
+    # grouped through their whole-unit hash)
+    MAX_POSTINGS = 64
+
+    @property
+    def name(self) -> str:
+        return "duplicates"
+
+    def __init__(self, config: RepoConfig) -> None:
+        super().__init__(config)
+        self.min_lines = config.thresholds.duplicate_min_lines
+        self.similarity = config.thresholds.duplicate_similarity
+
+    def create_handler(self, parsed: ParsedFile) -> NodeHandler:
+        return DuplicateVisitor(self.min_lines, self.KGRAM, self.WINDOW)
+
+    def finalize(self, summaries: dict[Path, Any]) -> list[TechDebtTarget]:
+        """Group clone units across files and report one target per group."""
+        units = [
+            _Unit(path, *unit)
+            for path, file_units in sorted(summaries.items())
+            for unit in file_units
+        ]
+        if len(units) < 2:
+            return []
+
+        parent = list(range(len(units)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a: int, b: int) -> None:
+            if not units[a].overlaps(units[b]):
+                parent[find(a)] = find(b)
+
+        # Exact clones: identical normalized token streams
+        by_hash: dict[str, list[int]] = defaultdict(list)
+        for uid, unit in enumerate(units):
+            by_hash[unit.exact_hash].append(uid)
+        for members in by_hash.values():
+            for other in members[1:]:
+                union(members[0], other)
+
+        # Near clones: count shared fingerprints through the inverted index
+        postings: dict[int, list[int]] = defaultdict(list)
+        for uid, unit in enumerate(units):
+            for fingerprint in unit.fingerprints:
+                postings[fingerprint].append(uid)
+
+        for uid, unit in enumerate(units):
+            shared: Counter[int] = Counter()
+            for fingerprint in unit.fingerprints:
+                candidates = postings[fingerprint]
+                if len(candidates) > self.MAX_POSTINGS:
+                    continue
+                shared.update(other for other in candidates if other > uid)
+            for other, count in shared.items():
+                size = max(len(unit.fingerprints), len(units[other].fingerprints))
+                if count / size >= self.similarity:
+                    union(uid, other)
+
+        groups: dict[int, list[int]] = defaultdict(list)
+        for uid in range(len(units)):
+            groups[find(uid)].append(uid)
+        clone_groups = [members for members in groups.values() if len(members) > 1]
+
+        # Drop groups that sit entirely inside another group's units
+        # (e.g. the matching loop of two duplicated functions)
+        clustered: dict[Path, list[int]] = defaultdict(list)
+        for members in clone_groups:
+            for uid in members:
+                clustered[units[uid].path].append(uid)
+
+        targets = []
+        for members in clone_groups:
+            nested = all(
+                any(
+                    other != uid and units[other].contains(units[uid])
+                    for other in clustered[units[uid].path]
+                )
+                for uid in members
+            )
+            if not nested:
+                targets.append(self._build_target([units[uid] for uid in members]))
+
+        logger.info(f"Found {len(targets)} duplicate groups across {len(units)} units")
+        return targets
+
+    def _build_target(self, members: list[_Unit]) -> TechDebtTarget:
+        """Report a clone group at its largest member, listing the other copies."""
+        members.sort(key=lambda unit: (-unit.lines, str(unit.path), unit.start_line))
+        primary, others = members[0], members[1:]
+
+        shown = ", ".join(
+            f"{unit.path}:{unit.start_line}-{unit.end_line}" for unit in others[:5]
+        )
+        if len(others) > 5:
+            shown += f" and {len(others) - 5} more"
+
+        # Severity grows with the amount of duplicated code
+        severity = min(1.0, (len(members) - 1) * primary.lines / 40)
+
+        return TechDebtTarget(
+            file_path=primary.path,
+            start_line=primary.start_line,
+            end_line=primary.end_line,
+            debt_type=DebtType.DUPLICATE,
+            severity=severity,
+            description=f"Duplicate code: {len(members)} similar copies ({shown})",
+            function_name=primary.name,
+            class_name=primary.class_name,
+            metric_value=float(len(members)),
+        )
@@ -0,0 +1,202 @@
+"""Compiled ignore matching for config ignore_paths and .gitignore files."""
+
+import re
+from dataclasses import dataclass
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a path glob into a regex matching slash-separated paths.
+
+    ``*`` and ``?`` stay within one path component, ``**/`` matches zero or
+    more directories, a trailing ``/**`` matches the directory itself and
+    everything below it, and ``**`` elsewhere matches anything.
+    """
+    suffix = ""
+    if pattern.endswith("/**"):
+        pattern = pattern[:-3]
+        suffix = "(?:/.*)?"
+    elif pattern == "**":
+        return ".*"
+
+    out: list[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**", i):
+            at_component_start = i == 0 or pattern[i - 1] == "/"
+            if at_component_start and pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+            else:
+                out.append(".*")
+                i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            close = pattern.find("]", i + 2 if pattern[i + 1 : i + 2] in ("!", "^") else i + 1)
+            if close == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : close]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = close
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return "".join(out) + suffix
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """One compiled ignore pattern."""
+
+    regex: str  # Matches the full slash-separated path relative to the repo root
+    negate: bool = False  # "!pattern" re-includes a previously ignored path
+    dir_only: bool = False  # "pattern/" only matches directories
+
+
+def config_rules(patterns: list[str]) -> list[IgnoreRule]:
+    """
+    Rules for RepoConfig.ignore_paths.
+
+    Globs with a slash are anchored at the repo root; those without one
+    (e.g. "*_pb2.py") match a name at any depth, as in .gitignore files.
+    """
+    rules = []
+    for pattern in patterns:
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            continue
+        regex = glob_to_regex(pattern)
+        rules.append(IgnoreRule(regex if "/" in pattern else "(?:.*/)?" + regex))
+    return rules
+
+
+def gitignore_rules(text: str, base: str = "") -> list[IgnoreRule]:
+    """
+    Parse a .gitignore file.
+
+    Args:
+        text: Content of the .gitignore file
+        base: Directory holding the file, relative to the repo root ("" for the root)
+
+    Returns:
+        Rules in file order
+    """
+    prefix = re.escape(base) + "/" if base else ""
+    rules: list[IgnoreRule] = []
+
+    for raw_line in text.splitlines():
+        line = raw_line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]  # "\#" and "\!" escape a literal first character
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory;
+        # otherwise it matches a name at any depth below it
+        if "/" in line:
+            pattern = glob_to_regex(line.lstrip("/"))
+        else:
+            pattern = "(?:.*/)?" + glob_to_regex(line)
+
+        rules.append(IgnoreRule(prefix + pattern, negate=negate, dir_only=dir_only))
+
+    return rules
+
+
+@dataclass(frozen=True)
+class _Segment:
+    """A run of consecutive rules sharing the same polarity, merged into one regex."""
+
+    negate: bool
+    file_regex: re.Pattern[str] | None
+    dir_regex: re.Pattern[str] | None
+
+
+def _union(regexes: list[str]) -> re.Pattern[str] | None:
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes))
+
+
+class IgnoreMatcher:
+    """
+    Decide whether a path is ignored, with gitignore's last-match-wins semantics.
+
+    Consecutive rules of the same polarity are compiled into a single regex, so
+    the common case (no negations) costs one regex match per path.
+    """
+
+    def __init__(self, rules: list[IgnoreRule] | None = None) -> None:
+        self.rules = list(rules or [])
+        self._segments: list[_Segment] = []
+
+        run: list[IgnoreRule] = []
+        for rule in self.rules:
+            if run and rule.negate != run[0].negate:
+                self._segments.append(self._compile(run))
+                run = []
+            run.append(rule)
+        if run:
+            self._segments.append(self._compile(run))
+
+    @staticmethod
+    def _compile(run: list[IgnoreRule]) -> _Segment:
+        return _Segment(
+            negate=run[0].negate,
+            file_regex=_union([rule.regex for rule in run if not rule.dir_only]),
+            dir_regex=_union([rule.regex for rule in run]),
+        )
+
+    @classmethod
+    def from_patterns(cls, patterns: list[str]) -> "IgnoreMatcher":
+        """Build a matcher for RepoConfig.ignore_paths."""
+        return cls(config_rules(patterns))
+
+    def extend(self, rules: list[IgnoreRule]) -> "IgnoreMatcher":
+        """Return a matcher with extra rules that take precedence over these."""
+        if not rules:
+            return self
+        return IgnoreMatcher(self.rules + rules)
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Check a single path (without looking at its parent directories).
+
+        Args:
+            path: Slash-separated path relative to the repo root
+            is_dir: Whether the path is a directory
+        """
+        for segment in reversed(self._segments):
+            regex = segment.dir_regex if is_dir else segment.file_regex
+            if regex is not None and regex.fullmatch(path):
+                return not segment.negate
+        return False
+
+    def matches(self, path: str) -> bool:
+        """Check a file path, treating it as ignored if any parent directory is."""
+        parts = path.split("/")
+        for depth in range(1, len(parts)):
+            if self.is_ignored("/".join(parts[:depth]), is_dir=True):
+                return True
+        return self.is_ignored(path)
@@ -0,0 +1,90 @@
+"""Parsed source file shared by all analyzers."""
+
+import ast
+from array import array
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+
+def find_line_offsets(data: bytes) -> array:
+    """Byte offset at which each line starts (index 0 is line 1)."""
+    offsets = array("Q", [0])
+    find = data.find
+    pos = find(b"\n")
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = find(b"\n", pos + 1)
+    return offsets
+
+
+def lines_to_span(
+    offsets: array, size: int, start_line: int, end_line: int
+) -> tuple[int, int]:
+    """
+    Byte range covering a 1-indexed, inclusive line range.
+
+    Args:
+        offsets: Line start offsets, from find_line_offsets
+        size: Length of the data in bytes
+        start_line: First line
+        end_line: Last line; its "\n" terminator is excluded
+
+    Returns:
+        (start, end) byte offsets
+    """
+    start = offsets[start_line - 1]
+    end = offsets[end_line] - 1 if end_line < len(offsets) else size
+    return start, max(start, end)
+
+
+def decode_segment(data: bytes) -> str:
+    """Decode a source byte range, normalizing line endings to "\n"."""
+    text = data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    return text[:-1] if text.endswith("\r") else text
+
+
+@dataclass
+class ParsedFile:
+    """A source file parsed once per scan and handed to every analyzer."""
+
+    path: Path  # Relative to repo root
+    source: bytes
+    tree: ast.Module
+
+    @classmethod
+    def parse(cls, path: Path, source: bytes) -> "ParsedFile":
+        """
+        Parse raw file content.
+
+        Raises:
+            SyntaxError: If the source is not valid Python
+            ValueError: If the source contains null bytes
+        """
+        return cls(path=path, source=source, tree=ast.parse(source, filename=str(path)))
+
+    @cached_property
+    def line_offsets(self) -> array:
+        """Byte offset at which each line starts (index 0 is line 1)."""
+        return find_line_offsets(self.source)
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines in the file."""
+        return len(self.line_offsets)
+
+    def line_span(self, start_line: int, end_line: int) -> tuple[int, int]:
+        """
+        Byte range covering a 1-indexed, inclusive line range.
+
+        The range excludes the line terminator of end_line.
+        """
+        start, end = lines_to_span(self.line_offsets, len(self.source), start_line, end_line)
+        if end > start and self.source[end - 1 : end] == b"\r":
+            end -= 1
+        return start, end
+
+    def segment(self, start_line: int, end_line: int) -> str:
+        """Source text of a 1-indexed, inclusive line range."""
+        start, end = self.line_span(start_line, end_line)
+        return decode_segment(self.source[start:end])
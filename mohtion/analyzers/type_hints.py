@@ -0,0 +1,180 @@
+"""Type hint coverage analyzer using Python AST."""
+
+import ast
+import logging
+from pathlib import Path
+from typing import Any
+
+from mohtion.analyzers.base import Analyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType, TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+# Decorators whose first parameter is not the implicit instance/class
+_STATIC_DECORATORS = frozenset({"staticmethod"})
+
+
+def _decorator_names(node: ast.FunctionDef | ast.AsyncFunctionDef) -> set[str]:
+    names = set()
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorator = decorator.func
+        if isinstance(decorator, ast.Name):
+            names.add(decorator.id)
+        elif isinstance(decorator, ast.Attribute):
+            names.add(decorator.attr)
+    return names
+
+
+class TypeHintVisitor(NodeHandler):
+    """
+    AST visitor that measures annotation coverage.
+
+    Every parameter and the return value of a function is an annotation slot.
+    The implicit first parameter of methods (self/cls) and the return of
+    __init__ aren't counted, since they're conventionally left bare.
+    """
+
+    def __init__(self) -> None:
+        self.functions: list[dict] = []
+        # "class" or "function" for each enclosing definition
+        self._scope_stack: list[str] = []
+        self._class_stack: list[str] = []
+
+    def enter_ClassDef(self, node: ast.ClassDef) -> None:
+        """Track current class context."""
+        self._scope_stack.append("class")
+        self._class_stack.append(node.name)
+
+    def leave_ClassDef(self, node: ast.ClassDef) -> None:
+        self._scope_stack.pop()
+        self._class_stack.pop()
+
+    def enter_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        """Count the annotated and total slots of a function signature."""
+        args = node.args
+        params = [*args.posonlyargs, *args.args]
+        is_method = bool(self._scope_stack) and self._scope_stack[-1] == "class"
+        if is_method and params and not (_decorator_names(node) & _STATIC_DECORATORS):
+            params = params[1:]
+        params += args.kwonlyargs
+        if args.vararg:
+            params.append(args.vararg)
+        if args.kwarg:
+            params.append(args.kwarg)
+
+        slots = len(params)
+        annotated = sum(1 for param in params if param.annotation is not None)
+        if node.name != "__init__":
+            slots += 1
+            annotated += node.returns is not None
+
+        self.functions.append({
+            "name": node.name,
+            "class_name": self._class_stack[-1] if is_method else None,
+            "start_line": node.lineno,
+            "end_line": node.end_lineno or node.lineno,
+            "slots": slots,
+            "annotated": annotated,
+        })
+        self._scope_stack.append("function")
+
+    def leave_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        self._scope_stack.pop()
+
+    enter_AsyncFunctionDef = enter_FunctionDef
+    leave_AsyncFunctionDef = leave_FunctionDef
+
+    @property
+    def slots(self) -> int:
+        return sum(func["slots"] for func in self.functions)
+
+    @property
+    def annotated(self) -> int:
+        return sum(func["annotated"] for func in self.functions)
+
+
+class TypeHintAnalyzer(Analyzer):
+    """Analyzer for missing type annotations in Python files."""
+
+    @property
+    def name(self) -> str:
+        return "type_hints"
+
+    def __init__(self, config: RepoConfig) -> None:
+        super().__init__(config)
+        self.threshold = config.thresholds.type_hint_coverage
+
+    def create_handler(self, parsed: ParsedFile) -> NodeHandler:
+        return _TypeHintHandler(self, parsed)
+
+    def finalize(self, summaries: dict[Path, Any]) -> list[TechDebtTarget]:
+        """Log repository-wide coverage and the least annotated modules."""
+        slots = sum(summary["slots"] for summary in summaries.values())
+        if not slots:
+            return []
+
+        annotated = sum(summary["annotated"] for summary in summaries.values())
+        worst = sorted(
+            (summary["annotated"] / summary["slots"], str(path))
+            for path, summary in summaries.items()
+            if summary["slots"]
+        )[:5]
+        logger.info(
+            f"Type hint coverage: {annotated / slots:.0%} over {len(summaries)} modules; "
+            "lowest: " + ", ".join(f"{path} ({coverage:.0%})" for coverage, path in worst)
+        )
+        return []
+
+
+class _TypeHintHandler(TypeHintVisitor):
+    """Turns the annotation coverage of one file into targets."""
+
+    def __init__(self, analyzer: TypeHintAnalyzer, parsed: ParsedFile) -> None:
+        super().__init__()
+        self.threshold = analyzer.threshold
+        self.parsed = parsed
+
+    def summary(self) -> Any:
+        """Module coverage, for the repository-wide report."""
+        return {"slots": self.slots, "annotated": self.annotated}
+
+    def results(self) -> list[TechDebtTarget]:
+        """Build targets for functions below the coverage threshold."""
+        slots = self.slots
+        module_coverage = self.annotated / slots if slots else 1.0
+        targets = []
+
+        for func in self.functions:
+            if not func["slots"]:
+                continue
+            coverage = func["annotated"] / func["slots"]
+            if coverage >= self.threshold:
+                continue
+
+            missing = func["slots"] - func["annotated"]
+            start_byte, end_byte = self.parsed.line_span(func["start_line"], func["end_line"])
+            # Functions missing many annotations come first
+            severity = min(1.0, missing / 10) * (1 - coverage)
+
+            targets.append(TechDebtTarget(
+                file_path=self.parsed.path,
+                start_line=func["start_line"],
+                end_line=func["end_line"],
+                debt_type=DebtType.TYPE_HINTS,
+                severity=severity,
+                description=(
+                    f"Missing type hints: {missing} of {func['slots']} annotations "
+                    f"(function coverage {coverage:.0%}, module coverage {module_coverage:.0%})"
+                ),
+                start_byte=start_byte,
+                end_byte=end_byte,
+                function_name=func["name"],
+                class_name=func["class_name"],
+                metric_value=coverage,
+            ))
+
+        return targets
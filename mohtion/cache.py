@@ -0,0 +1,162 @@
+"""Persistent on-disk key-value cache backed by SQLite."""
+
+import logging
+import sqlite3
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+# SQLite caps the number of bound parameters per statement
+_BATCH_SIZE = 500
+
+
+class DiskCache:
+    """
+    Key-value store with size and age based eviction.
+
+    Safe to share between worker processes: SQLite serializes writers and
+    WAL mode lets readers proceed while a write is in flight. Within a
+    process, calls may come from executor threads (one at a time), so the
+    connection isn't tied to the thread that opened it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 30 * 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            path: SQLite database file (parent directories are created)
+            max_bytes: Total value size to keep after eviction
+            max_age: Seconds since last access after which entries expire
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+        )
+
+    def get(self, key: str) -> bytes | None:
+        """Return the value for a key, or None on a miss (or expiry)."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        """Look up many keys at once, refreshing their access time."""
+        keys = list(keys)
+        found: dict[str, bytes] = {}
+        now = time.time()
+        cutoff = now - self.max_age
+
+        for i in range(0, len(keys), _BATCH_SIZE):
+            batch = keys[i : i + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, value FROM entries "
+                f"WHERE key IN ({placeholders}) AND accessed_at >= ?",
+                (*batch, cutoff),
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            hits = list(found)
+            for i in range(0, len(hits), _BATCH_SIZE):
+                batch = hits[i : i + _BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"UPDATE entries SET accessed_at = ? WHERE key IN ({placeholders})",
+                    (now, *batch),
+                )
+
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store a value."""
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[tuple[str, bytes]]) -> None:
+        """Store many values in a single transaction."""
+        now = time.time()
+        rows = [(key, value, len(value), now) for key, value in items]
+        if not rows:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove entries, ignoring keys that aren't stored."""
+        keys = list(keys)
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for i in range(0, len(keys), _BATCH_SIZE):
+                batch = keys[i : i + _BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM entries WHERE key IN ({placeholders})", batch)
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least recently used ones until under max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._conn:
+            self._conn.execute("BEGIN")
+            removed = self._conn.execute(
+                "DELETE FROM entries WHERE accessed_at < ?",
+                (time.time() - self.max_age,),
+            ).rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                # Walk entries oldest-first, accumulating size until the excess is covered
+                cutoff = self._conn.execute(
+                    "SELECT accessed_at FROM ("
+                    "  SELECT accessed_at, SUM(size) OVER (ORDER BY accessed_at) AS running"
+                    "  FROM entries"
+                    ") WHERE running >= ? ORDER BY accessed_at LIMIT 1",
+                    (excess,),
+                ).fetchone()
+                if cutoff is not None:
+                    removed += self._conn.execute(
+                        "DELETE FROM entries WHERE accessed_at <= ?", (cutoff[0],)
+                    ).rowcount
+
+        if removed:
+            logger.info(f"Evicted {removed} entries from {self.path.name}")
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._conn.execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
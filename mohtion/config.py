@@ -2,6 +2,7 @@
 
 import base64
 from functools import lru_cache
+from pathlib import Path
 
 from pydantic_settings import BaseSettings
 
@@ -16,6 +17,27 @@ class Settings(BaseSettings):
 
     # LLM
     anthropic_api_key: str
+    llm_model: str = "claude-sonnet-4-6"  # Large tier; every call when tiering is off
+    llm_fast_model: str = "claude-haiku-4-5"  # Fast tier, tried first on easy targets
+    llm_tiering_enabled: bool = True
+    llm_fast_max_severity: float = 0.4  # Targets up to this severity start on the fast tier
+    llm_fast_max_lines: int = 30  # So do targets up to this many lines
+    llm_tier_stats_max_age_days: int = 90  # Attempt log the thresholds are tuned from
+    llm_timeout_seconds: float = 180.0  # Whole request, including generation
+    llm_connect_timeout_seconds: float = 10.0
+    llm_max_connections: int = 10  # Shared by every job in a worker process
+    llm_keepalive_expiry_seconds: float = 30.0  # Idle pooled connections are closed after this
+    llm_max_retries: int = 2  # SDK retries on connection errors, 429s and 5xx
+    llm_batch_poll_seconds: float = 30.0  # Status checks of a sweep's Message Batches job
+    llm_batch_timeout_hours: float = 24.0  # Cancel what's still processing after this
+    llm_rate_limit_enabled: bool = True  # Cluster-wide limits, kept in Redis
+    llm_requests_per_minute: int = 50
+    llm_input_tokens_per_minute: int = 30_000  # Uncached input; cache reads don't count
+    llm_output_tokens_per_minute: int = 8_000
+    # Callers are deferred after waiting this long (within the worker's 10 minute job timeout)
+    llm_rate_limit_max_wait_seconds: float = 300.0
+    llm_rate_limit_defer_seconds: float = 120.0  # Deferred jobs retry after this x their try
+    llm_rate_limit_retries: int = 6  # Retries after 429s/overloads (replaces llm_max_retries)
 
     # Redis (for ARQ job queue)
     redis_url: str = "redis://localhost:6379"
@@ -26,11 +48,39 @@ class Settings(BaseSettings):
 
     # Agent settings
     max_retries: int = 2
+    self_heal_log_max_tokens: int = 2000  # Test output budget of a self-heal prompt
+    speculative_candidates: int = 0  # Refactors raced in parallel worktrees; 0 or 1 = off
     max_prs_per_day: int = 3
+    sweep_concurrency: int = 4  # Repositories of a sweep being scanned or verified at once
     default_complexity_threshold: int = 10
 
+    # Scanner settings
+    scan_workers: int = 0  # Process pool size, 0 = one per CPU
+    scan_chunk_size: int = 64  # Files per pool task
+    scan_parallel_min_files: int = 200  # Smaller repos are scanned serially
+    scan_use_git_index: bool = True  # List tracked files from git instead of walking
+    scan_max_file_bytes: int = 1_000_000  # Larger files (often generated) are skipped
+    scan_concurrency: int = 2  # Scans analyzing at once per worker process (of max_jobs)
+    loop_lag_bound_ms: int = 100  # Scans back off while the event loop lags more than this
+
+    # Persistent caches
+    cache_dir: str = "~/.cache/mohtion"
+    analysis_cache_enabled: bool = True
+    analysis_cache_max_mb: int = 512
+    analysis_cache_max_age_days: int = 30
+    churn_cache_max_mb: int = 64  # Churn indexes, one per repository HEAD
+    llm_cache_enabled: bool = True  # Reuse refactor/self-heal responses for identical requests
+    llm_cache_bypass: bool = False  # Always generate fresh responses (still stored)
+    llm_cache_max_mb: int = 256
+    llm_cache_max_age_days: int = 14
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
+    @property
+    def cache_path(self) -> Path:
+        """Resolved directory for persistent caches."""
+        return Path(self.cache_dir).expanduser()
+
     @property
     def github_private_key(self) -> str:
         """Decode the base64 encoded private key."""
@@ -29,15 +29,15 @@ class GitHubAPI:
     def __init__(self, github_app: GitHubApp, installation_id: int) -> None:
         self.github_app = github_app
         self.installation_id = installation_id
-        self._token: str | None = None
 
     async def _get_token(self) -> str:
-        """Get installation token (lazy loaded)."""
-        if self._token is None:
-            self._token = await self.github_app.get_installation_token(
-                self.installation_id
-            )
-        return self._token
+        """
+        Get an installation token.
+
+        Not kept here: tokens expire after an hour, and a sweep's bounties
+        outlive that. GitHubApp caches them and renews them before they expire.
+        """
+        return await self.github_app.get_installation_token(self.installation_id)
 
     async def _headers(self) -> dict[str, str]:
         """Get headers for API requests."""
@@ -73,15 +73,25 @@ class GitHubAPI:
         repo.git.checkout("-b", branch_name)
         return branch_name
 
+    def head_commit(self, repo_path: Path) -> str:
+        """SHA of the commit checked out in a clone."""
+        return Repo(repo_path).head.commit.hexsha
+
     def commit_changes(
-        self, repo_path: Path, file_path: Path, new_content: str, message: str
+        self, repo_path: Path, file_path: Path, new_content: str | None, message: str
     ) -> None:
-        """Commit changes to a file."""
+        """
+        Commit changes to a file.
+
+        Pass new_content=None when the file has already been written (e.g.
+        by SourceStore.flush) to commit it as it is on disk.
+        """
         repo = Repo(repo_path)
 
         # Write the new content
-        full_path = repo_path / file_path
-        full_path.write_text(new_content)
+        if new_content is not None:
+            full_path = repo_path / file_path
+            full_path.write_text(new_content)
 
         # Stage and commit
         repo.index.add([str(file_path)])
@@ -1,5 +1,25 @@
 """LLM integration package."""
 
-from mohtion.llm.client import LLMClient
+from mohtion.llm.client import (
+    BatchRefactor,
+    BatchResult,
+    LLMClient,
+    close_shared_client,
+    shared_client,
+)
+from mohtion.llm.response_cache import ResponseCache
+from mohtion.llm.streaming import MalformedResponseError
+from mohtion.llm.tiers import Tier, TierRouter, TierStats
 
-__all__ = ["LLMClient"]
+__all__ = [
+    "BatchRefactor",
+    "BatchResult",
+    "LLMClient",
+    "MalformedResponseError",
+    "ResponseCache",
+    "Tier",
+    "TierRouter",
+    "TierStats",
+    "close_shared_client",
+    "shared_client",
+]
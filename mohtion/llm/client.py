@@ -1,27 +1,354 @@
 """Claude LLM client for code analysis and refactoring."""
 
+import asyncio
+import itertools
+import json
 import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
 
 import anthropic
+import httpx
 
 from mohtion.config import get_settings
 from mohtion.llm.prompts import (
-    ANALYZE_ERROR_PROMPT,
-    REFACTOR_PROMPT,
+    ANALYZE_ERROR_REQUEST,
+    REFACTOR_ANSWER,
+    REFACTOR_APPROACH,
+    REFACTOR_APPROACHES,
+    REFACTOR_REQUEST,
+    REFACTOR_SYSTEM,
 )
+from mohtion.llm.rate_limit import (
+    PRIORITY_HIGH,
+    PRIORITY_NORMAL,
+    RateLimiter,
+    is_retryable,
+    shared_limiter,
+)
+from mohtion.llm.response_cache import ResponseCache, normalize, normalize_output
+from mohtion.llm.streaming import (
+    FENCE,
+    CodeBlockExtractor,
+    MalformedResponseError,
+    code_from_block,
+)
+from mohtion.llm.usage import LLMUsage, estimate_tokens, summarize
 
 logger = logging.getLogger(__name__)
 
+# Called with the code block as soon as it's complete; returning False rejects it
+CodeHook = Callable[[str], Awaitable[bool | None]]
+
+
+@dataclass
+class BatchRefactor:
+    """One refactor request of a batch; custom_id routes its result back to the caller."""
+
+    custom_id: str  # 1-64 characters of [a-zA-Z0-9_-], unique within the batch
+    code: str
+    debt_description: str
+    file_path: str
+    function_name: str | None = None
+    model: str | None = None  # Default: the client's model
+
+
+@dataclass
+class BatchResult:
+    """The outcome of one request of a batch."""
+
+    custom_id: str
+    refactored_code: str = ""
+    summary: str = ""
+    error: str | None = None  # Why there's no code (errored, expired, canceled, ...)
+    cache_key: str = ""  # Response cache entry, to discard if the code fails verification
+    model: str = ""
+    usage: LLMUsage | None = None  # None if answered from the response cache
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+# One pooled client per process, shared by every job's LLMClient
+_shared_client: anthropic.AsyncAnthropic | None = None
+
+
+def shared_client() -> anthropic.AsyncAnthropic:
+    """
+    Get the process-wide async Anthropic client, creating it on first use.
+
+    Its HTTP connections are kept alive and pooled, so concurrent jobs
+    overlap their requests over a bounded set of connections instead of each
+    opening its own.
+    """
+    global _shared_client
+    if _shared_client is None:
+        settings = get_settings()
+        timeout = anthropic.Timeout(
+            settings.llm_timeout_seconds, connect=settings.llm_connect_timeout_seconds
+        )
+        _shared_client = anthropic.AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            timeout=timeout,
+            max_retries=settings.llm_max_retries,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_connections,
+                    keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+                ),
+            ),
+        )
+    return _shared_client
+
+
+async def close_shared_client() -> None:
+    """Close the process-wide client's connections (e.g. on worker shutdown)."""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
+
 
 class LLMClient:
     """Claude API client for Mohtion operations."""
 
-    MODEL = "claude-sonnet-4-20250514"
+    MODEL = "claude-sonnet-4-6"
     MAX_TOKENS = 4096
 
-    def __init__(self) -> None:
-        settings = get_settings()
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+    def __init__(
+        self,
+        client: anthropic.AsyncAnthropic | None = None,
+        cache: ResponseCache | None = None,
+        bypass_cache: bool = False,
+        limiter: RateLimiter | None = None,
+        model: str | None = None,
+    ) -> None:
+        """
+        Args:
+            client: Async Anthropic client to use (default: the shared one)
+            cache: Persistent response cache; repeated requests are answered from it
+            bypass_cache: Always generate fresh responses (they're still stored)
+            limiter: Rate limiter to wait on before each call, which then also
+                handles retries (default: the shared one, with the shared client)
+            model: Model of calls that don't name one (default: MODEL)
+        """
+        if client is None:
+            client = shared_client()
+            limiter = limiter if limiter is not None else shared_limiter()
+        self.client = client
+        self.limiter = limiter
+        self.model = model or self.MODEL
+        # The limiter retries 429s and overloads itself, waiting for the whole cluster
+        self._api = client.with_options(max_retries=0) if limiter is not None else client
+        self.cache = cache
+        self.bypass_cache = bypass_cache
+        # Cache keys of every response this client returned, for forget_responses()
+        self.cache_keys: list[str] = []
+        # Token usage of every API call this client made
+        self.usage: list[LLMUsage] = []
+
+    @staticmethod
+    def _cached(text: str) -> dict[str, Any]:
+        """A text block marked as the end of a cacheable prompt prefix."""
+        return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+    def _refactor_turn(
+        self, code: str, debt_description: str, file_path: str, function_name: str | None
+    ) -> dict[str, Any]:
+        """The opening user turn, identical in a refactor and its self-heals so it stays cached."""
+        context = f"File: {file_path}"
+        if function_name:
+            context += f"\nFunction: {function_name}"
+        request = REFACTOR_REQUEST.format(
+            context=context, debt_description=debt_description, code=code
+        )
+        return {"role": "user", "content": [self._cached(request)]}
+
+    def _refactor_request(
+        self,
+        code: str,
+        debt_description: str,
+        file_path: str,
+        function_name: str | None,
+        model: str,
+        variant: int = 0,
+    ) -> tuple[str, list[dict[str, Any]]]:
+        """Response cache key and messages of a refactor request (see refactor_code's variant)."""
+        turn = self._refactor_turn(code, debt_description, file_path, function_name)
+        extra: dict[str, Any] = {}
+        if variant:
+            approach = REFACTOR_APPROACHES[(variant - 1) % len(REFACTOR_APPROACHES)]
+            turn["content"].append(
+                {"type": "text", "text": REFACTOR_APPROACH.format(approach=approach)}
+            )
+            extra["variant"] = variant
+        cache_key = ResponseCache.key(
+            "refactor",
+            model,
+            max_tokens=self.MAX_TOKENS,
+            code=normalize(code),
+            debt_description=normalize(debt_description),
+            file_path=file_path,
+            function_name=function_name,
+            **extra,
+        )
+        return cache_key, [turn]
+
+    async def _complete(
+        self,
+        kind: str,
+        messages: list[dict[str, Any]],
+        cache_key: str,
+        bypass_cache: bool = False,
+        on_code: CodeHook | None = None,
+        priority: int = PRIORITY_NORMAL,
+        model: str | None = None,
+        calls: list[LLMUsage] | None = None,
+    ) -> tuple[str, str | None]:
+        """
+        Get the response text for a conversation, from the response cache when possible.
+
+        The response is streamed. on_code is started with the code block as
+        soon as its closing fence arrives and runs while the rest of the
+        response streams in; if it returns False, the stream is cancelled and
+        MalformedResponseError raised. With a rate limiter, the call waits
+        for capacity (in priority order) and 429s, overloads and connection
+        errors are retried with backoff rather than raised. The call's usage
+        goes to self.usage and, if given, to calls: callers sharing the
+        client (e.g. speculative candidates) can't tell theirs apart in
+        self.usage.
+
+        Returns:
+            (response text, code passed to on_code, if it was called)
+        """
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            self.cache_keys.append(cache_key)
+            if not (bypass_cache or self.bypass_cache):
+                cached = await loop.run_in_executor(None, self.cache.get, cache_key)
+                if cached is not None:
+                    logger.info(f"LLM response cache hit ({cache_key[:12]})")
+                    code = None
+                    if on_code is not None and FENCE in cached:
+                        code = self._parse_refactor_response(cached)[0]
+                        if await on_code(code) is False:
+                            raise MalformedResponseError("Cached response's code was rejected")
+                    return cached, code
+
+        model = model or self.model
+        # The whole prompt, until the response says how much of it was cached
+        estimate = estimate_tokens(REFACTOR_SYSTEM + json.dumps(messages))
+        for attempt in itertools.count():
+            if self.limiter is not None:
+                await self.limiter.acquire(estimate, priority)
+            started = loop.time()
+            extractor = CodeBlockExtractor()
+            try:
+                content, response, code = await self._stream(
+                    kind, messages, on_code, model, extractor
+                )
+                break
+            except (Exception, asyncio.CancelledError) as e:
+                # Errors, rejected code and cancellation (e.g. a speculative candidate
+                # that lost) all settle what the call reserved
+                if self.limiter is not None:
+                    await asyncio.shield(self._settle_failed(estimate, extractor.text))
+                retryable = isinstance(
+                    e, (anthropic.APIStatusError, anthropic.APIConnectionError)
+                ) and is_retryable(e)
+                if self.limiter is None or not retryable or attempt >= self.limiter.max_retries:
+                    raise
+                await self.limiter.back_off(e, attempt)
+
+        usage = LLMUsage.from_response(kind, response.usage, model, loop.time() - started)
+        self.usage.append(usage)
+        if calls is not None:
+            calls.append(usage)
+        if self.limiter is not None:
+            # Cache reads don't count towards the input token rate limit
+            billed = usage.input_tokens + usage.cache_creation_input_tokens
+            await self.limiter.settle(estimate, billed, usage.output_tokens)
+        logger.info(
+            f"LLM {kind} ({model}, {usage.seconds:.1f}s): prompt cache "
+            f"{'hit' if usage.prompt_cache_hit else 'miss'}, "
+            f"{usage.cache_read_input_tokens} read / {usage.cache_creation_input_tokens} written "
+            f"/ {usage.input_tokens} uncached input tokens, {usage.output_tokens} output"
+        )
+
+        if self.cache is not None:
+            await loop.run_in_executor(None, self.cache.set, cache_key, content)
+        return content, code
+
+    async def _settle_failed(self, estimate: int, partial_text: str) -> None:
+        """
+        Correct the limiter for a call that didn't complete.
+
+        A request rejected before generating anything isn't billed, so its
+        reservation is given back; one cut short is billed for its input
+        and for the output generated so far.
+        """
+        assert self.limiter is not None
+        if partial_text:
+            await self.limiter.settle(estimate, estimate, estimate_tokens(partial_text))
+        else:
+            await self.limiter.settle(estimate, 0, 0)
+
+    async def _stream(
+        self,
+        kind: str,
+        messages: list[dict[str, Any]],
+        on_code: CodeHook | None,
+        model: str,
+        extractor: CodeBlockExtractor,
+    ) -> tuple[str, Any, str | None]:
+        """
+        One streamed request (see _complete).
+
+        The response text accumulates in extractor, so a caller can see how
+        much was generated if the request fails partway.
+
+        Returns:
+            (response text, final message, code passed to on_code, if it was called)
+        """
+        hook: asyncio.Task[bool | None] | None = None
+        try:
+            async with self._api.messages.stream(
+                model=model,
+                max_tokens=self.MAX_TOKENS,
+                # The instructions never change; cache them ahead of every conversation
+                system=[self._cached(REFACTOR_SYSTEM)],
+                messages=messages,
+            ) as stream:
+                async for delta in stream.text_stream:
+                    code = extractor.feed(delta)
+                    if code is not None and on_code is not None:
+                        logger.debug(f"LLM {kind}: code complete at {len(extractor.text)} chars")
+                        hook = asyncio.create_task(on_code(code))
+                    if hook is not None and hook.done() and hook.result() is False:
+                        # Leaving the stream closes the connection; the rest isn't generated
+                        raise MalformedResponseError(f"LLM {kind}: code rejected, stream cancelled")
+                response = await stream.get_final_message()
+            if hook is not None and await hook is False:
+                raise MalformedResponseError(f"LLM {kind}: code rejected")
+        finally:
+            if hook is not None and not hook.done():
+                hook.cancel()
+
+        return extractor.text, response, extractor.code if hook is not None else None
+
+    def usage_summary(self) -> dict[str, float]:
+        """Token totals (and prompt cache savings) over this client's calls."""
+        return summarize(self.usage)
+
+    async def forget_responses(self) -> None:
+        """Drop every response this client returned from the cache (e.g. they didn't pass tests)."""
+        if self.cache is not None and self.cache_keys:
+            keys, self.cache_keys = self.cache_keys, []
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.discard, keys)
 
     async def refactor_code(
         self,
@@ -29,6 +356,11 @@ class LLMClient:
         debt_description: str,
         file_path: str,
         function_name: str | None = None,
+        bypass_cache: bool = False,
+        on_code: CodeHook | None = None,
+        model: str | None = None,
+        variant: int = 0,
+        calls: list[LLMUsage] | None = None,
     ) -> tuple[str, str]:
         """
         Refactor code to fix identified tech debt.
@@ -38,51 +370,163 @@ class LLMClient:
             debt_description: Description of the tech debt issue
             file_path: Path to the file being refactored
             function_name: Name of the function (if applicable)
+            bypass_cache: Generate a fresh response even if one is cached
+            on_code: Started with the refactored code as soon as it has streamed
+                in, while the summary is still being generated; returning
+                False cancels the response (MalformedResponseError)
+            model: Model to ask (default: the client's model)
+            variant: For speculative candidates: above 0, the request also asks
+                for one of several approaches, so candidates differ (and are
+                cached separately)
+            calls: Gets the usage of the API call, if one is made (not on a
+                cache hit)
 
         Returns:
             Tuple of (refactored_code, summary_of_changes)
         """
-        context = f"File: {file_path}"
-        if function_name:
-            context += f"\nFunction: {function_name}"
+        logger.debug(f"Requesting refactor for {file_path}")
 
-        prompt = REFACTOR_PROMPT.format(
-            context=context,
-            debt_description=debt_description,
-            code=code,
+        model = model or self.model
+        cache_key, messages = self._refactor_request(
+            code, debt_description, file_path, function_name, model, variant
+        )
+        content, early_code = await self._complete(
+            "refactor", messages, cache_key, bypass_cache, on_code, model=model, calls=calls
         )
 
-        logger.debug(f"Requesting refactor for {file_path}")
+        # Parse response - expecting code block and summary
+        refactored_code, summary = self._parse_refactor_response(content)
+        # Whatever the hook acted on is the code
+        return early_code if early_code is not None else refactored_code, summary
 
-        # Use sync client in async context (anthropic handles this)
-        response = self.client.messages.create(
-            model=self.MODEL,
-            max_tokens=self.MAX_TOKENS,
-            messages=[{"role": "user", "content": prompt}],
+    async def refactor_batch(
+        self,
+        requests: list[BatchRefactor],
+        poll_interval: float = 30.0,
+        timeout: float = 24 * 3600,
+    ) -> dict[str, BatchResult]:
+        """
+        Refactor many targets as one asynchronous Message Batches job.
+
+        Meant for bulk sweeps, where no one waits on any single result: the
+        whole set is submitted at once instead of as one call per target, so
+        throughput isn't bound by per-request latency or connection limits.
+        Requests answered by the response cache aren't submitted.
+
+        Args:
+            requests: The refactors, each with a unique custom_id
+            poll_interval: Seconds between checks of the batch's status
+            timeout: Seconds to wait before canceling what's still processing
+
+        Returns:
+            Result for every request, by custom_id
+        """
+        loop = asyncio.get_running_loop()
+        results: dict[str, BatchResult] = {}
+        submitted: dict[str, str] = {}  # custom_id -> cache key
+        params: list[dict[str, Any]] = []
+
+        models: dict[str, str] = {}  # custom_id -> model
+        for request in requests:
+            model = models[request.custom_id] = request.model or self.model
+            cache_key, messages = self._refactor_request(
+                request.code,
+                request.debt_description,
+                request.file_path,
+                request.function_name,
+                model,
+            )
+            if self.cache is not None:
+                self.cache_keys.append(cache_key)
+                if not self.bypass_cache:
+                    cached = await loop.run_in_executor(None, self.cache.get, cache_key)
+                    if cached is not None:
+                        code, summary = self._parse_refactor_response(cached)
+                        results[request.custom_id] = BatchResult(
+                            request.custom_id, code, summary, cache_key=cache_key, model=model
+                        )
+                        continue
+            submitted[request.custom_id] = cache_key
+            params.append({
+                "custom_id": request.custom_id,
+                "params": {
+                    "model": model,
+                    "max_tokens": self.MAX_TOKENS,
+                    "system": [self._cached(REFACTOR_SYSTEM)],
+                    "messages": messages,
+                },
+            })
+
+        if not params:
+            return results
+
+        batch = await self.client.messages.batches.create(requests=params)  # type: ignore[arg-type]
+        logger.info(
+            f"Submitted LLM batch {batch.id}: {len(params)} refactors "
+            f"({len(results)} answered from cache)"
         )
 
-        # Parse response - expecting code block and summary
-        content = response.content[0].text
-        return self._parse_refactor_response(content)
+        deadline = loop.time() + timeout
+        while batch.processing_status != "ended":
+            if batch.processing_status == "in_progress" and loop.time() > deadline:
+                logger.warning(f"LLM batch {batch.id} timed out, canceling")
+                batch = await self.client.messages.batches.cancel(batch.id)
+                continue
+            await asyncio.sleep(poll_interval)
+            batch = await self.client.messages.batches.retrieve(batch.id)
+
+        async for entry in await self.client.messages.batches.results(batch.id):
+            custom_id = entry.custom_id
+            if custom_id not in submitted:
+                continue
+            outcome = entry.result
+            if outcome.type != "succeeded":
+                error = outcome.type
+                if outcome.type == "errored":
+                    error += f": {outcome.error.error.message}"
+                results[custom_id] = BatchResult(custom_id, error=error, model=models[custom_id])
+                continue
+
+            message = outcome.message
+            content = "".join(block.text for block in message.content if block.type == "text")
+            usage = LLMUsage.from_response("refactor_batch", message.usage, models[custom_id])
+            self.usage.append(usage)
+            cache_key = submitted[custom_id]
+            if self.cache is not None:
+                await loop.run_in_executor(None, self.cache.set, cache_key, content)
+            code, summary = self._parse_refactor_response(content)
+            results[custom_id] = BatchResult(
+                custom_id, code, summary, cache_key=cache_key, model=models[custom_id], usage=usage
+            )
+
+        counts = batch.request_counts
+        logger.info(
+            f"LLM batch {batch.id} ended: {counts.succeeded} succeeded, {counts.errored} errored, "
+            f"{counts.expired} expired, {counts.canceled} canceled"
+        )
+        for custom_id in submitted.keys() - results.keys():
+            results[custom_id] = BatchResult(
+                custom_id, error="no result returned", model=models[custom_id]
+            )
+        return results
 
     def _parse_refactor_response(self, content: str) -> tuple[str, str]:
-        """Parse LLM response into code and summary."""
+        """
+        Parse LLM response into code and summary.
+
+        The code is the first fenced block, the same one CodeBlockExtractor
+        hands to on_code while streaming, so a response gives the same code
+        whether it's streamed or replayed from the cache.
+        """
         # Look for code block
-        if "```" in content:
-            parts = content.split("```")
-            # Find the code block (skip language identifier if present)
-            code_block = ""
+        if FENCE in content:
+            parts = content.split(FENCE)
+            # The first block is the code (skip language identifier if present)
+            code_block = code_from_block(parts[1])
             summary = ""
 
             for i, part in enumerate(parts):
-                if i % 2 == 1:  # Odd indices are inside code blocks
-                    # Remove language identifier from first line if present
-                    lines = part.strip().split("\n")
-                    if lines and lines[0] in ("python", "py", "javascript", "js", "typescript", "ts"):
-                        code_block = "\n".join(lines[1:])
-                    else:
-                        code_block = part.strip()
-                elif i > 0:  # Text after code block
+                if i > 0 and i % 2 == 0:  # Text after code blocks
                     summary += part.strip()
 
             if not summary:
@@ -98,31 +542,67 @@ class LLMClient:
         original_code: str,
         refactored_code: str,
         test_output: str,
+        debt_description: str,
+        file_path: str,
+        function_name: str | None = None,
+        bypass_cache: bool = False,
+        on_code: CodeHook | None = None,
+        model: str | None = None,
+        calls: list[LLMUsage] | None = None,
     ) -> tuple[str, str]:
         """
         Analyze test failure and suggest a fix.
 
+        The request continues the refactor conversation (same system prompt
+        and opening turn), so the part already sent is read from the
+        provider's prompt cache rather than processed again.
+
         Args:
             original_code: The original code before refactoring
             refactored_code: The refactored code that caused test failure
             test_output: The test failure output/logs
+            debt_description: Description of the tech debt issue, as in the refactor
+            file_path: Path to the file being refactored
+            function_name: Name of the function (if applicable)
+            bypass_cache: Generate a fresh response even if one is cached
+            on_code: As for refactor_code, with the fixed code
+            model: Model to ask (default: the client's model); it may differ
+                from the refactor's, e.g. when a failed fast-tier refactor
+                is escalated
+            calls: As for refactor_code
 
         Returns:
             Tuple of (fixed_code, explanation)
         """
-        prompt = ANALYZE_ERROR_PROMPT.format(
-            original_code=original_code,
-            refactored_code=refactored_code,
-            test_output=test_output,
-        )
-
         logger.debug("Requesting error analysis for self-healing")
 
-        response = self.client.messages.create(
-            model=self.MODEL,
+        model = model or self.model
+        cache_key = ResponseCache.key(
+            "self_heal",
+            model,
             max_tokens=self.MAX_TOKENS,
-            messages=[{"role": "user", "content": prompt}],
+            original_code=normalize(original_code),
+            refactored_code=normalize(refactored_code),
+            test_output=normalize_output(test_output),
+            debt_description=normalize(debt_description),
+            file_path=file_path,
+            function_name=function_name,
         )
-
-        content = response.content[0].text
-        return self._parse_refactor_response(content)
+        messages = [
+            self._refactor_turn(original_code, debt_description, file_path, function_name),
+            {
+                "role": "assistant",
+                # Cached too, for the next attempt if this fix fails as well
+                "content": [self._cached(REFACTOR_ANSWER.format(refactored_code=refactored_code))],
+            },
+            {
+                "role": "user",
+                "content": ANALYZE_ERROR_REQUEST.format(test_output=test_output),
+            },
+        ]
+        # A bounty that's already this far goes ahead of new refactors
+        content, early_code = await self._complete(
+            "self_heal", messages, cache_key, bypass_cache, on_code, PRIORITY_HIGH, model, calls
+        )
+        fixed_code, explanation = self._parse_refactor_response(content)
+        return early_code if early_code is not None else fixed_code, explanation
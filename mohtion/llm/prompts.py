@@ -1,16 +1,11 @@
 """Prompt templates for LLM operations."""
 
-REFACTOR_PROMPT = """You are an expert code refactoring assistant. Your task is to refactor the following code to address the identified technical debt.
+# Refactor and self-heal prompts are split into a stable prefix (the system
+# prompt, then the refactor request) and a variable suffix, so the prefix can
+# be cached by the provider: a self-heal continues the refactor conversation
+# instead of resending the original code in a new prompt.
 
-{context}
-
-## Technical Debt Issue
-{debt_description}
-
-## Original Code
-```
-{code}
-```
+REFACTOR_SYSTEM = """You are an expert code refactoring assistant. You refactor code to address identified technical debt, and when a refactoring breaks the tests, you fix it.
 
 ## Requirements
 1. Refactor the code to fix the identified issue
@@ -27,38 +22,49 @@ Provide the refactored code in a code block, followed by a brief summary of chan
 ```
 
 Summary: Briefly describe what you changed and why.
+
+## When Tests Fail
+You will be shown the test failure output. Analyze why the refactored code broke the tests, then fix it while still addressing the original tech debt and keeping the original behavior. Respond with the fixed code in a code block, followed by "Explanation:" and what was wrong and how you fixed it.
 """
 
-ANALYZE_ERROR_PROMPT = """You are an expert debugging assistant. A code refactoring caused tests to fail. Analyze the error and fix the refactored code.
+REFACTOR_REQUEST = """Refactor the following code to address the identified technical debt.
+
+{context}
+
+## Technical Debt Issue
+{debt_description}
 
-## Original Code (working)
+## Original Code
 ```
-{original_code}
+{code}
 ```
+"""
 
-## Refactored Code (broken)
-```
+# Steers speculative candidates towards different refactorings of the same code.
+# Sent after the cached request, so every candidate still reads the cached prefix.
+REFACTOR_APPROACH = """## Approach
+Several refactorings of this code are being tried in parallel. {approach}
+"""
+
+REFACTOR_APPROACHES = [
+    "Prefer extracting small, well-named helper functions.",
+    "Prefer guard clauses and early returns to flatten the control flow.",
+    "Prefer replacing branching with data, such as lookup tables or mappings.",
+    "Prefer the smallest change that resolves the issue.",
+]
+
+# The assistant turn a self-heal continues from: the refactoring that was applied
+REFACTOR_ANSWER = """```python
 {refactored_code}
 ```
+"""
+
+ANALYZE_ERROR_REQUEST = """The refactored code above broke the tests.
 
 ## Test Failure Output
 ```
 {test_output}
 ```
-
-## Task
-1. Analyze why the refactored code broke the tests
-2. Fix the refactored code while still addressing the original tech debt
-3. Ensure the fix maintains the same behavior as the original
-
-## Response Format
-Provide the fixed code in a code block, followed by an explanation.
-
-```python
-# Your fixed code here
-```
-
-Explanation: What was wrong and how you fixed it.
 """
 
 VIBE_CHECK_PROMPT = """You are a code quality analyst. Review this code and identify potential issues.
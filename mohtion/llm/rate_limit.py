@@ -0,0 +1,354 @@
+"""Cluster-wide rate limiting of LLM calls, shared through Redis."""
+
+import asyncio
+import email.utils
+import heapq
+import itertools
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+import anthropic
+import redis.asyncio
+
+from mohtion.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Callers with a lower number go first
+PRIORITY_HIGH = 0  # Work on a bounty that's already been refactored (self-heals)
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class RateLimitTimeout(Exception):
+    """
+    A caller waited longer than the limiter's max_wait for capacity.
+
+    Not a failure of the work itself: the bounty is deferred and its job
+    retried later (see scan_repository).
+    """
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """A token bucket: up to `capacity` units, refilled at `per_minute`."""
+
+    name: str  # e.g. "requests", "input_tokens"
+    per_minute: float
+
+    @property
+    def capacity(self) -> float:
+        return self.per_minute
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+class LocalBuckets:
+    """Token buckets in this process only; for a single worker, or without Redis."""
+
+    def __init__(self) -> None:
+        # name -> (tokens, last refill time)
+        self._levels: dict[str, tuple[float, float]] = {}
+        self._blocked_until = 0.0
+
+    def _level(self, bucket: Bucket, now: float) -> float:
+        tokens, last = self._levels.get(bucket.name, (bucket.capacity, now))
+        return min(bucket.capacity, tokens + max(0.0, now - last) * bucket.per_second)
+
+    async def acquire(self, buckets: list[Bucket], costs: list[float]) -> float:
+        """Take costs from every bucket if all have enough; otherwise seconds to wait."""
+        now = time.monotonic()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        levels = [self._level(bucket, now) for bucket in buckets]
+        wait = 0.0
+        for bucket, level, cost in zip(buckets, levels, costs, strict=True):
+            # A cost above capacity waits for a full bucket rather than forever
+            need = min(cost, bucket.capacity)
+            if level < need:
+                wait = max(wait, (need - level) / bucket.per_second)
+        if wait == 0:
+            for bucket, level, cost in zip(buckets, levels, costs, strict=True):
+                self._levels[bucket.name] = (level - cost, now)
+        return wait
+
+    async def settle(self, buckets: list[Bucket], costs: list[float]) -> None:
+        """Take (or, if negative, return) units without waiting, e.g. actual minus estimate."""
+        now = time.monotonic()
+        for bucket, cost in zip(buckets, costs, strict=True):
+            level = self._level(bucket, now)
+            self._levels[bucket.name] = (min(bucket.capacity, level - cost), now)
+
+    async def block(self, seconds: float) -> None:
+        """Hold every caller back for a while (the API said to retry after it)."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def close(self) -> None:
+        pass
+
+
+# Token buckets updated atomically, on the Redis server's clock so every host agrees.
+# KEYS: one hash per bucket, then the "blocked until" key.
+# ARGV: mode ("acquire", "settle" or "block"), then capacity, per-second rate and
+# cost for each bucket (or, for "block", the seconds to block for).
+# Returns the seconds to wait as a string (Lua numbers become integers in replies).
+_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local mode = ARGV[1]
+local blocked_key = KEYS[#KEYS]
+local blocked = tonumber(redis.call('GET', blocked_key) or '0')
+
+if mode == 'block' then
+  local block_until = now + tonumber(ARGV[2])
+  if block_until > blocked then
+    local px = math.ceil(tonumber(ARGV[2]) * 1000)
+    redis.call('SET', blocked_key, tostring(block_until), 'PX', px)
+  end
+  return '0'
+end
+if mode == 'acquire' and blocked > now then
+  return tostring(blocked - now)
+end
+
+local n = #KEYS - 1
+local levels = {}
+local wait = 0
+for i = 1, n do
+  local capacity = tonumber(ARGV[3 * i - 1])
+  local rate = tonumber(ARGV[3 * i])
+  local cost = tonumber(ARGV[3 * i + 1])
+  local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or capacity
+  local ts = tonumber(state[2]) or now
+  tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+  levels[i] = tokens
+  local need = math.min(cost, capacity)
+  if mode == 'acquire' and tokens < need then
+    wait = math.max(wait, (need - tokens) / rate)
+  end
+end
+
+if wait == 0 then
+  for i = 1, n do
+    local capacity = tonumber(ARGV[3 * i - 1])
+    local rate = tonumber(ARGV[3 * i])
+    local cost = tonumber(ARGV[3 * i + 1])
+    local tokens = math.min(capacity, levels[i] - cost)
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) * 2 + 60)
+  end
+end
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets in Redis, shared by every worker process that uses the same prefix."""
+
+    def __init__(self, client: redis.asyncio.Redis, prefix: str = "mohtion:llm_rate") -> None:
+        """
+        Args:
+            client: Redis connection
+            prefix: Key prefix of the buckets
+        """
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_SCRIPT)
+
+    async def _run(self, mode: str, buckets: list[Bucket], args: list[float]) -> float:
+        keys = [f"{self.prefix}:{bucket.name}" for bucket in buckets] + [f"{self.prefix}:blocked"]
+        return float(await self._script(keys=keys, args=[mode, *args]))
+
+    @staticmethod
+    def _args(buckets: list[Bucket], costs: list[float]) -> list[float]:
+        return [
+            value
+            for bucket, cost in zip(buckets, costs, strict=True)
+            for value in (bucket.capacity, bucket.per_second, cost)
+        ]
+
+    async def acquire(self, buckets: list[Bucket], costs: list[float]) -> float:
+        return await self._run("acquire", buckets, self._args(buckets, costs))
+
+    async def settle(self, buckets: list[Bucket], costs: list[float]) -> None:
+        await self._run("settle", buckets, self._args(buckets, costs))
+
+    async def block(self, seconds: float) -> None:
+        await self._run("block", [], [seconds])
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class RateLimiter:
+    """
+    Waits for request and token capacity before each LLM call.
+
+    Capacity is a set of token buckets (requests, input tokens and output
+    tokens per minute) kept in a store shared by every worker, so the
+    cluster as a whole stays under the API's limits instead of each process
+    finding them with 429s. Callers queue by priority: only the head of this
+    process's queue polls the store, and a higher-priority caller overtakes
+    the ones already waiting.
+    """
+
+    def __init__(
+        self,
+        store: LocalBuckets | RedisBuckets,
+        requests_per_minute: float,
+        input_tokens_per_minute: float,
+        output_tokens_per_minute: float,
+        max_wait: float = 300.0,
+        max_retries: int = 6,
+    ) -> None:
+        """
+        Args:
+            store: Where the buckets are kept
+            requests_per_minute: Request rate limit
+            input_tokens_per_minute: Input token rate limit
+            output_tokens_per_minute: Output token rate limit
+            max_wait: Seconds a caller may wait before RateLimitTimeout
+            max_retries: Retries of a call after 429s, overloads or connection errors
+        """
+        self.store = store
+        self.buckets = [
+            Bucket("requests", requests_per_minute),
+            Bucket("input_tokens", input_tokens_per_minute),
+            Bucket("output_tokens", output_tokens_per_minute),
+        ]
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self._queue: list[tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._turn = asyncio.Condition()
+
+    async def acquire(self, input_tokens: int, priority: int = PRIORITY_NORMAL) -> None:
+        """
+        Wait until a call with about this many input tokens fits under the limits.
+
+        Output tokens aren't known yet; the call waits while an earlier one
+        has left the output bucket in debt, and reports its own via settle().
+        max_wait bounds the whole wait, in the queue as well as for capacity,
+        so a low-priority caller behind a stream of higher-priority ones
+        isn't held forever.
+
+        Raises:
+            RateLimitTimeout: No capacity within max_wait; the caller should
+                defer its work rather than fail it
+        """
+        ticket = (priority, next(self._tickets))
+        heapq.heappush(self._queue, ticket)
+        deadline = time.monotonic() + self.max_wait
+        costs = [1, input_tokens, 0]
+        try:
+            async with asyncio.timeout(self.max_wait):
+                while True:
+                    async with self._turn:
+                        await self._turn.wait_for(lambda: self._queue[0] == ticket)
+                    wait = await self.store.acquire(self.buckets, costs)
+                    if wait <= 0:
+                        return
+                    if time.monotonic() + wait > deadline:
+                        break  # Capacity won't be back in time; no point waiting for it
+                    logger.debug(f"LLM rate limit: waiting {wait:.2f}s (priority {priority})")
+                    # Small jitter so waiters in other processes don't all poll at once
+                    await asyncio.sleep(wait + random.uniform(0, min(wait, 1.0) / 4))
+        except TimeoutError:
+            pass
+        finally:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            async with self._turn:
+                self._turn.notify_all()
+        logger.warning(f"LLM rate limit: no capacity within {self.max_wait:.0f}s")
+        raise RateLimitTimeout(f"No LLM capacity within {self.max_wait:.0f}s")
+
+    async def settle(self, estimated_input: int, input_tokens: int, output_tokens: int) -> None:
+        """Correct the buckets with a call's actual usage."""
+        await self.store.settle(self.buckets, [0, input_tokens - estimated_input, output_tokens])
+
+    async def back_off(self, error: Exception, attempt: int) -> float:
+        """
+        Wait after a retryable error, and hold back every caller on a 429.
+
+        Returns:
+            Seconds waited
+        """
+        delay = backoff(attempt)
+        retry = retry_after(error)
+        if retry is not None:
+            delay = max(delay, retry)
+        if isinstance(error, anthropic.RateLimitError):
+            await self.store.block(delay)
+        logger.warning(f"LLM call failed ({type(error).__name__}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        return delay
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is worth waiting out: 429s, 5xx and 529 overloads, network errors."""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and (
+        error.status_code == 429 or error.status_code >= 500
+    )
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter, in seconds, for a 0-based retry attempt."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_after(error: Exception) -> float | None:
+    """The delay an API error asks for (retry-after-ms or retry-after headers), if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+        return None
+    except ValueError:
+        pass
+    # retry-after may also be an HTTP date
+    try:
+        date = email.utils.parsedate_to_datetime(headers["retry-after"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+# One limiter per process, shared by every job's LLMClient
+_shared_limiter: RateLimiter | None = None
+
+
+def shared_limiter() -> RateLimiter | None:
+    """The process-wide limiter on the queue's Redis, if rate limiting is enabled."""
+    global _shared_limiter
+    settings = get_settings()
+    if _shared_limiter is None and settings.llm_rate_limit_enabled:
+        _shared_limiter = RateLimiter(
+            RedisBuckets(redis.asyncio.Redis.from_url(settings.redis_url)),
+            requests_per_minute=settings.llm_requests_per_minute,
+            input_tokens_per_minute=settings.llm_input_tokens_per_minute,
+            output_tokens_per_minute=settings.llm_output_tokens_per_minute,
+            max_wait=settings.llm_rate_limit_max_wait_seconds,
+            max_retries=settings.llm_rate_limit_retries,
+        )
+    return _shared_limiter
+
+
+async def close_shared_limiter() -> None:
+    """Close the process-wide limiter's Redis connection (e.g. on worker shutdown)."""
+    global _shared_limiter
+    if _shared_limiter is not None:
+        await _shared_limiter.store.close()
+        _shared_limiter = None
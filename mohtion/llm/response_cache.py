@@ -0,0 +1,97 @@
+"""Persistent cache of LLM responses, keyed by what the prompt was built from."""
+
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+
+from mohtion.cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Parts of test output that change from run to run without meaning anything
+_VOLATILE = [
+    # Clone directories: tempfile.mkdtemp(prefix=f"mohtion_{repo}_")
+    (re.compile(r"(?:/[^\s/'\"]+)*/mohtion_[\w.-]*_[a-z0-9_]{8}"), "<repo>"),
+    (re.compile(r"\b0x[0-9a-f]{6,}\b"), "0x<addr>"),
+    (re.compile(r"\b\d+(?:\.\d+)?(?:s| seconds|ms)\b"), "<time>"),
+]
+
+
+def normalize(text: str) -> str:
+    """Canonical form of a prompt input: LF newlines, no trailing whitespace or edge blank lines."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def normalize_output(text: str) -> str:
+    """normalize(), plus masking of paths, addresses and timings in test output."""
+    text = normalize(text)
+    for pattern, replacement in _VOLATILE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class ResponseCache:
+    """
+    LLM responses stored by a hash of the request's normalized inputs and model.
+
+    The same function sent for the same fix (a rescan, a fork, a repeated
+    push) is answered from disk instead of a new generation. Entries expire
+    after max_age and the least recently used are evicted past max_bytes.
+    """
+
+    FILENAME = "llm_responses.sqlite3"
+    # Bump when the key derivation, the stored payload or the prompts change
+    FORMAT = "2"
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 14 * 24 * 3600,
+    ) -> None:
+        self.store = DiskCache(cache_dir / self.FILENAME, max_bytes=max_bytes, max_age=max_age)
+
+    @staticmethod
+    def key(kind: str, model: str, **inputs: object) -> str:
+        """
+        Cache key for a request.
+
+        Args:
+            kind: Which operation (e.g. "refactor", "self_heal")
+            model: Model the request is sent to
+            **inputs: Everything else that goes into the prompt or request, normalized
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps(
+            {"format": ResponseCache.FORMAT, "kind": kind, "model": model, "inputs": inputs},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """The stored response text for a key, if any."""
+        value = self.store.get(key)
+        return None if value is None else json.loads(value)["text"]
+
+    def set(self, key: str, text: str) -> None:
+        """Store a response text."""
+        self.store.set(key, json.dumps({"text": text}).encode("utf-8"))
+
+    def discard(self, keys: list[str]) -> None:
+        """Drop responses, e.g. ones whose code failed verification."""
+        if keys:
+            self.store.delete_many(keys)
+            logger.info(f"Discarded {len(keys)} cached LLM response(s)")
+
+    def evict(self) -> int:
+        """Apply age and size limits."""
+        return self.store.evict()
+
+    def close(self) -> None:
+        """Close the underlying store."""
+        self.store.close()
@@ -0,0 +1,57 @@
+"""Incremental extraction of the code block from a streamed LLM response."""
+
+# Fence info strings that are a language tag rather than the first line of code
+CODE_LANGUAGES = ("python", "py", "javascript", "js", "typescript", "ts")
+
+FENCE = "```"
+
+
+class MalformedResponseError(Exception):
+    """The response's code was rejected before the response finished."""
+
+
+def code_from_block(block: str) -> str:
+    """The code inside a fenced block (the text between two fences), minus any language tag."""
+    lines = block.strip().split("\n")
+    if lines and lines[0] in CODE_LANGUAGES:
+        return "\n".join(lines[1:])
+    return block.strip()
+
+
+class CodeBlockExtractor:
+    """
+    Finds the first fenced code block in text that arrives in pieces.
+
+    feed() returns the code as soon as the block's closing fence has been
+    seen, and None before that (and after). It's the same code
+    LLMClient._parse_refactor_response takes from the whole response.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.code: str | None = None
+        self._open: int | None = None  # Index just past the opening fence
+        self._scan_from = 0
+
+    def feed(self, delta: str) -> str | None:
+        """Add the next piece of text; returns the code the moment its block closes."""
+        if self.code is not None:
+            self.text += delta
+            return None
+
+        self.text += delta
+        # A fence may straddle two pieces, so rescan the last couple of characters
+        if self._open is None:
+            start = self.text.find(FENCE, self._scan_from)
+            if start == -1:
+                self._scan_from = max(0, len(self.text) - len(FENCE) + 1)
+                return None
+            self._open = self._scan_from = start + len(FENCE)
+
+        end = self.text.find(FENCE, self._scan_from)
+        if end == -1:
+            self._scan_from = max(self._open, len(self.text) - len(FENCE) + 1)
+            return None
+
+        self.code = code_from_block(self.text[self._open : end])
+        return self.code
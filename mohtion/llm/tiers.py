@@ -0,0 +1,204 @@
+"""Model tiers: which model refactors a target first, and how each tier performs."""
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from mohtion.config import Settings
+from mohtion.llm.usage import LLMUsage
+from mohtion.models.target import TechDebtTarget
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+LARGE = "large"
+
+
+@dataclass(frozen=True)
+class Tier:
+    """A model and the name its stats are recorded under."""
+
+    name: str  # FAST or LARGE
+    model: str
+
+
+class TierRouter:
+    """
+    Picks the model a target is first refactored with.
+
+    Low-severity or small targets go to the fast tier; the rest, and any
+    fast-tier attempt that fails verification, go to the large one.
+    Severity is used rather than metric_value because it's already
+    normalized per debt type (metric_value is a complexity for one analyzer
+    and a type hint coverage for another).
+    """
+
+    def __init__(
+        self,
+        large_model: str,
+        fast_model: str | None = None,
+        fast_max_severity: float = 0.4,
+        fast_max_lines: int = 30,
+    ) -> None:
+        """
+        Args:
+            large_model: Model of the large tier
+            fast_model: Model of the fast tier; None routes everything to the large one
+            fast_max_severity: Targets up to this severity go to the fast tier
+            fast_max_lines: So do targets up to this many lines of code
+        """
+        self.large = Tier(LARGE, large_model)
+        self.fast = Tier(FAST, fast_model) if fast_model and fast_model != large_model else None
+        self.fast_max_severity = fast_max_severity
+        self.fast_max_lines = fast_max_lines
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TierRouter":
+        return cls(
+            settings.llm_model,
+            settings.llm_fast_model if settings.llm_tiering_enabled else None,
+            fast_max_severity=settings.llm_fast_max_severity,
+            fast_max_lines=settings.llm_fast_max_lines,
+        )
+
+    def route(self, target: TechDebtTarget) -> Tier:
+        """The tier a target's first refactor goes to."""
+        if self.fast is None:
+            return self.large
+        small = _lines(target) <= self.fast_max_lines
+        if target.severity <= self.fast_max_severity or small:
+            return self.fast
+        return self.large
+
+    def escalate(self, tier: Tier) -> Tier | None:
+        """The tier to retry on after a failure on this one, None if it's the top tier."""
+        return self.large if tier != self.large else None
+
+    def tier_of(self, model: str) -> Tier:
+        """The tier a model belongs to (models outside both count as large)."""
+        if self.fast is not None and model == self.fast.model:
+            return self.fast
+        return self.large
+
+
+def _lines(target: TechDebtTarget) -> int:
+    return target.end_line - target.start_line + 1
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    recorded_at REAL NOT NULL,
+    tier TEXT NOT NULL,
+    model TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    debt_type TEXT NOT NULL,
+    severity REAL NOT NULL,
+    metric_value REAL,
+    lines INTEGER NOT NULL,
+    seconds REAL,
+    cost_usd REAL,
+    passed INTEGER NOT NULL
+)
+"""
+
+
+class TierStats:
+    """
+    Outcome of every tier's attempts, to tune the routing thresholds from.
+
+    Each refactor or self-heal is recorded with its target's severity,
+    metric value and size, the call's latency and estimated cost, and
+    whether the code passed verification. The table is plain SQLite, so
+    it can also be queried directly, e.g. for success rates by debt type.
+    Shared by worker processes the same way DiskCache is.
+    """
+
+    def __init__(self, path: Path, max_age: float = 90 * 24 * 3600) -> None:
+        """
+        Args:
+            path: SQLite database file (parent directories are created)
+            max_age: Seconds after which attempts are evicted
+        """
+        self.path = path
+        self.max_age = max_age
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+
+    def record(
+        self,
+        tier: Tier,
+        target: TechDebtTarget,
+        passed: bool,
+        usage: LLMUsage | None = None,
+        kind: str = "refactor",
+    ) -> None:
+        """
+        Record one attempt.
+
+        Args:
+            tier: The tier that generated the code
+            target: The target it was for
+            passed: Whether the code passed verification
+            usage: The call's usage (None if it's unknown, e.g. the call failed)
+            kind: The call's kind, if there's no usage
+        """
+        self._conn.execute(
+            "INSERT INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                time.time(),
+                tier.name,
+                tier.model,
+                usage.kind if usage is not None else kind,
+                target.debt_type.value,
+                target.severity,
+                target.metric_value,
+                _lines(target),
+                usage.seconds if usage is not None else None,
+                usage.cost_usd if usage is not None else None,
+                int(passed),
+            ),
+        )
+
+    def summary(self, since: float = 0.0) -> dict[str, dict[str, float]]:
+        """
+        Totals per tier over the attempts recorded since a time.
+
+        Returns:
+            By tier name: attempts, passed, success_rate, mean_seconds (of
+            calls with a latency) and cost_usd
+        """
+        rows = self._conn.execute(
+            "SELECT tier, COUNT(*), SUM(passed), AVG(seconds), TOTAL(cost_usd) "
+            "FROM attempts WHERE recorded_at >= ? GROUP BY tier",
+            (since,),
+        ).fetchall()
+        return {
+            tier: {
+                "attempts": attempts,
+                "passed": passed,
+                "success_rate": passed / attempts,
+                "mean_seconds": seconds or 0.0,
+                "cost_usd": cost,
+            }
+            for tier, attempts, passed, seconds, cost in rows
+        }
+
+    def evict(self) -> int:
+        """Delete attempts older than max_age; returns how many."""
+        cursor = self._conn.execute(
+            "DELETE FROM attempts WHERE recorded_at < ?", (time.time() - self.max_age,)
+        )
+        if cursor.rowcount:
+            logger.debug(f"Evicted {cursor.rowcount} tier stats rows")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,102 @@
+"""Token usage of LLM calls, including what provider prompt caching saved."""
+
+from dataclasses import dataclass
+from typing import Any
+
+# Price of cached prompt tokens relative to regular input tokens
+CACHE_READ_COST = 0.1
+CACHE_WRITE_COST = 1.25
+# Message Batches are billed at half price
+BATCH_COST = 0.5
+
+# USD per million input and output tokens, for the cost estimates of tier stats
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "claude-haiku-4-5": (1.0, 5.0),
+    "claude-sonnet-4-5": (3.0, 15.0),
+    "claude-sonnet-4-6": (3.0, 15.0),
+    "claude-opus-4-5": (5.0, 25.0),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class LLMUsage:
+    """Token counts of one messages API call."""
+
+    kind: str  # e.g. "refactor", "self_heal", "refactor_batch"
+    input_tokens: int = 0  # Uncached input after the last cache breakpoint
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    model: str = ""
+    seconds: float | None = None  # Time to the full response; None for batch results
+
+    @classmethod
+    def from_response(
+        cls, kind: str, usage: Any, model: str = "", seconds: float | None = None
+    ) -> "LLMUsage":
+        """Read the usage block of a messages API response."""
+        return cls(
+            kind=kind,
+            model=model,
+            seconds=seconds,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+        )
+
+    @property
+    def prompt_cache_hit(self) -> bool:
+        return self.cache_read_input_tokens > 0
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Whole prompt size, however it was billed."""
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+    @property
+    def saved_input_tokens(self) -> float:
+        """
+        Input-token equivalents saved by prompt caching on this call.
+
+        Reads cost a fraction of regular input; writes cost a premium, so a
+        call that only writes the cache has negative savings until a later
+        call reads it.
+        """
+        return (
+            self.cache_read_input_tokens * (1 - CACHE_READ_COST)
+            - self.cache_creation_input_tokens * (CACHE_WRITE_COST - 1)
+        )
+
+    @property
+    def cost_usd(self) -> float | None:
+        """Estimated price of the call, None if the model's prices aren't known."""
+        prices = MODEL_PRICES.get(self.model)
+        if prices is None:
+            return None
+        input_price, output_price = prices
+        input_tokens = (
+            self.input_tokens
+            + self.cache_creation_input_tokens * CACHE_WRITE_COST
+            + self.cache_read_input_tokens * CACHE_READ_COST
+        )
+        cost = (input_tokens * input_price + self.output_tokens * output_price) / 1_000_000
+        return cost * BATCH_COST if self.kind.endswith("_batch") else cost
+
+
+def summarize(calls: list[LLMUsage]) -> dict[str, float]:
+    """Totals over a list of calls, e.g. for a bounty's log line."""
+    return {
+        "calls": len(calls),
+        "prompt_cache_hits": sum(call.prompt_cache_hit for call in calls),
+        "prompt_tokens": sum(call.prompt_tokens for call in calls),
+        "cache_read_input_tokens": sum(call.cache_read_input_tokens for call in calls),
+        "cache_creation_input_tokens": sum(call.cache_creation_input_tokens for call in calls),
+        "output_tokens": sum(call.output_tokens for call in calls),
+        "saved_input_tokens": sum(call.saved_input_tokens for call in calls),
+    }
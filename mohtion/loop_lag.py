@@ -0,0 +1,81 @@
+"""Event loop lag monitoring, so CPU work that starves other jobs is visible."""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a short sleep.
+
+    A background task sleeps for `interval` over and over; anything beyond
+    that is time the loop spent unable to run callbacks (token refreshes,
+    webhook handling, LLM responses). CPU-heavy work checks headroom() and
+    backs off while lag is over the bound.
+    """
+
+    def __init__(self, bound: float = 0.1, interval: float = 0.05) -> None:
+        """
+        Args:
+            bound: Seconds of lag above which work should back off (and a warning is logged)
+            interval: Seconds between samples
+        """
+        self.bound = bound
+        self.interval = interval
+        self.lag = 0.0  # Latest sample
+        self.max_lag = 0.0
+        self.samples = 0
+        self.over_bound = 0  # Samples above the bound
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start sampling on the running loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+            self.samples += 1
+            if self.lag > self.bound:
+                self.over_bound += 1
+                logger.warning(
+                    f"Event loop lag {self.lag * 1000:.0f}ms (bound {self.bound * 1000:.0f}ms)"
+                )
+
+    async def headroom(self) -> None:
+        """Wait until the latest lag sample is back under the bound."""
+        while self._task is not None and self.lag > self.bound:
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict[str, float]:
+        """Lag summary (seconds), e.g. for job results."""
+        return {
+            "max_lag": self.max_lag,
+            "samples": self.samples,
+            "over_bound": self.over_bound,
+        }
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
@@ -17,6 +17,7 @@ class BountyStatus(str, Enum):
     SUCCESS = "success"  # PR opened successfully
     FAILED = "failed"  # Failed after max retries
     ABANDONED = "abandoned"  # Gave up (e.g., tests still fail)
+    DEFERRED = "deferred"  # No LLM capacity; to be retried later
 
 
 @dataclass
@@ -62,6 +63,11 @@ class BountyResult:
         self.error_message = error
         self.completed_at = datetime.utcnow()
 
+    def mark_deferred(self, reason: str) -> None:
+        """Mark the bounty as put off until there's capacity to work on it."""
+        self.status = BountyStatus.DEFERRED
+        self.error_message = reason
+
     def __str__(self) -> str:
         status_icon = {
             BountyStatus.SUCCESS: "✓",
@@ -69,5 +75,6 @@ class BountyResult:
             BountyStatus.IN_PROGRESS: "⋯",
             BountyStatus.TESTING: "🧪",
             BountyStatus.RETRYING: "↻",
+            BountyStatus.DEFERRED: "⏸",
         }.get(self.status, "?")
         return f"{status_icon} {self.target.location} [{self.status.value}]"
@@ -5,6 +5,8 @@ from pathlib import Path
 
 import yaml
 
+DEFAULT_ANALYZERS = ["complexity", "function_length", "nesting_depth", "type_hints", "duplicates"]
+
 
 @dataclass
 class Thresholds:
@@ -13,6 +15,18 @@ class Thresholds:
     cyclomatic_complexity: int = 10
     function_length: int = 50
     nesting_depth: int = 4
+    type_hint_coverage: float = 0.5  # Functions with less annotated signatures are reported
+    duplicate_min_lines: int = 6  # Smallest function/block compared for duplication
+    duplicate_similarity: float = 0.85  # Share of fingerprints two copies must have in common
+
+
+@dataclass
+class ChurnConfig:
+    """Ranking of targets by how often their code changes."""
+
+    enabled: bool = False
+    max_commits: int = 2000  # Most recent commits read from history
+    since_days: int | None = 365  # History window, counted back from HEAD's commit date
 
 
 @dataclass
@@ -27,13 +41,14 @@ class RepoConfig:
     test_command: str | None = None  # Auto-detect if not specified
 
     # Enabled analyzers
-    analyzers: list[str] = field(
-        default_factory=lambda: ["complexity", "type_hints", "duplicates"]
-    )
+    analyzers: list[str] = field(default_factory=lambda: list(DEFAULT_ANALYZERS))
 
     # Thresholds
     thresholds: Thresholds = field(default_factory=Thresholds)
 
+    # Churn-weighted ranking
+    churn: ChurnConfig = field(default_factory=ChurnConfig)
+
     # Paths to ignore
     ignore_paths: list[str] = field(
         default_factory=lambda: ["**/node_modules/**", "**/.venv/**", "**/vendor/**"]
@@ -49,14 +64,25 @@ class RepoConfig:
             cyclomatic_complexity=thresholds_data.get("cyclomatic_complexity", 10),
             function_length=thresholds_data.get("function_length", 50),
             nesting_depth=thresholds_data.get("nesting_depth", 4),
+            type_hint_coverage=thresholds_data.get("type_hint_coverage", 0.5),
+            duplicate_min_lines=thresholds_data.get("duplicate_min_lines", 6),
+            duplicate_similarity=thresholds_data.get("duplicate_similarity", 0.85),
+        )
+
+        churn_data = data.pop("churn", {})
+        churn = ChurnConfig(
+            enabled=churn_data.get("enabled", False),
+            max_commits=churn_data.get("max_commits", 2000),
+            since_days=churn_data.get("since_days", 365),
         )
 
         return cls(
             scan_interval=data.get("scan_interval", "24h"),
             max_prs_per_day=data.get("max_prs_per_day", 3),
             test_command=data.get("test_command"),
-            analyzers=data.get("analyzers", ["complexity", "type_hints", "duplicates"]),
+            analyzers=data.get("analyzers", list(DEFAULT_ANALYZERS)),
             thresholds=thresholds,
+            churn=churn,
             ignore_paths=data.get(
                 "ignore_paths", ["**/node_modules/**", "**/.venv/**", "**/vendor/**"]
             ),
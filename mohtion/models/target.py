@@ -1,35 +1,108 @@
 """Tech debt target model."""
 
-from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
+from typing import Any, Protocol
 
 
 class DebtType(str, Enum):
     """Types of technical debt that Mohtion can detect."""
 
     COMPLEXITY = "complexity"  # High cyclomatic complexity
+    FUNCTION_LENGTH = "function_length"  # Overly long function
+    NESTING = "nesting_depth"  # Deeply nested blocks
     TYPE_HINTS = "type_hints"  # Missing type annotations
     DUPLICATE = "duplicate"  # Duplicate code blocks
     DEPRECATION = "deprecation"  # Deprecated API usage
 
 
-@dataclass
+class SnippetSource(Protocol):
+    """Where a target's code is read from when it's first needed."""
+
+    def line_span(self, path: Path, start_line: int, end_line: int) -> tuple[int, int]:
+        """Byte range of a 1-indexed, inclusive line range of a file."""
+        ...
+
+    def read(self, path: Path, start: int, end: int) -> str:
+        """Source text of a byte range of a file."""
+        ...
+
+
 class TechDebtTarget:
-    """A specific piece of technical debt identified in the codebase."""
+    """
+    A specific piece of technical debt identified in the codebase.
 
-    file_path: Path
-    start_line: int
-    end_line: int
-    debt_type: DebtType
-    severity: float  # 0.0 to 1.0, higher = more severe
-    description: str
-    code_snippet: str  # The actual code that needs refactoring
+    Targets are compact records: they point at a file and a line/byte span
+    rather than carrying the code itself. code_snippet is read from the bound
+    SnippetSource the first time it's accessed, so a scan holds source text
+    only for the targets that actually get refactored.
+    """
 
-    # Optional metadata
-    function_name: str | None = None
-    class_name: str | None = None
-    metric_value: float | None = None  # e.g., cyclomatic complexity score
+    __slots__ = (
+        "file_path",
+        "start_line",
+        "end_line",
+        "debt_type",
+        "severity",
+        "description",
+        "function_name",
+        "class_name",
+        "metric_value",
+        "metrics",
+        "start_byte",
+        "end_byte",
+        "source",
+        "_code_snippet",
+    )
+
+    def __init__(
+        self,
+        file_path: Path,
+        start_line: int,
+        end_line: int,
+        debt_type: DebtType,
+        severity: float,  # 0.0 to 1.0, higher = more severe
+        description: str,
+        code_snippet: str | None = None,  # Known up front; otherwise read from source
+        function_name: str | None = None,
+        class_name: str | None = None,
+        metric_value: float | None = None,  # e.g., cyclomatic complexity score
+        metrics: dict[str, float] | None = None,  # Every metric measured, by name
+        start_byte: int | None = None,  # Byte span of the code, if known
+        end_byte: int | None = None,
+        source: SnippetSource | None = None,
+    ) -> None:
+        self.file_path = file_path
+        self.start_line = start_line
+        self.end_line = end_line
+        self.debt_type = debt_type
+        self.severity = severity
+        self.description = description
+        self.function_name = function_name
+        self.class_name = class_name
+        self.metric_value = metric_value
+        self.metrics = metrics
+        self.start_byte = start_byte
+        self.end_byte = end_byte
+        self.source = source
+        self._code_snippet = code_snippet
+
+    @property
+    def code_snippet(self) -> str:
+        """The actual code that needs refactoring."""
+        if self._code_snippet is None:
+            if self.source is None:
+                raise LookupError(f"No source bound to read {self.location} from")
+            if self.start_byte is None or self.end_byte is None:
+                self.start_byte, self.end_byte = self.source.line_span(
+                    self.file_path, self.start_line, self.end_line
+                )
+            self._code_snippet = self.source.read(self.file_path, self.start_byte, self.end_byte)
+        return self._code_snippet
+
+    @code_snippet.setter
+    def code_snippet(self, value: str) -> None:
+        self._code_snippet = value
 
     @property
     def location(self) -> str:
@@ -41,5 +114,53 @@ class TechDebtTarget:
             parts.append(self.function_name)
         return ":".join(parts) + f" (lines {self.start_line}-{self.end_line})"
 
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize to a JSON-compatible dict (without the file path or code)."""
+        return {
+            "start_line": self.start_line,
+            "end_line": self.end_line,
+            "start_byte": self.start_byte,
+            "end_byte": self.end_byte,
+            "debt_type": self.debt_type.value,
+            "severity": self.severity,
+            "description": self.description,
+            "function_name": self.function_name,
+            "class_name": self.class_name,
+            "metric_value": self.metric_value,
+            "metrics": self.metrics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], file_path: Path) -> "TechDebtTarget":
+        """Rebuild a target serialized by to_dict for the given file."""
+        return cls(
+            file_path=file_path,
+            start_line=data["start_line"],
+            end_line=data["end_line"],
+            start_byte=data.get("start_byte"),
+            end_byte=data.get("end_byte"),
+            debt_type=DebtType(data["debt_type"]),
+            severity=data["severity"],
+            description=data["description"],
+            function_name=data.get("function_name"),
+            class_name=data.get("class_name"),
+            metric_value=data.get("metric_value"),
+            metrics=data.get("metrics"),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TechDebtTarget):
+            return NotImplemented
+        return (self.file_path, self.to_dict()) == (other.file_path, other.to_dict())
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"TechDebtTarget(file_path={self.file_path!r}, start_line={self.start_line}, "
+            f"end_line={self.end_line}, debt_type={self.debt_type}, "
+            f"severity={self.severity!r}, function_name={self.function_name!r})"
+        )
+
     def __str__(self) -> str:
         return f"[{self.debt_type.value}] {self.location}: {self.description}"
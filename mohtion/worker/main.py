@@ -1,12 +1,17 @@
 """ARQ worker configuration and runner."""
 
+import asyncio
 import logging
 
 from arq import create_pool
 from arq.connections import RedisSettings
+from arq.worker import func
 
 from mohtion.config import get_settings
-from mohtion.worker.tasks import scan_repository
+from mohtion.llm.client import close_shared_client
+from mohtion.llm.rate_limit import close_shared_limiter
+from mohtion.loop_lag import LoopLagMonitor
+from mohtion.worker.tasks import nightly_sweep, scan_repository
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +30,11 @@ def get_redis_settings() -> RedisSettings:
 class WorkerSettings:
     """ARQ worker settings."""
 
-    functions = [scan_repository]
+    functions = [
+        scan_repository,
+        # Waits on a Message Batches job, which may take up to its own timeout
+        func(nightly_sweep, timeout=int(get_settings().llm_batch_timeout_hours * 3600) + 3600),
+    ]
     redis_settings = get_redis_settings()
 
     # Worker configuration
@@ -37,11 +46,26 @@ class WorkerSettings:
     async def on_startup(ctx: dict) -> None:
         """Called when worker starts."""
         logger.info("Mohtion worker starting...")
+        settings = get_settings()
+        # Scans are CPU-heavy; only a few of the concurrent jobs may analyze at once
+        ctx["scan_slots"] = asyncio.Semaphore(max(1, settings.scan_concurrency))
+        ctx["lag_monitor"] = monitor = LoopLagMonitor(bound=settings.loop_lag_bound_ms / 1000)
+        monitor.start()
 
     @staticmethod
     async def on_shutdown(ctx: dict) -> None:
         """Called when worker shuts down."""
         logger.info("Mohtion worker shutting down...")
+        await close_shared_client()
+        await close_shared_limiter()
+        monitor: LoopLagMonitor | None = ctx.get("lag_monitor")
+        if monitor is not None:
+            await monitor.stop()
+            stats = monitor.stats()
+            logger.info(
+                f"Event loop lag: max {stats['max_lag'] * 1000:.0f}ms, "
+                f"{stats['over_bound']} of {stats['samples']} samples over bound"
+            )
 
 
 async def run_worker() -> None:
@@ -65,3 +89,11 @@ async def enqueue_scan(
     )
     await redis.close()
     return job.job_id if job else ""
+
+
+async def enqueue_sweep(repos: list[dict]) -> str:
+    """Enqueue a sweep of many repositories (dicts of owner, repo, installation_id, branch)."""
+    redis = await create_pool(get_redis_settings())
+    job = await redis.enqueue_job("nightly_sweep", repos=repos)
+    await redis.close()
+    return job.job_id if job else ""
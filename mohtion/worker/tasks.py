@@ -2,9 +2,17 @@
 
 import logging
 
+from arq import Retry
+
 from mohtion.agent.orchestrator import Orchestrator
+from mohtion.agent.sweep import run_sweep
+from mohtion.config import get_settings
 from mohtion.integrations.github_api import GitHubAPI
 from mohtion.integrations.github_app import GitHubApp
+from mohtion.llm.client import LLMClient
+from mohtion.llm.rate_limit import RateLimitTimeout
+from mohtion.llm.response_cache import ResponseCache
+from mohtion.llm.tiers import TierRouter
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +36,9 @@ async def scan_repository(
 
     Returns:
         Summary of scan results
+
+    Raises:
+        Retry: No LLM capacity in time; ARQ runs the job again after a delay
     """
     logger.info(f"Starting scan of {owner}/{repo} (branch: {branch})")
 
@@ -35,8 +46,14 @@ async def scan_repository(
     github_app = GitHubApp()
     github_api = GitHubAPI(github_app, installation_id)
 
-    # Run the orchestrator
-    orchestrator = Orchestrator(github_api, owner, repo)
+    # Run the orchestrator, sharing the worker's scan limit with concurrent jobs
+    orchestrator = Orchestrator(
+        github_api,
+        owner,
+        repo,
+        scan_slots=ctx.get("scan_slots"),
+        lag_monitor=ctx.get("lag_monitor"),
+    )
 
     try:
         result = await orchestrator.run(branch)
@@ -47,6 +64,11 @@ async def scan_repository(
             "repo": repo,
             "result": str(result),
         }
+    except RateLimitTimeout:
+        # The cluster is out of LLM capacity: run the job again later instead of failing it
+        defer = get_settings().llm_rate_limit_defer_seconds * ctx.get("job_try", 1)
+        logger.warning(f"Scan of {owner}/{repo} deferred by {defer:.0f}s: no LLM capacity")
+        raise Retry(defer=defer) from None
     except Exception as e:
         logger.exception(f"Scan failed for {owner}/{repo}")
         return {
@@ -55,3 +77,64 @@ async def scan_repository(
             "repo": repo,
             "error": str(e),
         }
+
+
+async def nightly_sweep(ctx: dict, repos: list[dict]) -> dict:
+    """
+    Bulk task: scan many repositories and refactor their targets as one LLM batch.
+
+    Args:
+        ctx: ARQ context (injected by worker)
+        repos: Repositories to sweep, each a dict with owner, repo,
+            installation_id and optionally branch (default: main)
+
+    Returns:
+        Summary of the sweep, per repository
+    """
+    settings = get_settings()
+    logger.info(f"Starting sweep of {len(repos)} repositories")
+
+    github_app = GitHubApp()
+    orchestrators: dict[str, Orchestrator] = {}
+    base_branches: dict[str, str] = {}
+    for entry in repos:
+        label = f"{entry['owner']}/{entry['repo']}"
+        orchestrators[label] = Orchestrator(
+            GitHubAPI(github_app, entry["installation_id"]),
+            entry["owner"],
+            entry["repo"],
+            scan_slots=ctx.get("scan_slots"),
+            lag_monitor=ctx.get("lag_monitor"),
+        )
+        base_branches[label] = entry.get("branch", "main")
+
+    cache = None
+    if settings.llm_cache_enabled:
+        cache = ResponseCache(
+            settings.cache_path,
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+            max_age=settings.llm_cache_max_age_days * 24 * 3600,
+        )
+    try:
+        bounties = await run_sweep(
+            orchestrators,
+            LLMClient(
+                cache=cache, bypass_cache=settings.llm_cache_bypass, model=settings.llm_model
+            ),
+            base_branches,
+            concurrency=settings.sweep_concurrency,
+            poll_interval=settings.llm_batch_poll_seconds,
+            timeout=settings.llm_batch_timeout_hours * 3600,
+            router=TierRouter.from_settings(settings),
+        )
+    finally:
+        if cache is not None:
+            cache.evict()
+            cache.close()
+
+    results = {
+        label: "no target" if bounty is None else bounty.status.value
+        for label, bounty in bounties.items()
+    }
+    logger.info(f"Sweep complete: {results}")
+    return {"status": "success", "results": results}
@@ -0,0 +1,257 @@
+"""A local HTTP stand-in for the Anthropic messages API, for tests that go through the real SDK.
+
+Simulates prompt caching: every block marked with cache_control ends a
+cacheable prefix, and a later request sharing that exact prefix reads it
+from the cache. Token counts are a rough len(text) / 4. Streaming requests
+get server-sent events, the reply split into chunk_size pieces sent
+chunk_delay seconds apart. Message batches end after batch_polls status
+checks; custom_ids in batch_errors come back errored. The first messages
+requests can be answered with errors: (status, headers) each, in order.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+DEFAULT_REPLY = "```python\ndef f():\n    return 1\n```\nSummary: Simplified."
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _blocks(body: dict[str, Any]) -> list[dict[str, Any]]:
+    """System and message content as one flat list of blocks, in prompt order."""
+    blocks: list[dict[str, Any]] = []
+    system = body.get("system", [])
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    blocks.extend(system)
+    for message in body["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for block in content:
+            blocks.append({**block, "role": message["role"]})
+    return blocks
+
+
+class MessagesStub:
+    """Serves POST /v1/messages on localhost; use as a context manager."""
+
+    def __init__(
+        self,
+        reply: Callable[[dict[str, Any]], str] | None = None,
+        chunk_size: int = 16,
+        chunk_delay: float = 0.0,
+        batch_polls: int = 1,
+        batch_errors: set[str] | None = None,
+        errors: list[tuple[int, dict[str, str]]] | None = None,
+    ) -> None:
+        self.reply = reply or (lambda body: DEFAULT_REPLY)
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.batch_polls = batch_polls
+        self.batch_errors = batch_errors or set()
+        self.batches: dict[str, dict[str, Any]] = {}
+        self.errors = list(errors or [])
+        self.attempts = 0  # messages requests, including the ones answered with errors
+        self.requests: list[dict[str, Any]] = []
+        # Text chunks each streamed response got out before it finished or the client left
+        self.chunks_sent: list[int] = []
+        self._cached_prefixes: set[str] = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+                path = self.path.split("?")[0]
+                if path == "/v1/messages/batches":
+                    self.send(stub.create_batch(body))
+                    return
+                if path.endswith("/cancel"):
+                    self.send(stub.cancel_batch(path.split("/")[-2]))
+                    return
+                stub.attempts += 1
+                if stub.errors:
+                    status, headers = stub.errors.pop(0)
+                    error = {"type": "rate_limit_error", "message": "Slow down"}
+                    payload = json.dumps({"type": "error", "error": error}).encode()
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                message = stub.respond(body)
+                if body.get("stream"):
+                    stub.stream(self, message)
+                    return
+                self.send(message)
+
+            def do_GET(self) -> None:  # noqa: N802
+                path = self.path.split("?")[0]
+                if path.endswith("/results"):
+                    batch = stub.batches[path.split("/")[-2]]
+                    lines = "".join(json.dumps(result) + "\n" for result in batch["results"])
+                    self.send(lines.encode(), "application/binary")
+                    return
+                self.send(stub.retrieve_batch(path.split("/")[-1]))
+
+            def send(self, body: Any, content_type: str = "application/json") -> None:
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def usage(self, body: dict[str, Any]) -> dict[str, int]:
+        """Token usage for a request, updating the simulated prompt cache."""
+        blocks = _blocks(body)
+        digest = hashlib.sha256()
+        # (tokens up to and including the block, prefix hash) at each breakpoint
+        breakpoints: list[tuple[int, str]] = []
+        total = 0
+        for block in blocks:
+            digest.update(json.dumps(block.get("text", ""), sort_keys=True).encode())
+            total += _tokens(block.get("text", ""))
+            if "cache_control" in block:
+                breakpoints.append((total, digest.hexdigest()))
+
+        cached = self._cached_prefixes
+        read = max((tokens for tokens, key in breakpoints if key in cached), default=0)
+        written = max((tokens for tokens, _ in breakpoints), default=0)
+        self._cached_prefixes.update(key for _, key in breakpoints)
+        return {
+            "input_tokens": total - max(read, written),
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": max(0, written - read),
+        }
+
+    def respond(self, body: dict[str, Any]) -> dict[str, Any]:
+        self.requests.append(body)
+        text = self.reply(body)
+        return {
+            "id": f"msg_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {**self.usage(body), "output_tokens": _tokens(text)},
+        }
+
+    def stream(self, handler: BaseHTTPRequestHandler, message: dict[str, Any]) -> None:
+        """Send a message as the events of a streaming response."""
+        text = message["content"][0]["text"]
+        chunks = [text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        start = {**message, "content": [], "stop_reason": None}
+        block = {"type": "text", "text": ""}
+        events = [
+            {"type": "message_start", "message": start},
+            {"type": "content_block_start", "index": 0, "content_block": block},
+            *(
+                {"type": "content_block_delta", "index": 0, "delta": delta}
+                for delta in ({"type": "text_delta", "text": c} for c in chunks)
+            ),
+            {"type": "content_block_stop", "index": 0},
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": message["usage"]["output_tokens"]},
+            },
+            {"type": "message_stop"},
+        ]
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.end_headers()
+        sent = 0
+        try:
+            for event in events:
+                if event["type"] == "content_block_delta":
+                    time.sleep(self.chunk_delay)
+                    sent += 1
+                frame = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                handler.wfile.write(frame.encode())
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client cancelled
+        finally:
+            self.chunks_sent.append(sent)
+
+    def create_batch(self, body: dict[str, Any]) -> dict[str, Any]:
+        batch_id = f"msgbatch_{len(self.batches) + 1}"
+        self.batches[batch_id] = {
+            "requests": body["requests"],
+            "polls": 0,
+            "status": "in_progress",
+            "results": [],
+        }
+        return self._batch(batch_id)
+
+    def retrieve_batch(self, batch_id: str) -> dict[str, Any]:
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["status"] == "canceling":
+            batch["results"] = [
+                {"custom_id": request["custom_id"], "result": {"type": "canceled"}}
+                for request in batch["requests"]
+            ]
+            batch["status"] = "ended"
+        elif batch["status"] == "in_progress" and batch["polls"] >= self.batch_polls:
+            batch["results"] = [self._batch_result(request) for request in batch["requests"]]
+            batch["status"] = "ended"
+        return self._batch(batch_id)
+
+    def cancel_batch(self, batch_id: str) -> dict[str, Any]:
+        self.batches[batch_id]["status"] = "canceling"
+        return self._batch(batch_id)
+
+    def _batch_result(self, request: dict[str, Any]) -> dict[str, Any]:
+        custom_id = request["custom_id"]
+        if custom_id in self.batch_errors:
+            error = {"type": "error", "error": {"type": "api_error", "message": "Overloaded"}}
+            return {"custom_id": custom_id, "result": {"type": "errored", "error": error}}
+        message = self.respond(request["params"])
+        return {"custom_id": custom_id, "result": {"type": "succeeded", "message": message}}
+
+    def _batch(self, batch_id: str) -> dict[str, Any]:
+        batch = self.batches[batch_id]
+        ended = batch["status"] == "ended"
+        counts = dict.fromkeys(["processing", "succeeded", "errored", "canceled", "expired"], 0)
+        for result in batch["results"]:
+            counts[result["result"]["type"]] += 1
+        counts["processing"] = len(batch["requests"]) - len(batch["results"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": batch["status"],
+            "request_counts": counts,
+            "created_at": "2026-01-01T00:00:00Z",
+            "expires_at": "2026-01-02T00:00:00Z",
+            "ended_at": "2026-01-01T01:00:00Z" if ended else None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def __enter__(self) -> "MessagesStub":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
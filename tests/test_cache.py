@@ -0,0 +1,43 @@
+"""Tests for the persistent disk cache."""
+
+import time
+from pathlib import Path
+
+from mohtion.analyzers.cache import git_blob_sha
+from mohtion.cache import DiskCache
+
+
+def test_roundtrip(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "cache.sqlite3")
+    cache.set("a", b"1")
+    cache.set_many([("b", b"2"), ("c", b"3")])
+    assert cache.get("a") == b"1"
+    assert cache.get_many(["b", "c", "missing"]) == {"b": b"2", "c": b"3"}
+    cache.close()
+
+
+def test_evicts_least_recently_used_over_size(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "cache.sqlite3", max_bytes=250)
+    for key in "abc":
+        cache.set(key, b"x" * 100)
+        time.sleep(0.01)
+    cache.get("a")  # Refresh "a" so "b" is now the oldest
+
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    cache.close()
+
+
+def test_expired_entries_are_misses(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "cache.sqlite3", max_age=0.05)
+    cache.set("a", b"1")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.evict() == 1
+    cache.close()
+
+
+def test_git_blob_sha_matches_git() -> None:
+    # `printf 'hello\n' | git hash-object --stdin`
+    assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
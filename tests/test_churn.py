@@ -0,0 +1,96 @@
+"""Tests for the git churn index."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+from mohtion.agent import churn as churn_module
+from mohtion.agent.churn import build_churn_index, load_churn_index
+from mohtion.agent.scanner import Scanner
+from mohtion.cache import DiskCache
+from mohtion.models.repo_config import ChurnConfig, RepoConfig, Thresholds
+
+COLD = "def cold(x):\n    if x:\n        return 1\n    return 0\n"
+
+
+def hot(version: int) -> str:
+    return f"def hot(x):\n    if x:\n        return {version}\n    return 0\n"
+
+
+def commit(repo: Repo, root: Path, files: dict[str, str | None], message: str) -> None:
+    for relative, content in files.items():
+        if content is None:
+            repo.index.remove([relative], working_tree=True)
+            continue
+        (root / relative).write_text(content)
+        repo.index.add([relative])
+    repo.index.commit(message)
+
+
+@pytest.fixture
+def history(tmp_path: Path) -> Path:
+    """cold() written once; hot() edited three more times, once after code was added above it."""
+    repo = Repo.init(tmp_path)
+    commit(repo, tmp_path, {"app.py": COLD + "\n" + hot(1), "gone.py": "x = 1\n"}, "initial")
+    commit(repo, tmp_path, {"app.py": COLD + "\n" + hot(2), "gone.py": None}, "edit hot")
+    commit(repo, tmp_path, {"app.py": "import os\n\n" + COLD + "\n" + hot(3)}, "add import")
+    commit(repo, tmp_path, {"app.py": "import os\n\n" + COLD + "\n" + hot(4)}, "edit again")
+    commit(repo, tmp_path, {"gone.py": "y = 2\n"}, "re-create")
+    return tmp_path
+
+
+def test_span_churn_follows_lines_through_history(history: Path) -> None:
+    index = build_churn_index(history, ChurnConfig(enabled=True))
+
+    assert index is not None
+    # cold() is lines 3-6 now but was lines 1-4 before the import was added
+    assert index.span_churn(Path("app.py"), 3, 6) == 1
+    assert index.span_churn(Path("app.py"), 8, 11) == 4
+    assert index.file_churn(Path("app.py")) == 4
+    # History before a deletion belongs to a different file
+    assert index.file_churn(Path("gone.py")) == 1
+
+
+def test_history_window(history: Path) -> None:
+    index = build_churn_index(history, ChurnConfig(enabled=True, max_commits=2))
+
+    assert index is not None
+    assert index.file_churn(Path("app.py")) == 1
+
+
+def test_not_a_checkout(tmp_path: Path) -> None:
+    assert build_churn_index(tmp_path, ChurnConfig(enabled=True)) is None
+
+
+def test_index_is_cached_by_head(
+    history: Path, tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = DiskCache(tmp_path_factory.mktemp("cache") / "churn.sqlite3")
+    config = ChurnConfig(enabled=True)
+    built = load_churn_index(history, config, cache=cache)
+
+    def fail(*args: object) -> None:
+        raise AssertionError("index rebuilt despite a cached copy")
+
+    monkeypatch.setattr(churn_module, "build_churn_index", fail)
+    cached = load_churn_index(history, config, cache=cache)
+
+    assert cached == built
+    cache.close()
+
+
+def test_scanner_ranks_churned_code_first(history: Path) -> None:
+    def ranking(enabled: bool) -> list[str | None]:
+        config = RepoConfig(
+            analyzers=["complexity"],
+            thresholds=Thresholds(cyclomatic_complexity=1),
+            churn=ChurnConfig(enabled=enabled),
+        )
+        targets = asyncio.run(Scanner(history, config, workers=1).scan())
+        return [target.function_name for target in targets]
+
+    # Same complexity, so discovery order decides without churn
+    assert ranking(False) == ["cold", "hot"]
+    assert ranking(True) == ["hot", "cold"]
@@ -1,8 +1,10 @@
 """Tests for the complexity analyzer."""
 
+import ast
+
 import pytest
 
-from mohtion.analyzers.complexity import ComplexityAnalyzer
+from mohtion.analyzers.complexity import ComplexityAnalyzer, ComplexityVisitor
 from mohtion.models.repo_config import RepoConfig
 from mohtion.models.target import DebtType
 from pathlib import Path
@@ -68,3 +70,89 @@ async def test_handles_syntax_errors(analyzer: ComplexityAnalyzer) -> None:
     code = "def broken( { return"
     targets = await analyzer.analyze_file(Path("test.py"), code)
     assert len(targets) == 0
+
+
+def test_nested_functions_attributed_to_innermost_scope() -> None:
+    """Branches inside a nested function should not count toward its parent."""
+    code = '''
+def outer(x):
+    if x:
+        pass
+
+    def inner(y):
+        if y and x:
+            return [i for i in y if i]
+        return None
+
+    return inner
+'''
+    visitor = ComplexityVisitor()
+    visitor.visit(ast.parse(code))
+    complexities = {func["name"]: func["complexity"] for func in visitor.functions}
+    assert complexities == {"outer": 2, "inner": 4}
+
+
+def test_nesting_depth_treats_elif_as_same_level() -> None:
+    """elif chains shouldn't nest; blocks inside branches should."""
+    code = '''
+def dispatch(x, items):
+    if x == 1:
+        pass
+    elif x == 2:
+        pass
+    elif x == 3:
+        for item in items:
+            with open(item) as f:
+                try:
+                    f.read()
+                except OSError:
+                    pass
+    else:
+        if x:
+            pass
+'''
+    visitor = ComplexityVisitor()
+    visitor.visit(ast.parse(code))
+    func = visitor.functions[0]
+    assert func["max_depth"] == 4
+    assert func["length"] == 15
+    assert func["depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_combined_into_one_target() -> None:
+    """A function over several thresholds should be reported once, under its worst metric."""
+    config = RepoConfig(analyzers=["complexity", "function_length", "nesting_depth"])
+    config.thresholds.cyclomatic_complexity = 3
+    config.thresholds.function_length = 5
+    config.thresholds.nesting_depth = 2
+    analyzer = ComplexityAnalyzer(config)
+    code = '''
+def tangled(a, b, c):
+    if a:
+        if b:
+            if c:
+                return 1
+    return 0
+'''
+    targets = await analyzer.analyze_file(Path("test.py"), code)
+
+    assert len(targets) == 1
+    target = targets[0]
+    # Complexity 4 (0.1), length 6 (0.01), nesting 3 (0.25)
+    assert target.debt_type == DebtType.NESTING
+    assert target.metric_value == 3.0
+    assert target.metrics == {"complexity": 4.0, "function_length": 6.0, "nesting_depth": 3.0}
+    assert target.description.startswith("Deep nesting: 3 levels")
+    assert "High cyclomatic complexity: 4" in target.description
+    assert target.severity == pytest.approx(0.45)
+
+
+@pytest.mark.asyncio
+async def test_disabled_metrics_not_reported() -> None:
+    """Only the metrics enabled in config.analyzers should produce targets."""
+    config = RepoConfig(analyzers=["complexity"])
+    config.thresholds.function_length = 1
+    analyzer = ComplexityAnalyzer(config)
+    targets = await analyzer.analyze_file(Path("test.py"), "def f(a):\n    return a\n")
+    assert targets == []
@@ -0,0 +1,67 @@
+"""Tests for the deprecated API analyzer."""
+
+from pathlib import Path
+
+import pytest
+
+from mohtion.analyzers.deprecation import DeprecationAnalyzer, find_deprecated, load_catalogue
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType
+
+
+@pytest.fixture
+def analyzer() -> DeprecationAnalyzer:
+    return DeprecationAnalyzer(RepoConfig())
+
+
+def test_lookup_falls_back_to_deprecated_module() -> None:
+    """Names inside a deprecated module should resolve to the module entry."""
+    index = load_catalogue()
+    assert find_deprecated(index, "distutils.core.setup").name == "distutils"
+    assert find_deprecated(index, "imp.reload").name == "imp.reload"
+    assert find_deprecated(index, "os.path.join") is None
+
+
+@pytest.mark.asyncio
+async def test_aliases_resolved_and_grouped_per_function(analyzer: DeprecationAnalyzer) -> None:
+    """Aliased imports and attribute chains should resolve, one target per function."""
+    code = '''
+import datetime as dt
+import os
+
+
+def stamp():
+    now = dt.datetime.utcnow()
+    later = dt.datetime.utcnow()
+    return os.path.join(str(now), str(later), str(loop()))
+
+
+def clean():
+    return os.path.exists("x")
+
+
+from asyncio import get_event_loop as loop
+'''
+    targets = await analyzer.analyze_file(Path("test.py"), code)
+
+    assert len(targets) == 2
+    by_function = {t.function_name: t for t in targets}
+    function_target = by_function["stamp"]
+    assert function_target.debt_type == DebtType.DEPRECATION
+    assert function_target.metric_value == 3.0
+    assert "datetime.datetime.utcnow" in function_target.description
+    assert "x2" in function_target.description
+    assert "asyncio.get_event_loop" in function_target.description
+
+    # The import itself is reported at module level
+    assert by_function[None].start_line == by_function[None].end_line == 16
+
+
+@pytest.mark.asyncio
+async def test_removed_modules_rank_higher(analyzer: DeprecationAnalyzer) -> None:
+    """Removed APIs should outrank merely deprecated ones."""
+    code = "import imp\nfrom typing import List\n"
+    targets = await analyzer.analyze_file(Path("test.py"), code)
+
+    by_line = {t.start_line: t for t in targets}
+    assert by_line[1].severity > by_line[2].severity
@@ -0,0 +1,72 @@
+"""Tests for the shared single-pass AST traversal."""
+
+import ast
+from pathlib import Path
+
+from mohtion.agent.scanner import analyze_source
+from mohtion.analyzers.complexity import ComplexityAnalyzer
+from mohtion.analyzers.dispatch import NodeHandler, walk
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import RepoConfig
+
+SOURCE = b"""class A:
+    def method(self):
+        return [x for x in range(3) if x]
+
+def outer():
+    def inner():
+        pass
+"""
+
+
+class Recorder(NodeHandler):
+    def __init__(self, log: list[str], tag: str) -> None:
+        self.log = log
+        self.tag = tag
+
+    def enter_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.log.append(f"{self.tag}+{node.name}")
+
+    def leave_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.log.append(f"{self.tag}-{node.name}")
+
+
+def test_walk_calls_every_handler_in_source_order() -> None:
+    log: list[str] = []
+    tree = ast.parse(SOURCE)
+    walk(tree, [Recorder(log, "a"), Recorder(log, "b")])
+    assert log == [
+        "a+method", "b+method", "a-method", "b-method",
+        "a+outer", "b+outer", "a+inner", "b+inner",
+        "a-inner", "b-inner", "a-outer", "b-outer",
+    ]
+
+
+def test_parsed_file_segments() -> None:
+    parsed = ParsedFile.parse(Path("a.py"), SOURCE.replace(b"\n", b"\r\n"))
+    assert parsed.line_count == 8
+    assert parsed.segment(2, 3) == "    def method(self):\n        return [x for x in range(3) if x]"
+    assert parsed.segment(7, 7) == "        pass"
+
+
+class Broken(NodeHandler):
+    def enter_ClassDef(self, node: ast.ClassDef) -> None:
+        raise RuntimeError("boom")
+
+
+class BrokenAnalyzer(ComplexityAnalyzer):
+    @property
+    def name(self) -> str:
+        return "broken"
+
+    def create_handler(self, parsed: ParsedFile) -> NodeHandler:
+        return Broken()
+
+
+def test_failing_analyzer_is_isolated() -> None:
+    config = RepoConfig()
+    config.thresholds.cyclomatic_complexity = 1
+    analyzers = [BrokenAnalyzer(config), ComplexityAnalyzer(config)]
+    analysis = analyze_source(Path("a.py"), SOURCE, analyzers)
+    assert "broken" not in analysis.targets
+    assert [t.function_name for t in analysis.targets["complexity"]] == ["method"]
@@ -0,0 +1,122 @@
+"""Tests for the duplicate code analyzer."""
+
+from array import array
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.scanner import Scanner
+from mohtion.analyzers.cache import AnalysisCache
+from mohtion.analyzers.duplicates import DuplicateAnalyzer, kgram_hashes, winnow
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType
+
+ORIGINAL = '''
+def load_records(path, limit):
+    records = []
+    with open(path) as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            key, value = line.split("=", 1)
+            records.append((key.strip(), value.strip()))
+            if len(records) >= limit:
+                break
+    return records
+'''
+
+# Same structure, renamed identifiers and different literals
+RENAMED = '''
+def read_pairs(filename, maximum):
+    pairs = []
+    with open(filename) as stream:
+        for row in stream:
+            if not row.strip():
+                continue
+            name, data = row.split(":", 1)
+            pairs.append((name.strip(), data.strip()))
+            if len(pairs) >= maximum:
+                break
+    return pairs
+'''
+
+UNRELATED = '''
+def summarize(values):
+    total = sum(values)
+    mean = total / len(values)
+    spread = max(values) - min(values)
+    label = "wide" if spread > mean else "narrow"
+    print(f"{label}: {mean}")
+    return {"mean": mean, "spread": spread}
+'''
+
+
+@pytest.fixture
+def config() -> RepoConfig:
+    return RepoConfig(analyzers=["duplicates"])
+
+
+def summarize_file(analyzer: DuplicateAnalyzer, name: str, source: str) -> list:
+    parsed = ParsedFile.parse(Path(name), source.encode())
+    handler = analyzer.create_handler(parsed)
+    handler.visit(parsed.tree)
+    return handler.summary()
+
+
+def test_winnowing_keeps_shared_fingerprints() -> None:
+    """Streams sharing a long run of tokens should share a winnowed fingerprint."""
+    common = list(range(100, 140))
+    left = array("Q", [1, 2, 3] + common + [4, 5])
+    right = array("Q", [9] + common + [8, 7, 6])
+    left_prints = set(winnow(kgram_hashes(left, 12), 8))
+    right_prints = set(winnow(kgram_hashes(right, 12), 8))
+    assert left_prints & right_prints
+
+
+def test_renamed_copy_is_grouped(config: RepoConfig) -> None:
+    """Clones differing only in names and literals should form one group."""
+    analyzer = DuplicateAnalyzer(config)
+    summaries = {
+        Path("a.py"): summarize_file(analyzer, "a.py", ORIGINAL),
+        Path("b.py"): summarize_file(analyzer, "b.py", RENAMED),
+        Path("c.py"): summarize_file(analyzer, "c.py", UNRELATED),
+    }
+
+    targets = analyzer.finalize(summaries)
+
+    # Only the function-level group is reported; the matching for/with blocks
+    # inside it are nested in already clustered units
+    assert len(targets) == 1
+    target = targets[0]
+    assert target.debt_type == DebtType.DUPLICATE
+    assert target.file_path == Path("a.py")
+    assert target.function_name == "load_records"
+    assert "b.py:2-12" in target.description
+    assert "c.py" not in target.description
+
+
+def test_unrelated_code_is_not_reported(config: RepoConfig) -> None:
+    """Structurally different functions should not be grouped."""
+    analyzer = DuplicateAnalyzer(config)
+    summaries = {
+        Path("a.py"): summarize_file(analyzer, "a.py", ORIGINAL),
+        Path("c.py"): summarize_file(analyzer, "c.py", UNRELATED),
+    }
+    assert analyzer.finalize(summaries) == []
+
+
+@pytest.mark.asyncio
+async def test_scan_reports_duplicates_with_snippet(tmp_path: Path, config: RepoConfig) -> None:
+    """A scan should report cross-file duplicates, from fresh or cached summaries."""
+    (tmp_path / "a.py").write_text(ORIGINAL)
+    (tmp_path / "b.py").write_text(RENAMED)
+    cache = AnalysisCache(tmp_path / ".cache")
+
+    for _ in range(2):
+        scanner = Scanner(tmp_path, config, workers=1, cache=cache, use_git_index=False)
+        targets = await scanner.scan()
+        assert len(targets) == 1
+        assert targets[0].code_snippet.startswith("def load_records")
+
+    cache.close()
@@ -0,0 +1,308 @@
+"""Tests for the async LLM client."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from types import SimpleNamespace
+
+import anthropic
+import pytest
+
+from mohtion.config import get_settings
+from mohtion.llm import client as client_module
+from mohtion.llm import rate_limit
+from mohtion.llm.client import BatchRefactor, LLMClient, close_shared_client, shared_client
+from mohtion.llm.response_cache import ResponseCache, normalize_output
+from mohtion.llm.streaming import CodeBlockExtractor, MalformedResponseError
+from tests.messages_stub import MessagesStub
+
+RESPONSE = "```python\ndef f():\n    return 1\n```\nSimplified."
+
+
+class FakeStream:
+    """Stands in for the SDK's MessageStream, streaming RESPONSE in a few pieces."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    async def __aenter__(self) -> "FakeStream":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        await asyncio.sleep(self.delay)
+        for i in range(0, len(RESPONSE), 8):
+            yield RESPONSE[i : i + 8]
+
+    async def get_final_message(self) -> SimpleNamespace:
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=RESPONSE)],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5),
+        )
+
+
+class FakeMessages:
+    """Stands in for AsyncAnthropic.messages, answering after a delay."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    def stream(self, **kwargs: object) -> FakeStream:
+        self.calls += 1
+        return FakeStream(self.delay)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_overlap() -> None:
+    messages = FakeMessages(delay=0.2)
+    llm = LLMClient(SimpleNamespace(messages=messages))  # type: ignore[arg-type]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        llm.refactor_code(code="def f(): ...", debt_description="complex", file_path="a.py")
+        for _ in range(5)
+    ))
+    elapsed = time.perf_counter() - start
+
+    assert messages.calls == 5
+    assert all(code == "def f():\n    return 1" for code, _ in results)
+    assert elapsed < 0.5  # Not 5 x 0.2s back to back
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name, value in [
+        ("GITHUB_APP_ID", "1"),
+        ("GITHUB_PRIVATE_KEY_BASE64", ""),
+        ("GITHUB_WEBHOOK_SECRET", "secret"),
+        ("ANTHROPIC_API_KEY", "sk-test"),
+        ("LLM_MAX_CONNECTIONS", "3"),
+    ]:
+        monkeypatch.setenv(name, value)
+    get_settings.cache_clear()
+    monkeypatch.setattr(client_module, "_shared_client", None)
+    monkeypatch.setattr(rate_limit, "_shared_limiter", None)
+
+    try:
+        llm = LLMClient()
+        first = llm.client
+        assert LLMClient().client is first is shared_client()
+        assert first.max_retries == get_settings().llm_max_retries
+        # The shared limiter retries instead of the SDK
+        assert llm.limiter is LLMClient().limiter is not None
+        assert llm._api.max_retries == 0
+
+        await close_shared_client()
+        assert shared_client() is not first
+        await close_shared_client()
+    finally:
+        get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_are_served_from_cache(tmp_path: Path) -> None:
+    messages = FakeMessages(delay=0)
+    cache = ResponseCache(tmp_path)
+    llm = LLMClient(SimpleNamespace(messages=messages), cache=cache)  # type: ignore[arg-type]
+
+    first = await llm.refactor_code("def f():\n    pass\n", "complex", "a.py", "f")
+    # Same inputs up to line endings and trailing whitespace
+    again = await llm.refactor_code("def f():  \r\n    pass\r\n", "complex", "a.py", "f")
+    assert again == first
+    assert messages.calls == 1
+
+    await llm.refactor_code("def f():\n    pass\n", "complex", "a.py", "f", bypass_cache=True)
+    await llm.refactor_code("def g():\n    pass\n", "complex", "a.py", "g")
+    assert messages.calls == 3
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_forgotten_responses_are_regenerated(tmp_path: Path) -> None:
+    messages = FakeMessages(delay=0)
+    cache = ResponseCache(tmp_path)
+    llm = LLMClient(SimpleNamespace(messages=messages), cache=cache)  # type: ignore[arg-type]
+
+    heal = ("old", "new")
+    await llm.analyze_test_error(*heal, "FAILED in 0.31s at 0x7f3a2b1c4d50", "complex", "a.py")
+    await llm.forget_responses()
+    # Timings and addresses differ from run to run; the request is the same
+    await llm.analyze_test_error(*heal, "FAILED in 1.02s at 0x7f99aa11bb22", "complex", "a.py")
+
+    assert messages.calls == 2
+    await llm.analyze_test_error(*heal, "FAILED in 2.50s at 0x7f0000000000", "complex", "a.py")
+    assert messages.calls == 2
+    cache.close()
+
+
+def test_normalize_output_masks_clone_paths() -> None:
+    output = 'File "/tmp/mohtion_app_k2j4_x9z/pkg/mod.py", line 3'
+
+    assert normalize_output(output) == 'File "<repo>/pkg/mod.py", line 3'
+
+
+@pytest.mark.asyncio
+async def test_self_heal_reuses_the_cached_refactor_prefix() -> None:
+    branches = "".join(f"    if x == {i}:\n        return {i}\n" for i in range(200))
+    original = "def f(x):\n" + branches
+    debt = ("Cyclomatic complexity 201", "a.py", "f")
+    with MessagesStub() as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client)
+        code, _ = await llm.refactor_code(original, *debt)
+        await llm.analyze_test_error(original, code, "FAILED", *debt)
+        await llm.analyze_test_error(original, code, "FAILED again", *debt)
+        await client.close()
+
+    refactor, heal, second_heal = llm.usage
+    assert not refactor.prompt_cache_hit
+    assert refactor.cache_creation_input_tokens > 0
+    # The system prompt and the original code come from the prompt cache
+    assert heal.prompt_cache_hit
+    assert heal.cache_read_input_tokens == refactor.cache_creation_input_tokens
+    assert second_heal.cache_read_input_tokens > heal.cache_read_input_tokens
+    assert stub.requests[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+    summary = llm.usage_summary()
+    assert summary["calls"] == 3
+    assert summary["prompt_cache_hits"] == 2
+    assert summary["saved_input_tokens"] > 0
+
+
+def test_extractor_finds_fences_split_across_deltas() -> None:
+    extractor = CodeBlockExtractor()
+    pieces = ["Here:\n`", "``py", "thon\ndef f():\n    return 1\n`", "`", "`\nSummary: x"]
+
+    found = [extractor.feed(piece) for piece in pieces]
+
+    assert found == [None, None, None, None, "def f():\n    return 1"]
+    assert extractor.text == "".join(pieces)
+
+
+@pytest.mark.asyncio
+async def test_code_is_handed_over_before_the_response_ends() -> None:
+    summary = "Summary: " + "Split the branches into a lookup table. " * 20
+    reply = "```python\ndef f():\n    return 1\n```\n" + summary
+    seen: list[tuple[str, int]] = []
+
+    with MessagesStub(lambda body: reply, chunk_size=8, chunk_delay=0.01) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client)
+
+        async def on_code(code: str) -> bool:
+            seen.append((code, len(stub.chunks_sent)))
+            return True
+
+        code, description = await llm.refactor_code(
+            "def f(): ...", "complex", "a.py", on_code=on_code
+        )
+        await client.close()
+
+    # The hook ran while the response was still streaming
+    assert seen == [("def f():\n    return 1", 0)]
+    assert code == "def f():\n    return 1"
+    assert "Split the branches" in description
+    assert llm.usage[0].output_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_streamed_and_cached_responses_give_the_same_code(tmp_path: Path) -> None:
+    reply = (
+        "A helper first:\n```python\ndef helper():\n    pass\n```\n"
+        "Then the function:\n```python\ndef f():\n    return 1\n```\nSummary: Split."
+    )
+    cache = ResponseCache(tmp_path)
+    seen: list[str] = []
+
+    async def on_code(code: str) -> bool:
+        seen.append(code)
+        return True
+
+    with MessagesStub(lambda body: reply) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, cache=cache)
+        streamed = await llm.refactor_code("def f(): ...", "complex", "a.py", on_code=on_code)
+        cached = await llm.refactor_code("def f(): ...", "complex", "a.py", on_code=on_code)
+        await client.close()
+
+    assert len(stub.requests) == 1
+    assert seen == [streamed[0], cached[0]]
+    assert streamed == cached
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_code_cancels_the_stream(tmp_path: Path) -> None:
+    reply = "```python\ndef f(:\n```\nSummary: " + "More words. " * 100
+    cache = ResponseCache(tmp_path)
+
+    with MessagesStub(lambda body: reply, chunk_size=8, chunk_delay=0.01) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, cache=cache)
+
+        async def on_code(code: str) -> bool:
+            return False
+
+        with pytest.raises(MalformedResponseError):
+            await llm.refactor_code("def f(): ...", "complex", "a.py", on_code=on_code)
+        await client.close()
+        for _ in range(50):
+            if stub.chunks_sent:
+                break
+            await asyncio.sleep(0.05)
+
+    assert stub.chunks_sent[0] < len(reply) // 8
+    # A rejected response is not kept
+    assert cache.get(llm.cache_keys[0]) is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_results_are_routed_by_custom_id(tmp_path: Path) -> None:
+    def reply(body: dict) -> str:
+        name = "g" if "def g" in body["messages"][0]["content"][0]["text"] else "f"
+        return f"```python\ndef {name}():\n    return 1\n```\nSummary: {name} simplified."
+
+    requests = [
+        BatchRefactor(f"bounty-{i}", f"def {name}(): ...", "complex", f"{name}.py", name)
+        for i, name in enumerate("fgh")
+    ]
+    cache = ResponseCache(tmp_path)
+    with MessagesStub(reply, batch_polls=2, batch_errors={"bounty-2"}) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, cache=cache)
+        results = await llm.refactor_batch(requests, poll_interval=0)
+
+        assert results["bounty-0"].refactored_code == "def f():\n    return 1"
+        assert results["bounty-1"].refactored_code == "def g():\n    return 1"
+        assert "g simplified" in results["bounty-1"].summary
+        assert not results["bounty-2"].success
+        assert "Overloaded" in results["bounty-2"].error
+        assert len(llm.usage) == 2
+
+        # Answered requests come from the cache; only the errored one is resubmitted
+        again = await llm.refactor_batch(requests, poll_interval=0)
+        await client.close()
+
+    assert [len(batch["requests"]) for batch in stub.batches.values()] == [3, 1]
+    assert again["bounty-0"].refactored_code == results["bounty-0"].refactored_code
+    assert again["bounty-0"].summary == results["bounty-0"].summary
+    # Cache hits cost nothing, so there's no usage to record
+    assert results["bounty-0"].usage is not None and again["bounty-0"].usage is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_past_its_timeout_is_canceled() -> None:
+    requests = [BatchRefactor("bounty-0", "def f(): ...", "complex", "a.py")]
+    with MessagesStub(batch_polls=1000) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        results = await LLMClient(client).refactor_batch(requests, poll_interval=0, timeout=0)
+        await client.close()
+
+    assert results["bounty-0"].error == "canceled"
@@ -0,0 +1,127 @@
+"""Tests for the test-output distiller used by self-heals."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.log_distiller import distill_test_output
+from mohtion.llm.usage import estimate_tokens
+
+MODULE = """\
+import json
+
+
+def parse(text):
+    return json.loads(text)
+
+
+def total(values):
+    return sum(values) + 1
+"""
+
+TESTS = """\
+import pytest
+
+from pkg.mod import parse, total
+
+
+@pytest.mark.parametrize("n", range(300))
+def test_passing(n):
+    assert n >= 0
+
+
+def test_total():
+    for i in range(2000):
+        print(f"noisy captured line {i}")
+    assert total([1, 2]) == 3
+
+
+def test_parse():
+    parse("{bad")
+"""
+
+PIP_NOISE = "".join(
+    f"Requirement already satisfied: package{i} in /usr/lib/python3/site-packages (1.0)\n"
+    for i in range(200)
+)
+
+
+def run(tmp_path: Path, files: dict[str, str], *command: str) -> str:
+    for name, text in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(text)
+    result = subprocess.run(
+        [sys.executable, *command], cwd=tmp_path, capture_output=True, text=True
+    )
+    return result.stdout + result.stderr
+
+
+@pytest.fixture
+def pytest_output(tmp_path: Path) -> str:
+    files = {"pkg/__init__.py": "", "pkg/mod.py": MODULE, "tests/test_mod.py": TESTS}
+    return PIP_NOISE + run(tmp_path, files, "-m", "pytest", "-v", "-p", "no:cacheprovider")
+
+
+def test_pytest_output_shrinks_to_the_failures(pytest_output: str) -> None:
+    distilled = distill_test_output(pytest_output, Path("pkg/mod.py"), "total")
+
+    assert estimate_tokens(distilled) * 10 < estimate_tokens(pytest_output)
+    assert "FAILED tests/test_mod.py::test_total" in distilled
+    assert "2 failed, 300 passed" in distilled
+    # The assertion diff and the failing line are kept; the noise isn't
+    assert "E       assert 4 == 3" in distilled
+    assert ">       assert total([1, 2]) == 3" in distilled
+    assert "noisy captured line 1999" not in distilled
+    assert "PASSED" not in distilled
+    # Library frames are collapsed, the frame in the modified file is kept
+    assert "pkg/mod.py:5: in parse" in distilled
+    assert "frame(s) in installed packages" in distilled
+    # Failures touching the refactored function come first
+    assert distilled.index("___ test_total ___") < distilled.index("___ test_parse ___")
+
+
+def test_budget_is_respected(pytest_output: str) -> None:
+    distilled = distill_test_output(pytest_output, "pkg/mod.py", max_tokens=60)
+
+    assert estimate_tokens(distilled) <= 80
+    assert "FAILED tests/test_mod.py::test_parse" in distilled
+    assert "more failure(s) omitted" in distilled
+
+
+def test_unittest_output(tmp_path: Path) -> None:
+    tests = """\
+import unittest
+
+from pkg.mod import parse, total
+
+
+class TestMod(unittest.TestCase):
+    def test_total(self):
+        self.assertEqual(total([1, 2]), 3)
+
+    def test_parse(self):
+        parse("{bad")
+"""
+    files = {"pkg/__init__.py": "", "pkg/mod.py": MODULE, "test_mod.py": tests}
+    output = run(tmp_path, files, "-m", "unittest", "test_mod")
+
+    distilled = distill_test_output(output, "pkg/mod.py", "parse")
+
+    assert distilled.startswith("Ran 2 tests")
+    assert "AssertionError: 4 != 3" in distilled
+    assert 'pkg/mod.py", line 5, in parse' in distilled
+    assert "json/decoder.py" not in distilled
+    assert distilled.index("test_parse") < distilled.index("test_total")
+
+
+def test_unrecognized_output_keeps_its_tail() -> None:
+    steps = "".join(f"build step {i}\n" for i in range(1000))
+    output = PIP_NOISE + steps + "error: linker failed\n"
+
+    distilled = distill_test_output(output, "src/main.rs", max_tokens=100)
+
+    assert distilled.endswith("error: linker failed")
+    assert "Requirement already satisfied" not in distilled
+    assert estimate_tokens(distilled) <= 110
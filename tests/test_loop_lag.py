@@ -0,0 +1,80 @@
+"""Tests for event loop lag monitoring and scanning off the loop."""
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.scanner import Scanner
+from mohtion.loop_lag import LoopLagMonitor
+from mohtion.models.repo_config import RepoConfig
+
+BRANCHY = "".join(
+    f"def func_{i}(x):\n" + "".join(f"    if x > {j}:\n        x -= {j}\n" for j in range(15))
+    + "    return x\n\n"
+    for i in range(40)
+)
+
+
+@pytest.mark.asyncio
+async def test_monitor_sees_a_blocked_loop() -> None:
+    async with LoopLagMonitor(bound=0.05, interval=0.01) as monitor:
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Blocks the loop
+        await asyncio.sleep(0.05)
+
+    assert monitor.max_lag >= 0.15
+    assert monitor.over_bound >= 1
+
+
+@pytest.mark.asyncio
+async def test_headroom_waits_for_lag_to_recover() -> None:
+    async with LoopLagMonitor(bound=0.05, interval=0.01) as monitor:
+        monitor.lag = 1.0  # As if the last sample was late
+        await asyncio.wait_for(monitor.headroom(), timeout=1)
+
+    assert monitor.lag <= 0.05
+
+
+@pytest.mark.asyncio
+async def test_serial_scan_keeps_the_loop_responsive(tmp_path: Path) -> None:
+    for index in range(30):
+        (tmp_path / f"module_{index}.py").write_text(BRANCHY)
+    scanner = Scanner(
+        tmp_path,
+        RepoConfig(analyzers=["complexity", "duplicates"]),
+        workers=1,
+        chunk_size=4,
+        use_git_index=False,
+    )
+
+    async with LoopLagMonitor(bound=0.1, interval=0.01) as monitor:
+        scanner.lag_monitor = monitor
+        targets = await scanner.scan()
+
+    assert targets
+    assert monitor.samples > 0
+    assert monitor.max_lag < 0.25
+
+
+@pytest.mark.asyncio
+async def test_scans_share_slots(tmp_path: Path) -> None:
+    (tmp_path / "module.py").write_text(BRANCHY)
+    slots = asyncio.Semaphore(1)
+    config = RepoConfig(analyzers=["complexity"])
+    active = 0
+    peak = 0
+
+    async def scan() -> None:
+        nonlocal active, peak
+        scanner = Scanner(tmp_path, config, workers=1, use_git_index=False, slots=slots)
+        async for _ in scanner.iter_targets():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0)
+            active -= 1
+
+    await asyncio.gather(scan(), scan())
+
+    assert peak == 1
@@ -0,0 +1,261 @@
+"""Tests for the cluster-wide LLM rate limiter."""
+
+import asyncio
+import shutil
+import socket
+import subprocess
+import time
+from collections.abc import Iterator
+from email.utils import formatdate
+from pathlib import Path
+from types import SimpleNamespace
+
+import anthropic
+import pytest
+import redis.asyncio
+
+from mohtion.agent.refactor import Refactor
+from mohtion.llm.client import LLMClient
+from mohtion.llm.streaming import MalformedResponseError
+from mohtion.llm.rate_limit import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    Bucket,
+    LocalBuckets,
+    RateLimiter,
+    RateLimitTimeout,
+    RedisBuckets,
+    retry_after,
+)
+from mohtion.models.target import DebtType, TechDebtTarget
+from tests.messages_stub import MessagesStub
+
+
+def limiter(store: LocalBuckets | RedisBuckets | None = None, **kwargs: float) -> RateLimiter:
+    limits = {
+        "requests_per_minute": 600,
+        "input_tokens_per_minute": 600,  # 10 per second
+        "output_tokens_per_minute": 600,
+        **kwargs,
+    }
+    return RateLimiter(store or LocalBuckets(), **limits)  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_callers_wait_for_capacity_or_time_out() -> None:
+    rate = limiter(requests_per_minute=3, max_wait=1)
+
+    start = time.perf_counter()
+    for _ in range(3):
+        await rate.acquire(10)
+    assert time.perf_counter() - start < 0.1
+
+    # The fourth request would need 20s for a request token to refill
+    with pytest.raises(RateLimitTimeout):
+        await rate.acquire(10)
+
+
+@pytest.mark.asyncio
+async def test_output_token_debt_holds_back_the_next_call() -> None:
+    rate = limiter()
+    await rate.acquire(10)
+    await rate.settle(10, 10, 602)  # 2 output tokens over: 0.2s to pay back
+
+    start = time.perf_counter()
+    await rate.acquire(10)
+    assert time.perf_counter() - start >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_waiting_callers_go_in_priority_order() -> None:
+    rate = limiter()
+    await rate.acquire(600)  # Drain the input bucket
+    order: list[str] = []
+
+    async def call(name: str, priority: int) -> None:
+        await rate.acquire(2, priority)
+        order.append(name)
+
+    await asyncio.gather(
+        call("low", PRIORITY_LOW),
+        call("normal", PRIORITY_NORMAL),
+        call("high", PRIORITY_HIGH),
+    )
+
+    assert order == ["high", "normal", "low"]
+
+
+@pytest.mark.asyncio
+async def test_low_priority_caller_is_served_after_a_burst_of_high_priority_ones() -> None:
+    rate = limiter(max_wait=5)
+    await rate.acquire(600)  # Drain the input bucket: 10 tokens a second from here on
+    order: list[str] = []
+
+    async def call(name: str, priority: int) -> None:
+        await rate.acquire(1, priority)
+        order.append(name)
+
+    low = asyncio.create_task(call("low", PRIORITY_LOW))
+    await asyncio.sleep(0)  # Queued before the burst
+    burst = [asyncio.create_task(call(f"high-{i}", PRIORITY_HIGH)) for i in range(5)]
+    await asyncio.gather(low, *burst)
+
+    assert order == [f"high-{i}" for i in range(5)] + ["low"]
+
+
+class StuckBuckets(LocalBuckets):
+    """A store that never answers, e.g. a Redis that hangs."""
+
+    async def acquire(self, buckets: list[Bucket], costs: list[float]) -> float:
+        await asyncio.Event().wait()
+        return 0.0
+
+
+@pytest.mark.asyncio
+async def test_max_wait_bounds_the_time_in_the_queue_too() -> None:
+    rate = limiter(StuckBuckets(), max_wait=0.3)
+
+    start = time.perf_counter()
+    # The low-priority caller never gets to the head of the queue
+    results = await asyncio.gather(
+        rate.acquire(1, PRIORITY_HIGH), rate.acquire(1, PRIORITY_LOW), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RateLimitTimeout) for result in results)
+    assert time.perf_counter() - start < 1
+    assert rate._queue == []
+
+
+@pytest.mark.asyncio
+async def test_refactor_without_capacity_is_deferred_not_failed(tmp_path: Path) -> None:
+    rate = limiter(requests_per_minute=1, max_wait=0.1)
+    await rate.acquire(10)  # The next request token is a minute away
+    # Never reached: the call gives up before it's sent
+    client = anthropic.AsyncAnthropic(api_key="test", base_url="http://127.0.0.1:9")
+    llm = LLMClient(client, limiter=rate)
+    target = TechDebtTarget(
+        file_path=Path("a.py"),
+        start_line=1,
+        end_line=1,
+        debt_type=DebtType.COMPLEXITY,
+        severity=0.5,
+        description="High cyclomatic complexity",
+        function_name="f",
+        code_snippet="def f(): ...",
+    )
+
+    # Raised for the caller to defer the bounty, not returned as a failed refactoring
+    with pytest.raises(RateLimitTimeout):
+        await Refactor(tmp_path, llm=llm).refactor_target(target)
+    await client.close()
+
+
+def test_retry_after_headers() -> None:
+    def error(**headers: str) -> Exception:
+        response = SimpleNamespace(headers=headers)
+        return SimpleNamespace(response=response)  # type: ignore[return-value]
+
+    assert retry_after(error(**{"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(error(**{"retry-after": "3"})) == 3.0
+    later = retry_after(error(**{"retry-after": formatdate(time.time() + 30, usegmt=True)}))
+    assert later is not None and 25 < later <= 30
+    assert retry_after(error()) is None
+    assert retry_after(ValueError()) is None
+
+
+@pytest.mark.asyncio
+async def test_429s_are_retried_after_the_delay_the_api_asks_for() -> None:
+    errors = [(429, {"retry-after": "0.3"}), (529, {})]
+    with MessagesStub(errors=errors) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, limiter=limiter())
+
+        start = time.perf_counter()
+        code, _ = await llm.refactor_code("def f(): ...", "complex", "a.py")
+        elapsed = time.perf_counter() - start
+        await client.close()
+
+    assert code == "def f():\n    return 1"
+    assert stub.attempts == 3
+    assert elapsed >= 0.3
+
+
+@pytest.mark.asyncio
+async def test_errors_past_the_retry_limit_are_raised() -> None:
+    with MessagesStub(errors=[(429, {"retry-after": "0"})] * 3) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, limiter=limiter(max_retries=1))
+
+        with pytest.raises(anthropic.RateLimitError):
+            await llm.refactor_code("def f(): ...", "complex", "a.py")
+        await client.close()
+
+    assert stub.attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_calls_that_fail_settle_what_they_reserved() -> None:
+    store = LocalBuckets()
+    rate = limiter(store, output_tokens_per_minute=60)
+    _, input_tokens, output_tokens = rate.buckets
+
+    def level(bucket: Bucket) -> float:
+        return store._level(bucket, time.monotonic())
+
+    reply = "```python\ndef f():\n    return 1\n```\n" + "Summary: " + "words " * 2000
+    with MessagesStub(lambda body: reply, errors=[(400, {})]) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, limiter=rate)
+
+        # Rejected outright: not billed, so the reservation is given back
+        with pytest.raises(anthropic.BadRequestError):
+            await llm.refactor_code("def f(): ...", "complex", "a.py")
+        assert level(input_tokens) == input_tokens.capacity
+
+        async def reject(code: str) -> bool:
+            return False
+
+        # Cut short after the code block: charged for what was generated
+        with pytest.raises(MalformedResponseError):
+            await llm.refactor_code("def f(): ...", "complex", "a.py", on_code=reject)
+        await client.close()
+
+    assert level(input_tokens) < input_tokens.capacity
+    assert output_tokens.capacity - level(output_tokens) > 0
+
+
+@pytest.fixture
+def redis_url() -> Iterator[str]:
+    """A throwaway redis-server, if one is installed."""
+    if shutil.which("redis-server") is None:
+        pytest.skip("redis-server not installed")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+    )
+    time.sleep(0.3)
+    yield f"redis://127.0.0.1:{port}"
+    server.terminate()
+    server.wait()
+
+
+@pytest.mark.asyncio
+async def test_limits_are_shared_through_redis(redis_url: str) -> None:
+    stores = [RedisBuckets(redis.asyncio.Redis.from_url(redis_url)) for _ in range(2)]
+    workers = [limiter(store, requests_per_minute=4, max_wait=0.5) for store in stores]
+
+    # Two workers share four requests a minute between them
+    for worker in workers * 2:
+        await worker.acquire(10)
+    with pytest.raises(RateLimitTimeout):
+        await workers[1].acquire(10)
+
+    # A 429 seen by one worker holds back the other
+    await stores[0].block(0.3)
+    assert await stores[1].acquire(workers[1].buckets, [0, 0, 0]) > 0.2
+    for store in stores:
+        await store.close()
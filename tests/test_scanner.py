@@ -0,0 +1,136 @@
+"""Tests for the repository scanner."""
+
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.scanner import Scanner
+from mohtion.analyzers.cache import AnalysisCache
+from mohtion.analyzers.complexity import ComplexityAnalyzer
+from mohtion.analyzers.dispatch import NodeHandler
+from mohtion.analyzers.parsed import ParsedFile
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import TechDebtTarget
+
+COMPLEX_FUNCTION = '''
+def branchy_{index}(x, y):
+    if x > 0:
+        if y > 0:
+            return 1
+        elif y < -{index}:
+            return 2
+    for i in range(x):
+        if i % 2 and y:
+            continue
+        while y > i:
+            y -= 1
+    return 0
+'''
+
+
+@pytest.fixture
+def config() -> RepoConfig:
+    config = RepoConfig(analyzers=["complexity"])
+    config.thresholds.cyclomatic_complexity = 3
+    return config
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    for index in range(12):
+        package = tmp_path / f"pkg{index % 3}"
+        package.mkdir(exist_ok=True)
+        (package / f"module_{index}.py").write_text(COMPLEX_FUNCTION.format(index=index))
+    (tmp_path / "simple.py").write_text("def add(a, b):\n    return a + b\n")
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_serial_scan_sorted_by_severity(repo: Path, config: RepoConfig) -> None:
+    """Serial scans should return every target, highest severity first."""
+    scanner = Scanner(repo, config, workers=1)
+    targets = await scanner.scan()
+    assert len(targets) == 12
+    severities = [t.severity for t in targets]
+    assert severities == sorted(severities, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_parallel_scan_matches_serial(repo: Path, config: RepoConfig) -> None:
+    """The process-pool scan should produce the same targets as a serial scan."""
+    serial = await Scanner(repo, config, workers=1).scan()
+    parallel = await Scanner(
+        repo, config, workers=2, chunk_size=5, parallel_min_files=1
+    ).scan()
+
+    def key(target: TechDebtTarget) -> tuple[str, int, float]:
+        return (str(target.file_path), target.start_line, target.severity)
+
+    assert sorted(map(key, parallel)) == sorted(map(key, serial))
+
+
+def test_small_repos_scan_serially(repo: Path, config: RepoConfig) -> None:
+    """Repos below the file threshold should not start a process pool."""
+    scanner = Scanner(repo, config, workers=4, parallel_min_files=100)
+    assert not scanner._use_pool(13)
+    assert scanner._use_pool(100)
+
+
+@pytest.mark.asyncio
+async def test_cache_only_reanalyzes_changed_files(
+    repo: Path,
+    config: RepoConfig,
+    tmp_path_factory: pytest.TempPathFactory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A warm cache should only parse files whose content changed."""
+    cache = AnalysisCache(tmp_path_factory.mktemp("cache"))
+    first = await Scanner(repo, config, workers=1, cache=cache).scan()
+
+    changed = repo / "pkg0" / "module_0.py"
+    changed.write_text(changed.read_text() + "\n\ndef extra():\n    return 1\n")
+
+    analyzed: list[Path] = []
+    original = ComplexityAnalyzer.create_handler
+
+    def tracking(self: ComplexityAnalyzer, parsed: ParsedFile) -> NodeHandler:
+        analyzed.append(parsed.path)
+        return original(self, parsed)
+
+    monkeypatch.setattr(ComplexityAnalyzer, "create_handler", tracking)
+    second = await Scanner(repo, config, workers=1, cache=cache).scan()
+    cache.close()
+
+    assert analyzed == [Path("pkg0/module_0.py")]
+    assert sorted(t.location for t in second) == sorted(t.location for t in first)
+
+
+def test_cache_key_tracks_thresholds(config: RepoConfig) -> None:
+    """Changing thresholds must invalidate cached results."""
+    before = ComplexityAnalyzer(config).cache_key
+    config.thresholds.cyclomatic_complexity += 1
+    assert ComplexityAnalyzer(config).cache_key != before
+
+
+@pytest.mark.asyncio
+async def test_top_targets_matches_full_scan(repo: Path, config: RepoConfig) -> None:
+    """The bounded top-K selection should agree with sorting every target."""
+    scanner = Scanner(repo, config, workers=1)
+    full = await scanner.scan()
+    top = await scanner.top_targets(3)
+    assert [t.location for t in top] == [t.location for t in full[:3]]
+    assert (await scanner.get_top_target()).location == full[0].location  # type: ignore[union-attr]
+
+    streamed = [target async for target in scanner.iter_targets()]
+    assert sorted(t.location for t in streamed) == sorted(t.location for t in full)
+
+
+@pytest.mark.asyncio
+async def test_targets_read_snippets_on_demand(repo: Path, config: RepoConfig) -> None:
+    """Scanned targets shouldn't hold their code until it's asked for."""
+    scanner = Scanner(repo, config, workers=1)
+    targets = await scanner.scan()
+
+    assert all(target._code_snippet is None for target in targets)
+    assert targets[0].code_snippet.startswith(f"def {targets[0].function_name}(x, y):")
+    assert targets[0].code_snippet.endswith("return 0")
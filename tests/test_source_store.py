@@ -0,0 +1,75 @@
+"""Tests for the per-bounty source store."""
+
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.source_store import SourceStore
+from mohtion.analyzers.parsed import find_line_offsets
+from mohtion.models.target import DebtType, TechDebtTarget
+
+SOURCE = "import os\n\n\ndef target(x):\n    if x:\n        return 1\n    return 0\n\n\ndef after():\n    pass\n"
+
+
+def make_target(store: SourceStore) -> TechDebtTarget:
+    return TechDebtTarget(
+        file_path=Path("mod.py"),
+        start_line=4,
+        end_line=7,
+        debt_type=DebtType.COMPLEXITY,
+        severity=0.5,
+        description="test",
+        source=store,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    (tmp_path / "mod.py").write_text(SOURCE)
+    return tmp_path
+
+
+def test_repeated_replacements_track_current_span(repo: Path) -> None:
+    """A second replacement should replace the first, not the original lines."""
+    with SourceStore(repo) as store:
+        target = make_target(store)
+        store.replace_target(target, "def target(x):\n    return int(bool(x))")
+        store.replace_target(target, "def target(x):\n    # healed\n    return 1 if x else 0")
+
+        assert target.code_snippet.startswith("def target(x):\n    if x:")
+        assert store.read(target.file_path, target.start_byte, target.end_byte).endswith(
+            "return 1 if x else 0"
+        )
+        assert target.end_line == 6
+        assert store.read(Path("mod.py"), *store.line_span(Path("mod.py"), 9, 10)) == (
+            "def after():\n    pass"
+        )
+
+        # The incrementally maintained index matches a full rebuild
+        buffer = store._buffer(Path("mod.py"))
+        assert buffer.offsets == find_line_offsets(bytes(buffer.data))
+
+        assert (repo / "mod.py").read_text() == SOURCE  # Nothing written before flush
+        assert store.flush() == [Path("mod.py")]
+        assert store.flush() == []
+
+    expected = SOURCE.replace(
+        "def target(x):\n    if x:\n        return 1\n    return 0",
+        "def target(x):\n    # healed\n    return 1 if x else 0",
+    )
+    assert (repo / "mod.py").read_text() == expected
+
+
+def test_crlf_files_keep_their_line_endings(tmp_path: Path) -> None:
+    """Replacement text should take on the file's line terminator."""
+    (tmp_path / "mod.py").write_bytes(SOURCE.replace("\n", "\r\n").encode())
+    with SourceStore(tmp_path) as store:
+        target = make_target(store)
+        assert target.code_snippet == "def target(x):\n    if x:\n        return 1\n    return 0"
+
+        store.replace_target(target, "def target(x):\n    return 1 if x else 0")
+        store.flush()
+
+    data = (tmp_path / "mod.py").read_bytes()
+    assert b"def target(x):\r\n    return 1 if x else 0\r\n\r\n\r\ndef after()" in data
+    assert b"\n" not in data.replace(b"\r\n", b"")
@@ -0,0 +1,149 @@
+"""Tests for speculative refactoring candidates."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import anthropic
+import pytest
+from git import Repo
+
+from mohtion.agent.refactor import Refactor
+from mohtion.agent.speculative import race_candidates
+from mohtion.agent.verifier import Verifier
+from mohtion.llm.client import LLMClient
+from mohtion.llm.response_cache import ResponseCache
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType, TechDebtTarget
+from tests.messages_stub import MessagesStub
+
+MODULE = """\
+def f(x):
+    if x > 0:
+        if x > 10:
+            return 2
+        return 1
+    return 0
+"""
+
+TESTS = """\
+from mod import f
+
+
+def test_f():
+    assert [f(-1), f(5), f(20)] == [0, 1, 2]
+"""
+
+CANDIDATES = {
+    # No approach hint: wrong, fails its tests
+    "": "def f(x):\n    return 1",
+    # Right, but its tests would take a minute
+    "helper functions": (
+        "def f(x):\n    import time\n    time.sleep(60)\n"
+        "    return 0 if x <= 0 else 2 if x > 10 else 1"
+    ),
+    # Right, and fast
+    "guard clauses": "def f(x):\n    if x <= 0:\n        return 0\n    return 2 if x > 10 else 1",
+}
+
+
+def reply(body: dict) -> str:
+    hints = " ".join(block["text"] for block in body["messages"][0]["content"][1:])
+    approach = next((key for key in CANDIDATES if key and key in hints), "")
+    return f"```python\n{CANDIDATES[approach]}\n```\nSummary: Flattened."
+
+
+@pytest.fixture
+def repo_path(tmp_path: Path) -> Path:
+    (tmp_path / "mod.py").write_text(MODULE)
+    (tmp_path / "test_mod.py").write_text(TESTS)
+    repo = Repo.init(tmp_path)
+    repo.index.add(["mod.py", "test_mod.py"])
+    repo.index.commit("initial")
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_first_candidate_to_pass_wins_and_the_rest_are_cancelled(repo_path: Path) -> None:
+    target = TechDebtTarget(
+        file_path=Path("mod.py"),
+        start_line=1,
+        end_line=6,
+        debt_type=DebtType.NESTING,
+        severity=0.5,
+        description="Deeply nested blocks",
+        function_name="f",
+        code_snippet=MODULE.rstrip("\n"),
+    )
+    with MessagesStub(reply) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        refactor = Refactor(repo_path, llm=LLMClient(client))
+
+        start = time.perf_counter()
+        finished = await race_candidates(
+            refactor,
+            target,
+            RepoConfig(),
+            count=3,
+            test_command=f"{sys.executable} -m pytest -q -p no:cacheprovider",
+        )
+        elapsed = time.perf_counter() - start
+        await client.close()
+
+    assert len(stub.requests) == 3
+    winner = finished[-1]
+    assert winner.passed and winner.index == 2
+    assert winner.result.refactored_code == CANDIDATES["guard clauses"]
+    # The wrong candidate may or may not have failed before the winner passed;
+    # the slow one was cut short either way
+    assert [candidate.index for candidate in finished] in ([2], [0, 2])
+    assert not any(candidate.passed for candidate in finished[:-1])
+    assert elapsed < 30
+    # The main working tree is untouched and the worktrees are gone
+    assert (repo_path / "mod.py").read_text() == MODULE
+    assert len(Repo(repo_path).git.worktree("list").splitlines()) == 1
+    assert target.end_line == 6
+
+
+@pytest.mark.asyncio
+async def test_candidates_sharing_a_client_get_their_own_usage(tmp_path: Path) -> None:
+    target = TechDebtTarget(
+        file_path=Path("mod.py"),
+        start_line=1,
+        end_line=6,
+        debt_type=DebtType.NESTING,
+        severity=0.5,
+        description="Deeply nested blocks",
+        function_name="f",
+        code_snippet=MODULE.rstrip("\n"),
+    )
+    models = ["model-a", "model-b", "model-c"]
+    cache = ResponseCache(tmp_path / "cache")
+    with MessagesStub(reply, chunk_size=8, chunk_delay=0.001) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        refactor = Refactor(tmp_path, llm=LLMClient(client, cache=cache))
+
+        results = await asyncio.gather(*(
+            refactor.refactor_target(target, model=model, variant=index)
+            for index, model in enumerate(models)
+        ))
+        await client.close()
+    cache.close()
+
+    assert [result.usage.model if result.usage else None for result in results] == models
+
+
+@pytest.mark.asyncio
+async def test_cancelled_test_run_is_killed_and_reaped(tmp_path: Path) -> None:
+    verifier = Verifier(tmp_path, RepoConfig(), test_command="echo $$ > pid; exec sleep 30")
+    run = asyncio.create_task(verifier.run_tests(install=False))
+    while not (tmp_path / "pid").exists() or not (tmp_path / "pid").read_text():
+        await asyncio.sleep(0.05)
+
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+    # Not just killed but waited for: a zombie would still be listed
+    assert not Path(f"/proc/{(tmp_path / 'pid').read_text().strip()}").exists()
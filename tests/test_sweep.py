@@ -0,0 +1,162 @@
+"""Tests for sweeps over many repositories."""
+
+from pathlib import Path
+
+import anthropic
+import pytest
+from git import Repo
+
+from mohtion.agent.orchestrator import Orchestrator
+from mohtion.agent.refactor import RefactorResult
+from mohtion.agent.sweep import run_sweep
+from mohtion.config import get_settings
+from mohtion.integrations.github_api import GitHubAPI, PRResult
+from mohtion.llm.client import LLMClient
+from mohtion.models.bounty import BountyResult, BountyStatus
+from mohtion.models.target import DebtType, TechDebtTarget
+from tests.messages_stub import MessagesStub
+
+
+class FakeOrchestrator:
+    """Stands in for an Orchestrator whose repository has one target (or none)."""
+
+    def __init__(self, name: str | None) -> None:
+        self.name = name
+        self.result: RefactorResult | None = None
+        self.suspended = False
+        self.closed = False
+
+    async def prepare(self, base_branch: str = "main") -> BountyResult | None:
+        if self.name is None:
+            return None
+        target = TechDebtTarget(
+            file_path=Path(f"{self.name}.py"),
+            start_line=1,
+            end_line=1,
+            debt_type=DebtType.COMPLEXITY,
+            severity=0.5,
+            description="High cyclomatic complexity",
+            function_name=self.name,
+            code_snippet=f"def {self.name}(): ...",
+        )
+        self.bounty = BountyResult(target, BountyStatus.IN_PROGRESS, f"mohtion/{self.name}")
+        return self.bounty
+
+    async def suspend(self) -> None:
+        self.suspended = True
+
+    async def finish(self, result: RefactorResult) -> BountyResult:
+        assert self.suspended
+        self.result = result
+        if result.success:
+            self.bounty.mark_success(f"https://example.com/{self.name}", 1)
+        else:
+            self.bounty.mark_failed(result.error or "")
+        return self.bounty
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_sweep_routes_each_batch_result_to_its_repository() -> None:
+    def reply(body: dict) -> str:
+        code = body["messages"][0]["content"][0]["text"]
+        name = next(name for name in "fgh" if f"def {name}()" in code)
+        return f"```python\ndef {name}():\n    return 1\n```\nSummary: Done."
+
+    orchestrators = {
+        "acme/one": FakeOrchestrator("f"),
+        "acme/two": FakeOrchestrator(None),
+        "acme/three": FakeOrchestrator("h"),
+    }
+    with MessagesStub(reply) as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        bounties = await run_sweep(
+            orchestrators, LLMClient(client), poll_interval=0  # type: ignore[arg-type]
+        )
+        await client.close()
+
+    # One batch for every target
+    assert len(stub.batches) == 1
+    assert len(stub.batches["msgbatch_1"]["requests"]) == 2
+    assert bounties["acme/two"] is None
+    for label, name in [("acme/one", "f"), ("acme/three", "h")]:
+        result = orchestrators[label].result
+        assert result is not None and result.refactored_code == f"def {name}():\n    return 1"
+        assert bounties[label].status == BountyStatus.SUCCESS
+    assert all(orchestrator.closed for orchestrator in orchestrators.values())
+
+
+class LocalGitHubAPI(GitHubAPI):
+    """Clones from a local repository and records pushes and PRs instead of making them."""
+
+    def __init__(self, origin: Path) -> None:
+        super().__init__(None, 1)  # type: ignore[arg-type]
+        self.origin = origin
+        self.clones: list[Path] = []
+        self.pushed: list[str] = []
+
+    async def clone_repo(self, owner: str, repo: str) -> Path:
+        path = self.origin.parent / f"clone-{len(self.clones)}"
+        Repo.clone_from(self.origin, path)
+        self.clones.append(path)
+        return path
+
+    async def push_branch(
+        self, repo_path: Path, owner: str, repo_name: str, branch_name: str
+    ) -> None:
+        self.pushed.append(Repo(repo_path).git.show(f"{branch_name}:mod.py"))
+
+    async def create_pull_request(self, **kwargs: str) -> PRResult:
+        return PRResult("https://api.example.com/1", 1, "https://example.com/1")
+
+
+@pytest.mark.asyncio
+async def test_suspended_bounty_is_finished_from_a_fresh_clone_of_the_scanned_commit(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    branches = "".join(f"    if x == {i}:\n        return {i}\n" for i in range(20))
+    module = "def f(x):\n" + branches + "    return -1\n"
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    (origin / "mod.py").write_text(module)
+    (origin / ".mohtion.yaml").write_text("test_command: 'true'\n")
+    repo = Repo.init(origin, initial_branch="main")
+    repo.index.add(["mod.py", ".mohtion.yaml"])
+    repo.index.commit("initial")
+    for name, value in [
+        ("GITHUB_APP_ID", "1"),
+        ("GITHUB_PRIVATE_KEY_BASE64", ""),
+        ("GITHUB_WEBHOOK_SECRET", "secret"),
+        ("ANTHROPIC_API_KEY", "sk-test"),
+        ("CACHE_DIR", str(tmp_path / "cache")),
+        ("LLM_RATE_LIMIT_ENABLED", "false"),
+    ]:
+        monkeypatch.setenv(name, value)
+    get_settings.cache_clear()
+
+    github_api = LocalGitHubAPI(origin)
+    orchestrator = Orchestrator(github_api, "acme", "one")
+    try:
+        bounty = await orchestrator.prepare()
+        assert bounty is not None and bounty.target.function_name == "f"
+        await orchestrator.suspend()
+        assert not github_api.clones[0].exists()
+
+        # The default branch moves on while the batch runs
+        (origin / "mod.py").write_text("# Moved\n" + module)
+        repo.index.add(["mod.py"])
+        repo.index.commit("unrelated")
+
+        refactored = "def f(x):\n    return x if 0 <= x < 20 else -1"
+        result = RefactorResult(True, bounty.target.code_snippet, refactored, "Simplified.")
+        bounty = await orchestrator.finish(result)
+        await orchestrator.close()
+    finally:
+        get_settings.cache_clear()
+
+    assert bounty.status == BountyStatus.SUCCESS
+    # From the scanned commit: the later one would have kept "# Moved"
+    assert github_api.pushed == [refactored]
+    assert not any(clone.exists() for clone in github_api.clones)
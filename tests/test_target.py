@@ -0,0 +1,55 @@
+"""Tests for the tech debt target model."""
+
+import pickle
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.source_index import SourceIndex
+from mohtion.models.target import DebtType, TechDebtTarget
+
+
+def make_target(**kwargs: object) -> TechDebtTarget:
+    fields = {
+        "file_path": Path("pkg/mod.py"),
+        "start_line": 2,
+        "end_line": 3,
+        "debt_type": DebtType.COMPLEXITY,
+        "severity": 0.5,
+        "description": "High cyclomatic complexity: 12 (threshold: 10)",
+    }
+    fields.update(kwargs)
+    return TechDebtTarget(**fields)  # type: ignore[arg-type]
+
+
+def test_snippet_read_lazily_from_source(tmp_path: Path) -> None:
+    """Snippets should come from the bound source, by byte span or by lines."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_bytes(b"import os\r\ndef f(x):\r\n    return x\r\n")
+    index = SourceIndex(tmp_path)
+
+    by_lines = make_target(source=index)
+    assert by_lines.code_snippet == "def f(x):\n    return x"
+    assert (by_lines.start_byte, by_lines.end_byte) == (11, 34)
+
+    by_bytes = make_target(start_byte=11, end_byte=34, source=index)
+    assert by_bytes.code_snippet == by_lines.code_snippet
+
+
+def test_unbound_target_has_no_snippet() -> None:
+    """Without a source or explicit snippet there's nothing to read."""
+    with pytest.raises(LookupError):
+        make_target().code_snippet
+
+
+def test_pickle_and_dict_round_trip() -> None:
+    """Targets cross process and cache boundaries without their source or code."""
+    target = make_target(start_byte=11, end_byte=33, metrics={"complexity": 12.0})
+    target.source = SourceIndex(Path("."))
+
+    assert not hasattr(target, "__dict__")
+    assert pickle.loads(pickle.dumps(make_target(start_byte=11, end_byte=33))) == make_target(
+        start_byte=11, end_byte=33
+    )
+    assert TechDebtTarget.from_dict(target.to_dict(), target.file_path) == target
+    assert "code_snippet" not in target.to_dict()
@@ -0,0 +1,101 @@
+"""Tests for model tier routing and tier stats."""
+
+from pathlib import Path
+
+import anthropic
+import pytest
+
+from mohtion.agent.refactor import Refactor
+from mohtion.llm.client import LLMClient
+from mohtion.llm.tiers import FAST, LARGE, TierRouter, TierStats
+from mohtion.llm.usage import LLMUsage
+from mohtion.models.target import DebtType, TechDebtTarget
+from tests.messages_stub import MessagesStub
+
+
+def target(severity: float, lines: int, metric_value: float | None = None) -> TechDebtTarget:
+    return TechDebtTarget(
+        file_path=Path("a.py"),
+        start_line=1,
+        end_line=lines,
+        debt_type=DebtType.COMPLEXITY,
+        severity=severity,
+        description="High cyclomatic complexity",
+        function_name="f",
+        code_snippet="def f(): ...",
+        metric_value=metric_value,
+    )
+
+
+def test_easy_targets_start_on_the_fast_tier() -> None:
+    router = TierRouter("large-model", "fast-model", fast_max_severity=0.4, fast_max_lines=30)
+
+    assert router.route(target(0.2, 200)).name == FAST  # Low severity
+    assert router.route(target(0.9, 10)).name == FAST  # Small
+    assert router.route(target(0.9, 200)).name == LARGE
+
+    fast = router.route(target(0.2, 200))
+    assert router.escalate(fast) == router.large
+    assert router.escalate(router.large) is None
+    assert router.tier_of("fast-model") == fast
+
+
+def test_without_a_fast_model_everything_goes_to_the_large_one() -> None:
+    router = TierRouter("large-model", None)
+
+    assert router.route(target(0.1, 5)) == router.large
+    assert router.escalate(router.large) is None
+
+
+def test_stats_per_tier(tmp_path: Path) -> None:
+    router = TierRouter("claude-sonnet-4-6", "claude-haiku-4-5")
+    stats = TierStats(tmp_path / "tiers.sqlite3")
+    assert router.fast is not None
+    fast_usage = LLMUsage(
+        "refactor", input_tokens=1000, output_tokens=200, model="claude-haiku-4-5", seconds=2.0
+    )
+    large_usage = LLMUsage(
+        "self_heal", input_tokens=1000, output_tokens=200, model="claude-sonnet-4-6", seconds=6.0
+    )
+
+    stats.record(router.fast, target(0.2, 10, 12), False, fast_usage)
+    stats.record(router.fast, target(0.3, 10, 14), True, fast_usage)
+    stats.record(router.large, target(0.3, 10, 14), True, large_usage)
+    stats.record(router.large, target(0.9, 90, 40), False)  # The call itself failed
+    summary = stats.summary()
+    stats.close()
+
+    assert summary[FAST]["attempts"] == 2
+    assert summary[FAST]["success_rate"] == 0.5
+    assert summary[FAST]["mean_seconds"] == 2.0
+    assert summary[FAST]["cost_usd"] == pytest.approx(2 * (1000 * 1.0 + 200 * 5.0) / 1e6)
+    assert summary[LARGE]["attempts"] == 2
+    assert summary[LARGE]["mean_seconds"] == 6.0  # Attempts without a latency don't count
+    assert summary[LARGE]["cost_usd"] == pytest.approx((1000 * 3.0 + 200 * 15.0) / 1e6)
+
+
+def test_batch_calls_cost_half() -> None:
+    usage = LLMUsage("refactor", input_tokens=10_000, output_tokens=1000, model="claude-haiku-4-5")
+    batch = LLMUsage(
+        "refactor_batch", input_tokens=10_000, output_tokens=1000, model="claude-haiku-4-5"
+    )
+
+    assert batch.cost_usd == pytest.approx(usage.cost_usd / 2)  # type: ignore[operator]
+    assert LLMUsage("refactor", model="unknown-model").cost_usd is None
+
+
+@pytest.mark.asyncio
+async def test_each_call_uses_the_model_it_was_given(tmp_path: Path) -> None:
+    with MessagesStub() as stub:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=stub.url, max_retries=0)
+        llm = LLMClient(client, model="claude-sonnet-4-6")
+        refactor = Refactor(tmp_path, llm=llm)
+
+        fast = await refactor.refactor_target(target(0.2, 10), model="claude-haiku-4-5")
+        heal = await refactor.attempt_self_heal(target(0.2, 10), fast.refactored_code, "FAILED")
+        await client.close()
+
+    assert [body["model"] for body in stub.requests] == ["claude-haiku-4-5", "claude-sonnet-4-6"]
+    assert fast.model == "claude-haiku-4-5" and heal.model == "claude-sonnet-4-6"
+    assert fast.usage is not None and fast.usage.model == "claude-haiku-4-5"
+    assert fast.usage.seconds is not None and fast.usage.seconds > 0
@@ -0,0 +1,76 @@
+"""Tests for the type hint analyzer."""
+
+import ast
+from pathlib import Path
+
+import pytest
+
+from mohtion.agent.scanner import analyze_source, create_analyzers
+from mohtion.analyzers.type_hints import TypeHintAnalyzer, TypeHintVisitor
+from mohtion.models.repo_config import RepoConfig
+from mohtion.models.target import DebtType
+
+
+@pytest.fixture
+def analyzer() -> TypeHintAnalyzer:
+    return TypeHintAnalyzer(RepoConfig())
+
+
+def test_method_slots_skip_self_and_init_return() -> None:
+    """self/cls and __init__'s return shouldn't count as missing annotations."""
+    code = '''
+class Point:
+    def __init__(self, x: int, y: int):
+        self.x = x
+
+    @classmethod
+    def origin(cls) -> "Point":
+        return cls(0, 0)
+
+    @staticmethod
+    def parse(text, *parts, **options) -> "Point":
+        def helper(value):
+            return value
+        return Point(0, 0)
+'''
+    visitor = TypeHintVisitor()
+    visitor.visit(ast.parse(code))
+    slots = {func["name"]: (func["annotated"], func["slots"]) for func in visitor.functions}
+
+    assert slots["__init__"] == (2, 2)
+    assert slots["origin"] == (1, 1)
+    assert slots["parse"] == (1, 4)
+    assert slots["helper"] == (0, 2)
+
+
+@pytest.mark.asyncio
+async def test_unannotated_function_flagged(analyzer: TypeHintAnalyzer) -> None:
+    """Functions below the coverage threshold should be flagged."""
+    code = '''
+def typed(a: int, b: int) -> int:
+    return a + b
+
+def untyped(a, b, c):
+    return a + b + c
+'''
+    targets = await analyzer.analyze_file(Path("test.py"), code)
+
+    assert len(targets) == 1
+    target = targets[0]
+    assert target.debt_type == DebtType.TYPE_HINTS
+    assert target.function_name == "untyped"
+    assert target.metric_value == 0.0
+    assert "module coverage 43%" in target.description
+
+
+def test_runs_in_shared_walk() -> None:
+    """Complexity and type hints should both report from one analyze_source call."""
+    config = RepoConfig(analyzers=["complexity", "type_hints"])
+    config.thresholds.cyclomatic_complexity = 1
+    code = b"def check(x):\n    if x:\n        return 1\n    return 0\n"
+
+    analysis = analyze_source(Path("test.py"), code, create_analyzers(config))
+
+    assert [t.function_name for t in analysis.targets["complexity"]] == ["check"]
+    assert [t.function_name for t in analysis.targets["type_hints"]] == ["check"]
+    assert analysis.summaries["type_hints"] == {"slots": 2, "annotated": 0}
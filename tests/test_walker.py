@@ -0,0 +1,110 @@
+"""Tests for the ignore matcher and the pruning file walker."""
+
+import os
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+from mohtion.agent.walker import git_files, walk_files
+from mohtion.analyzers.cache import git_blob_sha
+from mohtion.analyzers.ignore import IgnoreMatcher, gitignore_rules
+
+
+@pytest.mark.parametrize(
+    ("pattern", "path", "expected"),
+    [
+        ("**/node_modules/**", "node_modules", True),
+        ("**/node_modules/**", "web/node_modules/pkg/index.py", True),
+        ("**/node_modules/**", "node_modules_extra/a.py", False),
+        ("tests/*", "tests/test_a.py", True),
+        ("tests/*", "src/tests/test_a.py", False),
+        # Patterns without a slash match at any depth
+        ("*.py", "a/b.py", True),
+        ("*_pb2.py", "proto/foo_pb2.py", True),
+        ("*.min.js", "static/x.min.js", True),
+        ("*.min.js", "static/x.js", False),
+        ("docs/**/conf.py", "docs/conf.py", True),
+        ("docs/**/conf.py", "docs/en/api/conf.py", True),
+        ("build/[!a]*.py", "build/x.py", True),
+        ("build/[!a]*.py", "build/a.py", False),
+    ],
+)
+def test_config_patterns(pattern: str, path: str, expected: bool) -> None:
+    matcher = IgnoreMatcher.from_patterns([pattern])
+    assert matcher.is_ignored(path, is_dir="." not in path) is expected
+
+
+def test_gitignore_semantics() -> None:
+    rules = gitignore_rules("# comment\n*.gen.py\nbuild/\n/setup_local.py\n!keep.gen.py\n")
+    matcher = IgnoreMatcher(rules)
+    assert matcher.is_ignored("pkg/a.gen.py")
+    assert not matcher.is_ignored("pkg/keep.gen.py")
+    assert matcher.is_ignored("pkg/build", is_dir=True)
+    assert not matcher.is_ignored("pkg/build")  # Directory-only rule
+    assert matcher.is_ignored("setup_local.py")
+    assert not matcher.is_ignored("sub/setup_local.py")  # Anchored to the root
+    assert matcher.matches("pkg/build/out.py")
+
+
+def test_walker_prunes_ignored_directories(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for relative in [
+        "app/main.py",
+        "app/generated/models.py",
+        "app/sub/helper.py",
+        "app/sub/local.py",
+        "node_modules/pkg/setup.py",
+        "README.md",
+        ".git/hooks/pre-commit.py",
+    ]:
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x = 1\n")
+    (tmp_path / ".gitignore").write_text("generated/\n")
+    (tmp_path / "app" / "sub" / ".gitignore").write_text("local.py\n")
+
+    listed: list[str] = []
+    real_scandir = os.scandir
+
+    def tracking_scandir(path: str) -> "os._ScandirIterator[str]":
+        listed.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", tracking_scandir)
+    matcher = IgnoreMatcher.from_patterns(["**/node_modules/**"])
+    files = [entry.path.as_posix() for entry in walk_files(tmp_path, matcher)]
+
+    assert files == ["app/main.py", "app/sub/helper.py"]
+    assert not any("node_modules" in d or "generated" in d or ".git" in d for d in listed)
+
+
+def test_git_files_lists_tracked_files_with_shas(tmp_path: Path) -> None:
+    repo = Repo.init(tmp_path)
+    for relative, content in [
+        ("app/main.py", "x = 1\n"),
+        ("app/edited.py", "y = 2\n"),
+        ("vendor/lib.py", "z = 3\n"),
+        ("notes.txt", "hi\n"),
+    ]:
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    repo.index.add(["app/main.py", "app/edited.py", "vendor/lib.py", "notes.txt"])
+    repo.index.commit("initial")
+    (tmp_path / "app" / "untracked.py").write_text("w = 4\n")
+    (tmp_path / "app" / "edited.py").write_text("y = 22\n")
+
+    entries = git_files(tmp_path, IgnoreMatcher.from_patterns(["vendor/**"]))
+
+    assert entries is not None
+    by_path = {entry.path.as_posix(): entry for entry in entries}
+    assert set(by_path) == {"app/main.py", "app/edited.py"}
+    assert by_path["app/main.py"].blob_sha == git_blob_sha(b"x = 1\n")
+    assert by_path["app/main.py"].size == 6
+    assert by_path["app/edited.py"].blob_sha is None  # Modified since commit
+
+
+def test_git_files_outside_a_checkout(tmp_path: Path) -> None:
+    assert git_files(tmp_path, IgnoreMatcher()) is None